@@ -0,0 +1,223 @@
+"""Memory-mapped CloudEvent archive with an offset index.
+
+An archive is two files: the data file, the encoded events back to back
+exactly as the codec produced them, and a sidecar index (<path>.idx) with
+the byte offset and length of every event by ordinal plus a table of
+(id hash, ordinal) pairs sorted by hash. The reader mmaps both, so fetching
+an event by ordinal or id is a couple of struct lookups and a decode of a
+memoryview slice of the data file: nothing is read up front and no event
+bytes are copied before the codec sees them, so every codec's decode()
+must accept a memoryview. Before timing, a sample of the archived events is
+read back by ordinal and by id and checked against what the codec decodes
+from its own bytes.
+
+    python3 archive.py --codec protobuf --profile large --events 100000 --lookups 10000
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+import weakref
+
+import harness
+
+INDEX_MAGIC = b"CEIX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sIQ")  # magic, version, event count
+OFFSET_ENTRY = struct.Struct("<QI")     # offset, length
+ID_ENTRY = struct.Struct("<QQ")         # id hash, ordinal
+
+
+def id_hash(event_id):
+    return int.from_bytes(hashlib.blake2b(event_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+class ArchiveWriter:
+    def __init__(self, path, codec):
+        self.path = path
+        self._codec = codec
+        self._file = open(path, "wb")
+        self._offsets = []
+        self._ids = []
+        self._position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def append(self, event):
+        data = self._codec.encode(event)
+        self._file.write(data)
+        self._ids.append((id_hash(self._codec.event_id(event)), len(self._offsets)))
+        self._offsets.append((self._position, len(data)))
+        self._position += len(data)
+
+    def close(self):
+        self._file.close()
+        self._ids.sort()
+        with open(index_path(self.path), "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(self._offsets)))
+            for entry in self._offsets:
+                f.write(OFFSET_ENTRY.pack(*entry))
+            for entry in self._ids:
+                f.write(ID_ENTRY.pack(*entry))
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ArchiveReader:
+    def __init__(self, path, codec):
+        self._codec = codec
+        self._data = _map(path)
+        self._index = _map(index_path(path))
+        magic, version, self._count = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{index_path(path)} is not a version {INDEX_VERSION} archive index")
+        self._ids_start = INDEX_HEADER.size + self._count * OFFSET_ENTRY.size
+        self._view = memoryview(self._data)
+        self._exported = {}  # id -> weakref of every view raw() handed out
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def raw(self, ordinal):
+        """Zero-copy memoryview of the encoded event at ordinal.
+
+        The view points into the mmap; close() releases any that are still
+        alive, after which using them raises ValueError.
+        """
+        view = self._slice(ordinal)
+        key = id(view)
+        self._exported[key] = weakref.ref(view, lambda _, key=key: self._exported.pop(key, None))
+        return view
+
+    def _slice(self, ordinal):
+        if not 0 <= ordinal < self._count:
+            raise IndexError(ordinal)
+        offset, length = OFFSET_ENTRY.unpack_from(
+            self._index, INDEX_HEADER.size + ordinal * OFFSET_ENTRY.size)
+        return self._view[offset:offset + length]
+
+    def get(self, ordinal):
+        # Released on the way out, also when decode raises: a view kept alive
+        # by a traceback would otherwise stop close() from unmapping the file.
+        with self._slice(ordinal) as view:
+            return self._codec.decode(view)
+
+    def find(self, event_id):
+        """Return the event with event_id, or None; a binary search over the id table."""
+        target = id_hash(event_id)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ID_ENTRY.unpack_from(self._index, self._ids_start + mid * ID_ENTRY.size)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Walk every entry with this hash; distinct ids may collide.
+        while lo < self._count:
+            found_hash, ordinal = ID_ENTRY.unpack_from(self._index, self._ids_start + lo * ID_ENTRY.size)
+            if found_hash != target:
+                break
+            event = self.get(ordinal)
+            if self._codec.event_id(event) == event_id:
+                return event
+            lo += 1
+        return None
+
+    def close(self):
+        for ref in list(self._exported.values()):
+            view = ref()
+            if view is not None:
+                view.release()
+        self._exported.clear()
+        self._view.release()
+        for mapped in (self._data, self._index):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+
+def check_round_trip(reader, codec, events, ids, samples=100):
+    """Raise AssertionError unless archived events read back as encoded."""
+    for ordinal in range(0, len(ids), max(1, len(ids) // samples)):
+        data = codec.encode(events[ordinal])
+        expected = codec.decode(data)
+        with reader.raw(ordinal) as view:
+            stored = bytes(view)
+        if stored != data or reader.get(ordinal) != expected or reader.find(ids[ordinal]) != expected:
+            raise AssertionError(f"{codec.name}: event {ordinal} does not round-trip through the archive")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CloudEvent archive random access benchmark")
+    parser.add_argument("--codec", action="append", choices=sorted(harness.CODECS))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--pool", type=int, default=1000,
+                        help="distinct payloads generated and cycled into the archive")
+    args = parser.parse_args(argv)
+
+    header = (f"{'codec':<14} {'profile':<8} {'lookup':<8} {'archive MB':>10} "
+              f"{'median us':>10} {'p99 us':>10} {'max us':>10}")
+    print(header)
+    print("-" * len(header))
+    clock = time.perf_counter_ns
+    rng = random.Random(0)
+    for codec_name in args.codec or sorted(harness.CODECS):
+        codec = harness.load_codec(codec_name)
+        for profile in args.profile or harness.PROFILES:
+            pool = codec.build_events(profile, min(args.pool, args.events))
+            directory = tempfile.mkdtemp()
+            path = os.path.join(directory, "events.archive")
+            # Ids are unique per archived event even though payloads repeat.
+            ids = [f"{profile}-{i}" for i in range(args.events)]
+            events = [codec.with_id(pool[i % len(pool)], event_id) for i, event_id in enumerate(ids)]
+            with ArchiveWriter(path, codec) as writer:
+                for event in events:
+                    writer.append(event)
+            size = os.path.getsize(path)
+
+            with ArchiveReader(path, codec) as reader:
+                check_round_trip(reader, codec, events, ids)
+                ordinals = [rng.randrange(args.events) for _ in range(args.lookups)]
+                for kind, lookup, keys in (("ordinal", reader.get, ordinals),
+                                           ("id", reader.find, [ids[i] for i in ordinals])):
+                    samples = []
+                    for key in keys:
+                        start = clock()
+                        lookup(key)
+                        samples.append(clock() - start)
+                    samples.sort()
+                    print(f"{codec_name:<14} {profile:<8} {kind:<8} {size / 2 ** 20:>10.2f} "
+                          f"{harness.percentile(samples, 50) / 1000:>10.1f} "
+                          f"{harness.percentile(samples, 99) / 1000:>10.1f} "
+                          f"{samples[-1] / 1000:>10.1f}")
+            os.remove(path)
+            os.remove(index_path(path))
+            os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1053 @@
+"""Schema-specialized Avro encoder/decoder.
+
+avro-python3's DatumWriter validates the whole datum before writing and then
+re-validates every union branch candidate recursively while writing, and the
+DatumReader dispatches on the schema type for every value it reads. Here a
+schema is compiled once into a tree of closures and cached by its
+parsing-canonical-form fingerprint, so the per-datum work is only the
+encoding itself.
+
+The output is byte-for-byte what avro.io.DatumWriter writes, including its
+union resolution rule: the *last* branch that validates wins (so a Python
+bool in ["boolean", "int"] is written as an int, and an int in
+["boolean", "double"] as a double). Valid data is not re-validated up front,
+so some data the reference writer rejects (an out-of-range int, extra record
+keys) is written instead of raising AvroTypeException.
+"""
+import copy
+import struct
+import time
+
+import avro.io
+import avro.schema
+from avro import schemanormalization
+
+STRUCT_FLOAT = struct.Struct("<f")
+STRUCT_DOUBLE = struct.Struct("<d")
+
+_compiled = {}
+
+
+def fingerprint(schema):
+  canonical = schemanormalization.ToParsingCanonicalForm(schema)
+  return schemanormalization.Fingerprint(canonical, "CRC-64-AVRO")
+
+
+class CompiledSchema:
+  def __init__(self, schema, probe=None):
+    self.schema = schema
+    self.fingerprint = fingerprint(schema)
+    self.write = _writer(schema, {}, probe)
+    self.read = _reader(schema, {})
+    self.read_into = _reuse_reader(schema, {})
+    self.skip = _skipper(schema, {})
+
+  def encode(self, datum):
+    buf = bytearray()
+    self.write(buf, datum)
+    return bytes(buf)
+
+  def encode_into(self, buf, datum):
+    """Encode into the reusable bytearray buf, replacing its contents.
+
+    Returns the encoded length; no bytes object is created.
+    """
+    del buf[:]
+    self.write(buf, datum)
+    return len(buf)
+
+  def decode(self, data):
+    return self.read(data, 0)[0]
+
+  def decode_into(self, data, target):
+    """Decode reusing the dicts and lists of target, a previous decode result.
+
+    Records, maps and arrays of target are refilled in place, so decoding
+    events of a stable shape allocates only the leaf values. target (and
+    anything taken from it) is overwritten by the next decode_into call.
+    """
+    return self.read_into(data, 0, target)[0]
+
+
+def compile_schema(schema):
+  """Return the CompiledSchema for schema, compiling it on first use."""
+  key = fingerprint(schema)
+  compiled = _compiled.get(key)
+  if compiled is None:
+    compiled = _compiled[key] = CompiledSchema(schema)
+  return compiled
+
+
+class FieldProbe:
+  """Time and bytes spent writing each record field and union branch.
+
+  Pass one to CompiledSchema(schema, probe) to get a writer whose field and
+  branch writers are wrapped in timers (the cached, uninstrumented writers
+  are unaffected). Costs are keyed by label: "<record>.<field>" for a field,
+  with "{}" for map values, "[]" for array items and "|<branch>" for the
+  union branch taken appended. Inclusive figures contain nested fields,
+  self figures do not, so the self figures add up to the total.
+  """
+
+  def __init__(self):
+    self.costs = {}  # label -> [calls, ns, self ns, bytes, self bytes]
+    self._children = []  # time and bytes of finished nested writes, per level
+
+  def wrap(self, label, write, size=len):
+    """Time write(buf, datum) under label; size(buf) is the bytes written so far."""
+    cost = self.costs.setdefault(label, [0, 0, 0, 0, 0])
+    children = self._children
+    clock = time.perf_counter_ns
+
+    def timed(buf, datum):
+      children.append([0, 0])
+      before = size(buf)
+      start = clock()
+      write(buf, datum)
+      elapsed = clock() - start
+      written = size(buf) - before
+      nested_ns, nested_bytes = children.pop()
+      cost[0] += 1
+      cost[1] += elapsed
+      cost[2] += elapsed - nested_ns
+      cost[3] += written
+      cost[4] += written - nested_bytes
+      if children:
+        children[-1][0] += elapsed
+        children[-1][1] += written
+    return timed
+
+
+def _encoder_tell(encoder):
+  return encoder.writer.tell()
+
+
+class ProbedDatumWriter(avro.io.DatumWriter):
+  """avro.io.DatumWriter with FieldProbe timers, for comparing with the
+  compiled writer: record fields and union branches get the labels
+  CompiledSchema(schema, probe) gives them, and the validation of the whole
+  datum DatumWriter.write() does first is "(validate)". Union branch
+  resolution, which re-validates the value against every branch, is part of
+  the enclosing field's self time.
+  """
+
+  def __init__(self, writer_schema, probe):
+    super().__init__(writer_schema)
+    self._probe = probe
+    self._label = ""
+    self._timers = {}  # label -> timed write
+    self._fields = {}  # id(record schema) -> [(field name, timed write)]
+    self._validate = probe.wrap("(validate)", self._check, _encoder_tell)
+
+  def _check(self, encoder, datum):
+    if not avro.io.Validate(self.writer_schema, datum):
+      raise avro.io.AvroTypeException(self.writer_schema, datum)
+
+  def _timer(self, label, writer_schema, nested_label):
+    timed = self._timers.get(label)
+    if timed is None:
+      write_data = self.write_data
+
+      def write(encoder, datum):
+        outer = self._label
+        self._label = nested_label
+        write_data(writer_schema, datum, encoder)
+        self._label = outer
+      timed = self._timers[label] = self._probe.wrap(label, write, _encoder_tell)
+    return timed
+
+  def write(self, datum, encoder):
+    self._validate(encoder, datum)
+    self.write_data(self.writer_schema, datum, encoder)
+
+  def write_record(self, writer_schema, datum, encoder):
+    fields = self._fields.get(id(writer_schema))
+    if fields is None:
+      fields = self._fields[id(writer_schema)] = []
+      for field in writer_schema.fields:
+        label = f"{writer_schema.name}.{field.name}"
+        fields.append((field.name, self._timer(label, field.type, label)))
+    for name, write in fields:
+      write(encoder, datum.get(name))
+
+  def write_map(self, writer_schema, datum, encoder):
+    outer = self._label
+    self._label = outer + "{}"
+    super().write_map(writer_schema, datum, encoder)
+    self._label = outer
+
+  def write_array(self, writer_schema, datum, encoder):
+    outer = self._label
+    self._label = outer + "[]"
+    super().write_array(writer_schema, datum, encoder)
+    self._label = outer
+
+  def write_union(self, writer_schema, datum, encoder):
+    index = -1
+    for i, candidate in enumerate(writer_schema.schemas):
+      if avro.io.Validate(candidate, datum):
+        index = i
+    if index < 0:
+      raise avro.io.AvroTypeException(writer_schema, datum)
+    encoder.write_long(index)
+    branch = writer_schema.schemas[index]
+    label = self._label
+    self._timer(f"{label}|{getattr(branch, 'name', branch.type)}", branch, label)(encoder, datum)
+
+
+# ------------------------------------------------------------------------------
+# Encoding
+
+
+def write_long(buf, datum):
+  datum = (datum << 1) ^ (datum >> 63)
+  while datum & ~0x7F:
+    buf.append((datum & 0x7F) | 0x80)
+    datum >>= 7
+  buf.append(datum)
+
+
+def write_utf8(buf, datum):
+  data = datum.encode("utf-8")
+  write_long(buf, len(data))
+  buf += data
+
+
+def write_bytes(buf, datum):
+  write_long(buf, len(datum))
+  buf += datum
+
+
+def _write_null(buf, datum):
+  pass
+
+
+def _write_boolean(buf, datum):
+  buf.append(1 if datum else 0)
+
+
+def _write_float(buf, datum):
+  buf += STRUCT_FLOAT.pack(datum)
+
+
+def _write_double(buf, datum):
+  buf += STRUCT_DOUBLE.pack(datum)
+
+
+_PRIMITIVE_WRITERS = {
+  "null": _write_null,
+  "boolean": _write_boolean,
+  "string": write_utf8,
+  "bytes": write_bytes,
+  "int": write_long,
+  "long": write_long,
+  "float": _write_float,
+  "double": _write_double,
+}
+
+# Python types each schema type can validate, used to narrow union branches
+# before falling back to avro.io.Validate.
+_ACCEPTED_TYPES = {
+  "null": (type(None),),
+  "boolean": (bool,),
+  "string": (str,),
+  "bytes": (bytes,),
+  "int": (int, bool),
+  "long": (int, bool),
+  "float": (int, bool, float),
+  "double": (int, bool, float),
+  "fixed": (bytes,),
+  "array": (list,),
+  "map": (dict,),
+  "record": (dict,),
+}
+
+
+def _writer(schema, named, probe=None, label=""):
+  kind = schema.type
+  if kind in _PRIMITIVE_WRITERS:
+    return _PRIMITIVE_WRITERS[kind]
+
+  if kind in ("record", "error", "request"):
+    # Named types may be recursive (CloudEventData), so register a trampoline
+    # before compiling the fields.
+    if id(schema) in named:
+      return named[id(schema)]
+    fields = []
+
+    def write_record(buf, datum):
+      for name, write in fields:
+        write(buf, datum.get(name))
+    named[id(schema)] = write_record
+    for field in schema.fields:
+      write = _writer(field.type, named, probe, f"{schema.name}.{field.name}")
+      if probe is not None:
+        write = probe.wrap(f"{schema.name}.{field.name}", write)
+      fields.append((field.name, write))
+    return write_record
+
+  if kind == "map":
+    write_value = _writer(schema.values, named, probe, label + "{}")
+
+    def write_map(buf, datum):
+      if datum:
+        write_long(buf, len(datum))
+        for key, value in datum.items():
+          write_utf8(buf, key)
+          write_value(buf, value)
+      buf.append(0)
+    return write_map
+
+  if kind == "array":
+    write_item = _writer(schema.items, named, probe, label + "[]")
+
+    def write_array(buf, datum):
+      if datum:
+        write_long(buf, len(datum))
+        for item in datum:
+          write_item(buf, item)
+      buf.append(0)
+    return write_array
+
+  if kind == "fixed":
+    def write_fixed(buf, datum):
+      buf += datum
+    return write_fixed
+
+  if kind == "enum":
+    symbols = schema.symbols
+
+    def write_enum(buf, datum):
+      write_long(buf, symbols.index(datum))
+    return write_enum
+
+  if kind in ("union", "error_union"):
+    return _union_writer(schema, named, probe, label)
+
+  raise avro.schema.AvroException("Unknown type: %s" % kind)
+
+
+def _union_writer(schema, named, probe=None, label=""):
+  branches = schema.schemas
+  writers = [_writer(branch, named, probe, label) for branch in branches]
+  if probe is not None:
+    writers = [probe.wrap(f"{label}|{getattr(branch, 'name', branch.type)}", write)
+               for branch, write in zip(branches, writers)]
+  indexes = [bytes(_encode_long(i)) for i in range(len(branches))]
+
+  # For every Python type, the branches that could accept it, last first
+  # (DatumWriter keeps the last branch that validates). The list stops at
+  # the first branch that accepts the type unconditionally; a type left with
+  # a single candidate needs no validation at all, since the reference writer
+  # would either pick that branch or reject the datum outright.
+  candidates = {}
+  for index in reversed(range(len(branches))):
+    kind = branches[index].type
+    for accepted in _ACCEPTED_TYPES.get(kind, ()):
+      found = candidates.setdefault(accepted, [])
+      if found and found[-1][1]:
+        continue
+      found.append((index, _always_valid(kind, accepted)))
+  exact = {}
+  checked = {}
+  for accepted, found in candidates.items():
+    if len(found) == 1 or found[0][1]:
+      index = found[0][0]
+      exact[accepted] = (indexes[index], writers[index])
+    else:
+      checked[accepted] = tuple(index for index, _ in found)
+
+  def resolve(datum):
+    found = checked.get(type(datum), range(len(branches) - 1, -1, -1))
+    for index in found:
+      if avro.io.Validate(branches[index], datum):
+        return index
+    raise avro.io.AvroTypeException(schema, datum)
+
+  def write_union(buf, datum):
+    branch = exact.get(type(datum))
+    if branch is None:
+      index = resolve(datum)
+      branch = indexes[index], writers[index]
+    buf += branch[0]
+    branch[1](buf, datum)
+  return write_union
+
+
+def _always_valid(kind, accepted):
+  # Whether every value of Python type accepted validates against kind.
+  if kind in ("int", "long"):
+    return accepted is bool
+  return kind in ("null", "boolean", "string", "bytes", "float", "double")
+
+
+def _encode_long(datum):
+  buf = bytearray()
+  write_long(buf, datum)
+  return buf
+
+
+# ------------------------------------------------------------------------------
+# Decoding
+
+
+def read_long(buf, pos):
+  b = buf[pos]
+  pos += 1
+  n = b & 0x7F
+  shift = 7
+  while b & 0x80:
+    b = buf[pos]
+    pos += 1
+    n |= (b & 0x7F) << shift
+    shift += 7
+  return (n >> 1) ^ -(n & 1), pos
+
+
+def read_utf8(buf, pos):
+  size, pos = read_long(buf, pos)
+  end = pos + size
+  return str(buf[pos:end], "utf-8"), end
+
+
+def read_bytes(buf, pos):
+  size, pos = read_long(buf, pos)
+  end = pos + size
+  return bytes(buf[pos:end]), end
+
+
+def _read_null(buf, pos):
+  return None, pos
+
+
+def _read_boolean(buf, pos):
+  return buf[pos] == 1, pos + 1
+
+
+def _read_float(buf, pos):
+  return STRUCT_FLOAT.unpack_from(buf, pos)[0], pos + 4
+
+
+def _read_double(buf, pos):
+  return STRUCT_DOUBLE.unpack_from(buf, pos)[0], pos + 8
+
+
+_PRIMITIVE_READERS = {
+  "null": _read_null,
+  "boolean": _read_boolean,
+  "string": read_utf8,
+  "bytes": read_bytes,
+  "int": read_long,
+  "long": read_long,
+  "float": _read_float,
+  "double": _read_double,
+}
+
+
+def _reader(schema, named):
+  kind = schema.type
+  if kind in _PRIMITIVE_READERS:
+    return _PRIMITIVE_READERS[kind]
+
+  if kind in ("record", "error", "request"):
+    if id(schema) in named:
+      return named[id(schema)]
+    fields = []
+
+    def read_record(buf, pos):
+      record = {}
+      for name, read in fields:
+        record[name], pos = read(buf, pos)
+      return record, pos
+    named[id(schema)] = read_record
+    fields.extend((field.name, _reader(field.type, named)) for field in schema.fields)
+    return read_record
+
+  if kind == "map":
+    read_value = _reader(schema.values, named)
+
+    def read_map(buf, pos):
+      items = {}
+      count, pos = read_long(buf, pos)
+      while count:
+        if count < 0:
+          count = -count
+          _, pos = read_long(buf, pos)
+        for _ in range(count):
+          key, pos = read_utf8(buf, pos)
+          items[key], pos = read_value(buf, pos)
+        count, pos = read_long(buf, pos)
+      return items, pos
+    return read_map
+
+  if kind == "array":
+    read_item = _reader(schema.items, named)
+
+    def read_array(buf, pos):
+      items = []
+      append = items.append
+      count, pos = read_long(buf, pos)
+      while count:
+        if count < 0:
+          count = -count
+          _, pos = read_long(buf, pos)
+        for _ in range(count):
+          item, pos = read_item(buf, pos)
+          append(item)
+        count, pos = read_long(buf, pos)
+      return items, pos
+    return read_array
+
+  if kind == "fixed":
+    size = schema.size
+
+    def read_fixed(buf, pos):
+      return bytes(buf[pos:pos + size]), pos + size
+    return read_fixed
+
+  if kind == "enum":
+    symbols = schema.symbols
+
+    def read_enum(buf, pos):
+      index, pos = read_long(buf, pos)
+      return symbols[index], pos
+    return read_enum
+
+  if kind in ("union", "error_union"):
+    readers = [_reader(branch, named) for branch in schema.schemas]
+
+    def read_union(buf, pos):
+      index, pos = _read_branch(buf, pos, schema)
+      return readers[index](buf, pos)
+    return read_union
+
+  raise avro.schema.AvroException("Cannot read unknown schema type: %s" % kind)
+
+
+def _reuse_reader(schema, named):
+  """Like _reader, but read(buf, pos, old) refills old containers in place."""
+  kind = schema.type
+  if kind not in ("record", "error", "request", "map", "array", "union", "error_union"):
+    read = _reader(schema, {})
+
+    def read_value(buf, pos, old):
+      return read(buf, pos)
+    return read_value
+
+  if kind in ("record", "error", "request"):
+    if id(schema) in named:
+      return named[id(schema)]
+    fields = []
+
+    def read_record(buf, pos, old):
+      record = old if type(old) is dict else {}
+      get = record.get
+      # Every field is rewritten, so a reused record needs no clearing...
+      for name, read in fields:
+        record[name], pos = read(buf, pos, get(name))
+      if len(record) != len(fields):
+        # ...unless it was not one of ours to begin with.
+        for key in [key for key in record if key not in names]:
+          del record[key]
+      return record, pos
+    named[id(schema)] = read_record
+    fields.extend((field.name, _reuse_reader(field.type, named)) for field in schema.fields)
+    names = frozenset(name for name, _ in fields)
+    return read_record
+
+  if kind == "map":
+    read_value = _reuse_reader(schema.values, named)
+
+    def read_map(buf, pos, old):
+      items = old if type(old) is dict else {}
+      get = items.get
+      # Keys read into a reused map, to drop the ones this map does not have.
+      # Counting entries would not do: a repeated key (the last one wins, as
+      # in DatumReader) makes fewer keys than entries.
+      seen = set() if items else None
+      count, pos = read_long(buf, pos)
+      while count:
+        if count < 0:
+          count = -count
+          _, pos = read_long(buf, pos)
+        for _ in range(count):
+          key, pos = read_utf8(buf, pos)
+          items[key], pos = read_value(buf, pos, get(key))
+          if seen is not None:
+            seen.add(key)
+        count, pos = read_long(buf, pos)
+      if seen is not None and len(items) != len(seen):
+        for key in items.keys() - seen:
+          del items[key]
+      return items, pos
+    return read_map
+
+  if kind == "array":
+    read_item = _reuse_reader(schema.items, named)
+
+    def read_array(buf, pos, old):
+      items = old if type(old) is list else []
+      reused = len(items)
+      index = 0
+      count, pos = read_long(buf, pos)
+      while count:
+        if count < 0:
+          count = -count
+          _, pos = read_long(buf, pos)
+        for _ in range(count):
+          if index < reused:
+            items[index], pos = read_item(buf, pos, items[index])
+          else:
+            item, pos = read_item(buf, pos, None)
+            items.append(item)
+          index += 1
+        count, pos = read_long(buf, pos)
+      del items[index:]
+      return items, pos
+    return read_array
+
+  readers = [_reuse_reader(branch, named) for branch in schema.schemas]
+
+  def read_union(buf, pos, old):
+    index, pos = _read_branch(buf, pos, schema)
+    return readers[index](buf, pos, old)
+  return read_union
+
+
+def _read_branch(buf, pos, schema):
+  index = buf[pos]
+  if index < 0x80:
+    # Single-byte zig-zag varint, the common case for small unions.
+    pos += 1
+    index = (index >> 1) ^ -(index & 1)
+  else:
+    index, pos = read_long(buf, pos)
+  if not 0 <= index < len(schema.schemas):
+    raise avro.io.SchemaResolutionException(
+      "Can't access branch index %d for union with %d branches"
+      % (index, len(schema.schemas)), schema)
+  return index, pos
+
+
+# ------------------------------------------------------------------------------
+# Skipping and projection
+#
+# A projection decodes only the selected fields of a record and steps over
+# everything else without creating Python objects: strings and bytes are
+# skipped by their length prefix, maps and arrays written with negative block
+# counts by their byte size.
+
+
+def skip_long(buf, pos):
+  while buf[pos] & 0x80:
+    pos += 1
+  return pos + 1
+
+
+def skip_bytes(buf, pos):
+  size, pos = read_long(buf, pos)
+  return pos + size
+
+
+_PRIMITIVE_SKIPPERS = {
+  "null": lambda buf, pos: pos,
+  "boolean": lambda buf, pos: pos + 1,
+  "string": skip_bytes,
+  "bytes": skip_bytes,
+  "int": skip_long,
+  "long": skip_long,
+  "float": lambda buf, pos: pos + 4,
+  "double": lambda buf, pos: pos + 8,
+}
+
+
+def _skipper(schema, named):
+  kind = schema.type
+  if kind in _PRIMITIVE_SKIPPERS:
+    return _PRIMITIVE_SKIPPERS[kind]
+
+  if kind in ("record", "error", "request"):
+    if id(schema) in named:
+      return named[id(schema)]
+    fields = []
+
+    def skip_record(buf, pos):
+      for skip in fields:
+        pos = skip(buf, pos)
+      return pos
+    named[id(schema)] = skip_record
+    fields.extend(_skipper(field.type, named) for field in schema.fields)
+    return skip_record
+
+  if kind in ("map", "array"):
+    skip_item = _skipper(schema.values if kind == "map" else schema.items, named)
+    has_keys = kind == "map"
+
+    def skip_blocks(buf, pos):
+      count, pos = read_long(buf, pos)
+      while count:
+        if count < 0:
+          size, pos = read_long(buf, pos)
+          pos += size
+        else:
+          for _ in range(count):
+            if has_keys:
+              pos = skip_bytes(buf, pos)
+            pos = skip_item(buf, pos)
+        count, pos = read_long(buf, pos)
+      return pos
+    return skip_blocks
+
+  if kind == "fixed":
+    size = schema.size
+    return lambda buf, pos: pos + size
+
+  if kind == "enum":
+    return skip_long
+
+  if kind in ("union", "error_union"):
+    skippers = [_skipper(branch, named) for branch in schema.schemas]
+
+    def skip_union(buf, pos):
+      index, pos = _read_branch(buf, pos, schema)
+      return skippers[index](buf, pos)
+    return skip_union
+
+  raise avro.schema.AvroException("Cannot skip unknown schema type: %s" % kind)
+
+
+def selection_tree(paths):
+  """Turn dotted paths ("attribute.id") into a nested selection dict.
+
+  A None leaf selects the whole value; record fields and map keys are both
+  addressed by name.
+  """
+  tree = {}
+  for path in paths:
+    node = tree
+    parts = path.split(".")
+    for part in parts[:-1]:
+      child = node.get(part, {})
+      if child is None:
+        break
+      node = node.setdefault(part, child)
+    else:
+      node[parts[-1]] = None
+  return tree
+
+
+def _projected_reader(schema, tree, named, skip_named):
+  if tree is None:
+    return _reader(schema, named)
+  kind = schema.type
+
+  if kind in ("record", "error", "request"):
+    fields = []
+    for field in schema.fields:
+      if field.name in tree:
+        fields.append((field.name, _projected_reader(field.type, tree[field.name], named, skip_named)))
+      else:
+        fields.append((None, _skipper(field.type, skip_named)))
+
+    def read_projected_record(buf, pos):
+      record = {}
+      for name, read in fields:
+        if name is None:
+          pos = read(buf, pos)
+        else:
+          record[name], pos = read(buf, pos)
+      return record, pos
+    return read_projected_record
+
+  if kind == "map":
+    skip_value = _skipper(schema.values, skip_named)
+    readers = {key: _projected_reader(schema.values, subtree, named, skip_named)
+               for key, subtree in tree.items()}
+
+    def read_projected_map(buf, pos):
+      items = {}
+      count, pos = read_long(buf, pos)
+      while count:
+        if count < 0:
+          count = -count
+          _, pos = read_long(buf, pos)
+        for _ in range(count):
+          key, pos = read_utf8(buf, pos)
+          read = readers.get(key)
+          if read is None:
+            pos = skip_value(buf, pos)
+          else:
+            items[key], pos = read(buf, pos)
+        count, pos = read_long(buf, pos)
+      return items, pos
+    return read_projected_map
+
+  if kind in ("union", "error_union"):
+    readers = [_projected_reader(branch, tree, named, skip_named) for branch in schema.schemas]
+
+    def read_projected_union(buf, pos):
+      index, pos = _read_branch(buf, pos, schema)
+      return readers[index](buf, pos)
+    return read_projected_union
+
+  return _reader(schema, named)
+
+
+class Projection:
+  """Decoder for a subset of the fields of a schema."""
+
+  def __init__(self, schema, paths):
+    self.schema = schema
+    self.paths = tuple(paths)
+    self.read = _projected_reader(schema, selection_tree(self.paths), {}, {})
+
+  def decode(self, data):
+    return self.read(data, 0)[0]
+
+
+_projections = {}
+
+
+def compile_projection(schema, paths):
+  """Return the cached Projection of schema onto the dotted field paths."""
+  key = (fingerprint(schema), tuple(sorted(paths)))
+  projection = _projections.get(key)
+  if projection is None:
+    projection = _projections[key] = Projection(schema, key[1])
+  return projection
+
+
+# ------------------------------------------------------------------------------
+# Schema resolution
+#
+# Data written with one version of a schema (the writer's) is read into the
+# shape of another (the reader's) by the Avro resolution rules: record fields
+# are matched by name, writer-only fields are skipped, reader-only fields get
+# their default, numbers are promoted (int -> long -> float -> double) and
+# string and bytes convert into each other. avro-python3's DatumReader works
+# this out again for every value it reads; here the pair is compiled once
+# into a decoding plan, cached by (writer fingerprint, reader fingerprint).
+
+_NAMED_KINDS = ("record", "error", "request", "enum", "fixed")
+_UNION_KINDS = ("union", "error_union")
+
+# (writer type, reader type) -> converts the writer's decoded value.
+_PROMOTIONS = {
+  ("int", "long"): None,
+  ("int", "float"): float,
+  ("int", "double"): float,
+  ("long", "float"): float,
+  ("long", "double"): float,
+  ("float", "double"): None,
+  ("string", "bytes"): None,
+  ("bytes", "string"): None,
+}
+
+
+def _schemas_match(writer, reader):
+  """Whether data of writer can be read as reader (the spec's matching rule)."""
+  wkind, rkind = writer.type, reader.type
+  if wkind in _UNION_KINDS or rkind in _UNION_KINDS:
+    return True
+  if wkind == rkind:
+    if wkind in _NAMED_KINDS:
+      return writer.fullname == reader.fullname
+    return True
+  return (wkind, rkind) in _PROMOTIONS
+
+
+def _reader_branch(writer, reader_union):
+  """Index of the reader union branch a writer schema resolves to, or None.
+
+  An exact type match wins over the first promotable branch.
+  """
+  branches = reader_union.schemas
+  for index, branch in enumerate(branches):
+    if branch.type == writer.type and _schemas_match(writer, branch):
+      return index
+  for index, branch in enumerate(branches):
+    if branch.type not in _UNION_KINDS and _schemas_match(writer, branch):
+      return index
+  return None
+
+
+def _failing_reader(message, writer, reader):
+  # Resolution errors surface when such data is read, not when the plan is
+  # built: a writer union may have branches the reader cannot take but that
+  # the data never uses.
+  def read_unresolvable(buf, pos):
+    raise avro.io.SchemaResolutionException(message, writer, reader)
+  return read_unresolvable
+
+
+def _default_value(schema, value):
+  """A field default, given in the schema as JSON, as a decoded datum."""
+  kind = schema.type
+  if kind in _UNION_KINDS:
+    return _default_value(schema.schemas[0], value)  # defaults belong to the first branch
+  if kind in ("bytes", "fixed"):
+    return value.encode("latin-1")
+  if kind in ("float", "double"):
+    return float(value)
+  if kind in ("record", "error", "request"):
+    return {field.name: _default_value(field.type, value[field.name] if field.name in value else field.default)
+            for field in schema.fields}
+  if kind == "map":
+    return {key: _default_value(schema.values, item) for key, item in value.items()}
+  if kind == "array":
+    return [_default_value(schema.items, item) for item in value]
+  return value
+
+
+def _resolving_reader(writer, reader, named):
+  wkind, rkind = writer.type, reader.type
+
+  if wkind in _UNION_KINDS:
+    readers = [_resolving_reader(branch, reader, named) for branch in writer.schemas]
+
+    def read_resolved_union(buf, pos):
+      index, pos = _read_branch(buf, pos, writer)
+      return readers[index](buf, pos)
+    return read_resolved_union
+
+  if rkind in _UNION_KINDS:
+    index = _reader_branch(writer, reader)
+    if index is None:
+      return _failing_reader("No reader union branch matches the writer's %s" % wkind, writer, reader)
+    return _resolving_reader(writer, reader.schemas[index], named)
+
+  if not _schemas_match(writer, reader):
+    return _failing_reader("Cannot read writer's %s as %s" % (wkind, rkind), writer, reader)
+
+  if wkind != rkind:
+    # string and bytes share an encoding; numbers are read as written.
+    read = _PRIMITIVE_READERS[rkind if rkind in ("string", "bytes") else wkind]
+    convert = _PROMOTIONS[wkind, rkind]
+    if convert is None:
+      return read
+
+    def read_promoted(buf, pos):
+      value, pos = read(buf, pos)
+      return convert(value), pos
+    return read_promoted
+
+  if wkind in ("record", "error", "request"):
+    key = (id(writer), id(reader))
+    if key in named:
+      return named[key]
+    fields = []
+    defaults = []
+
+    def read_resolved_record(buf, pos):
+      record = {}
+      for name, read in fields:
+        if name is None:
+          pos = read(buf, pos)
+        else:
+          record[name], pos = read(buf, pos)
+      for name, default in defaults:
+        record[name] = copy.deepcopy(default) if default.__class__ in (dict, list) else default
+      return record, pos
+    named[key] = read_resolved_record
+
+    reader_fields = {field.name: field for field in reader.fields}
+    writer_names = set()
+    for field in writer.fields:
+      writer_names.add(field.name)
+      target = reader_fields.get(field.name)
+      if target is None:
+        fields.append((None, _skipper(field.type, {})))
+      else:
+        fields.append((field.name, _resolving_reader(field.type, target.type, named)))
+    for field in reader.fields:
+      if field.name not in writer_names:
+        if not field.has_default:
+          raise avro.io.SchemaResolutionException(
+            "No default value for field %s" % field.name, writer, reader)
+        defaults.append((field.name, _default_value(field.type, field.default)))
+    return read_resolved_record
+
+  if wkind == "map":
+    read_value = _resolving_reader(writer.values, reader.values, named)
+
+    def read_resolved_map(buf, pos):
+      items = {}
+      count, pos = read_long(buf, pos)
+      while count:
+        if count < 0:
+          count = -count
+          _, pos = read_long(buf, pos)
+        for _ in range(count):
+          key, pos = read_utf8(buf, pos)
+          items[key], pos = read_value(buf, pos)
+        count, pos = read_long(buf, pos)
+      return items, pos
+    return read_resolved_map
+
+  if wkind == "array":
+    read_item = _resolving_reader(writer.items, reader.items, named)
+
+    def read_resolved_array(buf, pos):
+      items = []
+      append = items.append
+      count, pos = read_long(buf, pos)
+      while count:
+        if count < 0:
+          count = -count
+          _, pos = read_long(buf, pos)
+        for _ in range(count):
+          item, pos = read_item(buf, pos)
+          append(item)
+        count, pos = read_long(buf, pos)
+      return items, pos
+    return read_resolved_array
+
+  if wkind == "enum":
+    symbols = [symbol if symbol in reader.symbols else None for symbol in writer.symbols]
+    fallback = reader.props.get("default")
+
+    def read_resolved_enum(buf, pos):
+      index, pos = read_long(buf, pos)
+      symbol = symbols[index]
+      if symbol is None:
+        if fallback is None:
+          raise avro.io.SchemaResolutionException(
+            "Symbol %s is not in the reader's enum" % writer.symbols[index], writer, reader)
+        symbol = fallback
+      return symbol, pos
+    return read_resolved_enum
+
+  if wkind == "fixed" and writer.size != reader.size:
+    return _failing_reader("Fixed sizes differ", writer, reader)
+  return _reader(reader, {})
+
+
+class Resolution:
+  """Decoder reading data of a writer schema into a reader schema's shape."""
+
+  def __init__(self, writer, reader):
+    self.writer = writer
+    self.reader = reader
+    self.read = _resolving_reader(writer, reader, {})
+
+  def decode(self, data):
+    return self.read(data, 0)[0]
+
+
+_resolutions = {}
+
+
+def compile_resolution(writer, reader):
+  """Return the cached decoder of writer data as reader.
+
+  Identical schemas resolve to the plain CompiledSchema.
+  """
+  key = (fingerprint(writer), fingerprint(reader))
+  resolution = _resolutions.get(key)
+  if resolution is None:
+    if key[0] == key[1]:
+      resolution = compile_schema(reader)
+    else:
+      resolution = Resolution(writer, reader)
+    _resolutions[key] = resolution
+  return resolution
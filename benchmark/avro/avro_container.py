@@ -0,0 +1,210 @@
+"""Streaming Avro object container files.
+
+Writes and reads the standard object container format
+(https://avro.apache.org/docs/1.10.2/spec.html#Object+Container+Files) using
+the compiled encoders from avro_compiled, so events are appended one at a
+time and read back block by block: memory use is bounded by the block size,
+not by the number of events. Files are readable by avro.datafile.DataFileReader
+and vice versa.
+"""
+import binascii
+import bz2
+import lzma
+import os
+import struct
+import zlib
+
+import avro.schema
+
+import avro_compiled
+
+try:
+  import snappy
+except ImportError:
+  snappy = None
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+MAGIC = b"Obj\x01"
+SYNC_SIZE = 16
+SYNC_INTERVAL = 1000 * SYNC_SIZE  # same default block size as avro.datafile
+STRUCT_CRC32 = struct.Struct(">I")
+
+
+def _deflate(data):
+  # Raw deflate: zlib output without its 2-byte header and 4-byte checksum.
+  compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+  return compressor.compress(data) + compressor.flush()
+
+
+def _inflate(data):
+  return zlib.decompress(data, -15)
+
+
+def _snappy_compress(data):
+  return snappy.compress(data) + STRUCT_CRC32.pack(binascii.crc32(data) & 0xffffffff)
+
+
+def _snappy_decompress(data):
+  uncompressed = snappy.decompress(data[:-4])
+  if STRUCT_CRC32.unpack(data[-4:])[0] != binascii.crc32(uncompressed) & 0xffffffff:
+    raise avro.schema.AvroException("Checksum failure")
+  return uncompressed
+
+
+# codec name -> (compress, decompress)
+CODECS = {
+  "null": (bytes, bytes),
+  "deflate": (_deflate, _inflate),
+  "bzip2": (bz2.compress, bz2.decompress),
+  "xz": (lzma.compress, lzma.decompress),
+}
+if snappy is not None:
+  CODECS["snappy"] = (_snappy_compress, _snappy_decompress)
+if zstandard is not None:
+  CODECS["zstandard"] = (zstandard.ZstdCompressor().compress,
+                         lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data))
+
+
+class ContainerWriter:
+  """Appends datums to an object container file, one block per sync interval."""
+
+  def __init__(self, writer, schema, codec="null", sync_interval=SYNC_INTERVAL):
+    if codec not in CODECS:
+      raise avro.schema.AvroException("Unknown codec: %r" % codec)
+    self._writer = writer
+    self._compiled = avro_compiled.compile_schema(schema)
+    self._compress = CODECS[codec][0]
+    self._sync_interval = sync_interval
+    self._sync_marker = os.urandom(SYNC_SIZE)
+    self._buffer = bytearray()
+    self._block_count = 0
+    self.blocks_written = 0
+
+    header = bytearray(MAGIC)
+    meta = {"avro.schema": str(schema).encode("utf-8"), "avro.codec": codec.encode("utf-8")}
+    avro_compiled.write_long(header, len(meta))
+    for key, value in meta.items():
+      avro_compiled.write_utf8(header, key)
+      avro_compiled.write_bytes(header, value)
+    header.append(0)
+    header += self._sync_marker
+    writer.write(header)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, type, value, traceback):
+    if type is None:
+      self.close()
+
+  def append(self, datum):
+    self._compiled.write(self._buffer, datum)
+    self._block_count += 1
+    if len(self._buffer) >= self._sync_interval:
+      self.flush()
+
+  def flush(self):
+    if not self._block_count:
+      return
+    data = self._compress(bytes(self._buffer))
+    header = bytearray()
+    avro_compiled.write_long(header, self._block_count)
+    avro_compiled.write_long(header, len(data))
+    self._writer.write(header)
+    self._writer.write(data)
+    self._writer.write(self._sync_marker)
+    self._buffer.clear()
+    self._block_count = 0
+    self.blocks_written += 1
+
+  def close(self):
+    self.flush()
+    self._writer.flush()
+
+
+def _read_stream_long(reader, at_boundary=False):
+  # Varints are read a byte at a time; only used for headers, never per datum.
+  # Returns None on a clean end of stream when at_boundary is set.
+  n = shift = 0
+  while True:
+    byte = reader.read(1)
+    if not byte:
+      if at_boundary and not shift:
+        return None
+      raise EOFError("Truncated Avro container")
+    b = byte[0]
+    n |= (b & 0x7F) << shift
+    shift += 7
+    if not b & 0x80:
+      return (n >> 1) ^ -(n & 1)
+
+
+def _read_exactly(reader, size):
+  data = reader.read(size)
+  if len(data) != size:
+    raise EOFError("Truncated Avro container")
+  return data
+
+
+class ContainerReader:
+  """Iterates the datums of an object container file one block at a time.
+
+  The reader only needs read(), so pipes and sockets work as well as files.
+  """
+
+  def __init__(self, reader):
+    self._reader = reader
+    if _read_exactly(reader, len(MAGIC)) != MAGIC:
+      raise avro.schema.AvroException("Not an Avro data file")
+    self.meta = {}
+    count = _read_stream_long(reader)
+    while count:
+      if count < 0:
+        count = -count
+        _read_stream_long(reader)
+      for _ in range(count):
+        key = _read_exactly(reader, _read_stream_long(reader)).decode("utf-8")
+        self.meta[key] = _read_exactly(reader, _read_stream_long(reader))
+      count = _read_stream_long(reader)
+    self.sync_marker = _read_exactly(reader, SYNC_SIZE)
+
+    self.codec = self.meta.get("avro.codec", b"null").decode("utf-8")
+    if self.codec not in CODECS:
+      raise avro.schema.AvroException("Unknown codec: %s." % self.codec)
+    self._decompress = CODECS[self.codec][1]
+    self.schema = avro.schema.parse(self.meta["avro.schema"].decode("utf-8"))
+    self._compiled = avro_compiled.compile_schema(self.schema)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, type, value, traceback):
+    self.close()
+
+  def blocks(self):
+    """Yield (count, uncompressed block bytes) for each block."""
+    reader = self._reader
+    while True:
+      count = _read_stream_long(reader, at_boundary=True)
+      if count is None:
+        return
+      size = _read_stream_long(reader)
+      data = self._decompress(_read_exactly(reader, size))
+      if _read_exactly(reader, SYNC_SIZE) != self.sync_marker:
+        raise avro.schema.AvroException("Sync marker mismatch")
+      yield count, data
+
+  def __iter__(self):
+    read = self._compiled.read
+    for count, data in self.blocks():
+      pos = 0
+      for _ in range(count):
+        datum, pos = read(data, pos)
+        yield datum
+
+  def close(self):
+    self._reader.close()
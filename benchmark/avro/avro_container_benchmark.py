@@ -0,0 +1,135 @@
+"""Streaming object-container files vs the monolithic CloudEventBatch record.
+
+Every configuration runs in its own subprocess so that the reported peak RSS
+(ru_maxrss) belongs to that configuration alone. Events are drawn from a
+small pre-generated pool and cycled, so generating 1M+ events neither
+dominates the run time nor the memory high-water mark.
+
+    python3 avro_container_benchmark.py --events 1000000 --profile simple \
+        --codec null --codec deflate --sync-interval 16000 --sync-interval 1048576
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import avro_benchmark
+import avro_compiled
+import avro_container
+
+POOL_SIZE = 1000
+
+
+def event_stream(profile, count):
+  pool = avro_benchmark.AvroCodec().build_events(profile, min(POOL_SIZE, count))
+  return itertools.islice(itertools.cycle(pool), count)
+
+
+def run_monolithic(profile, count, path):
+  compiled = avro_compiled.compile_schema(avro_benchmark.schema_batch)
+  events = list(event_stream(profile, count))
+
+  start = time.perf_counter_ns()
+  with open(path, "wb") as f:
+    f.write(compiled.encode({"events": events}))
+  encode_ns = time.perf_counter_ns() - start
+  del events
+
+  start = time.perf_counter_ns()
+  with open(path, "rb") as f:
+    decoded = compiled.decode(f.read())["events"]
+  decoded_count = len(decoded)
+  decode_ns = time.perf_counter_ns() - start
+  return encode_ns, decode_ns, decoded_count
+
+
+def run_container(profile, count, path, codec, sync_interval):
+  events = event_stream(profile, count)
+
+  start = time.perf_counter_ns()
+  with open(path, "wb") as f:
+    with avro_container.ContainerWriter(f, avro_benchmark.schema_sequencial,
+                                        codec, sync_interval) as writer:
+      for event in events:
+        writer.append(event)
+  encode_ns = time.perf_counter_ns() - start
+
+  start = time.perf_counter_ns()
+  decoded_count = 0
+  with open(path, "rb") as f:
+    for _ in avro_container.ContainerReader(f):
+      decoded_count += 1
+  decode_ns = time.perf_counter_ns() - start
+  return encode_ns, decode_ns, decoded_count
+
+
+def worker(args):
+  fd, path = tempfile.mkstemp(suffix=".avro")
+  os.close(fd)
+  try:
+    if args.worker == "monolithic":
+      encode_ns, decode_ns, decoded = run_monolithic(args.profile[0], args.events, path)
+    else:
+      encode_ns, decode_ns, decoded = run_container(args.profile[0], args.events, path,
+                                                    args.worker, args.sync_interval[0])
+    size = os.path.getsize(path)
+  finally:
+    os.remove(path)
+  assert decoded == args.events, (decoded, args.events)
+  print(json.dumps({
+    "encode_ns": encode_ns,
+    "decode_ns": decode_ns,
+    "size_bytes": size,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+  }))
+
+
+def run_isolated(kind, profile, count, sync_interval):
+  command = [sys.executable, os.path.abspath(__file__), "--worker", kind,
+             "--profile", profile, "--events", str(count),
+             "--sync-interval", str(sync_interval)]
+  output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+  return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--events", type=int, default=1000000)
+  parser.add_argument("--profile", action="append", choices=avro_benchmark.corpus.PROFILES)
+  parser.add_argument("--codec", action="append", choices=sorted(avro_container.CODECS),
+                      help="container block codec (repeatable, default: all available)")
+  parser.add_argument("--sync-interval", action="append", type=int,
+                      help="container block size in bytes (repeatable)")
+  parser.add_argument("--worker", help=argparse.SUPPRESS)
+  args = parser.parse_args(argv)
+  args.profile = args.profile or ["simple"]
+  args.sync_interval = args.sync_interval or [avro_container.SYNC_INTERVAL]
+
+  if args.worker:
+    worker(args)
+    return
+
+  header = (f"{'format':<22} {'profile':<8} {'events':>9} {'size MB':>9} "
+            f"{'encode ev/s':>12} {'decode ev/s':>12} {'peak RSS MB':>12}")
+  print(header)
+  print("-" * len(header))
+  scenarios = [("monolithic", None)]
+  scenarios += itertools.product(args.codec or sorted(avro_container.CODECS), args.sync_interval)
+  for profile in args.profile:
+    for kind, sync_interval in scenarios:
+      result = run_isolated(kind, profile, args.events, sync_interval or avro_container.SYNC_INTERVAL)
+      label = kind if sync_interval is None else f"{kind}/{sync_interval}"
+      print(f"{label:<22} {profile:<8} {args.events:>9} "
+            f"{result['size_bytes'] / 2 ** 20:>9.2f} "
+            f"{args.events / (result['encode_ns'] / 1e9):>12.0f} "
+            f"{args.events / (result['decode_ns'] / 1e9):>12.0f} "
+            f"{result['max_rss_kb'] / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,86 @@
+"""Dictionary-encoded CloudEvent batches.
+
+The plain batch writes "source", "type", "specversion", "datacontenttype"
+and every attribute key again for each event. This variant puts the
+strings of a batch in a table at its head and lets events refer to them by
+index: attribute keys always, attribute string values when they occur more
+than once in the batch (unique values such as ids are cheaper inline).
+
+    DictionaryCloudEventBatch {
+      strings: array<string>
+      events: array<DictionaryCloudEvent {
+        attribute: array<{key: int, value: [null, boolean, int, string, bytes, StringRef {index: int}]}>
+        data: <the CloudEvent data type>
+      }>
+    }
+
+Decoding hands back events in the usual {"attribute", "data"} shape whose
+keys and repeated values are the interned strings of the table, one object
+per distinct string instead of one per event.
+"""
+import collections
+import json
+import sys
+
+import avro.schema
+
+
+def batch_schema(event_schema):
+  """The dictionary batch schema for events of event_schema (CloudEvent)."""
+  data_type = next(field["type"] for field in event_schema.to_json()["fields"] if field["name"] == "data")
+  string_ref = {"type": "record", "name": "StringRef", "fields": [{"name": "index", "type": "int"}]}
+  attribute = {
+    "type": "record",
+    "name": "DictionaryAttribute",
+    "fields": [
+      {"name": "key", "type": "int"},
+      {"name": "value", "type": ["null", "boolean", "int", "string", "bytes", string_ref]},
+    ],
+  }
+  event = {
+    "type": "record",
+    "name": "DictionaryCloudEvent",
+    "fields": [
+      {"name": "attribute", "type": {"type": "array", "items": attribute}},
+      {"name": "data", "type": data_type},
+    ],
+  }
+  return avro.schema.parse(json.dumps({
+    "namespace": "io.cloudevents",
+    "type": "record",
+    "name": "DictionaryCloudEventBatch",
+    "fields": [
+      {"name": "strings", "type": {"type": "array", "items": "string"}},
+      {"name": "events", "type": {"type": "array", "items": event}},
+    ],
+  }))
+
+
+def to_batch(events):
+  """Turn CloudEvent records into a DictionaryCloudEventBatch datum."""
+  repeated = collections.Counter(
+    value for event in events for value in event["attribute"].values() if isinstance(value, str))
+  table = {}
+  encoded = []
+  for event in events:
+    attribute = []
+    for key, value in event["attribute"].items():
+      if isinstance(value, str) and repeated[value] > 1:
+        value = {"index": table.setdefault(value, len(table))}
+      attribute.append({"key": table.setdefault(key, len(table)), "value": value})
+    encoded.append({"attribute": attribute, "data": event["data"]})
+  return {"strings": list(table), "events": encoded}
+
+
+def from_batch(batch):
+  """Turn a decoded DictionaryCloudEventBatch datum back into CloudEvent records."""
+  strings = [sys.intern(string) for string in batch["strings"]]
+  events = []
+  for event in batch["events"]:
+    attribute = {}
+    for entry in event["attribute"]:
+      value = entry["value"]
+      # Only StringRef decodes to a dict; no other branch of the union does.
+      attribute[strings[entry["key"]]] = strings[value["index"]] if type(value) is dict else value
+    events.append({"attribute": attribute, "data": event["data"]})
+  return events
@@ -0,0 +1,128 @@
+"""CloudEvent schema versions and mixed-version single-object streams.
+
+In production producers and consumers run different versions of the event
+schema. Here the versions are the CloudEvent record of cloudevents.avsc
+plus the large-profile extension attributes promoted to typed, optional
+record fields, one release at a time:
+
+    1   the attribute map only
+    2   + priority: int
+    3   + region: string
+    4   + checksum: bytes
+
+A producer on version n moves those attributes out of the map into the
+fields. Every message is written in Avro single-object encoding (0xC3 0x01,
+the writer schema's 8-byte fingerprint, the datum), so a consumer can tell
+which schema wrote it. ResolvingDecoder reads any registered writer version
+into its reader schema through avro_compiled.compile_resolution(), which
+builds each (writer, reader) decoding plan once.
+"""
+import io
+import json
+
+import avro.io
+import avro.schema
+
+import avro_benchmark
+import avro_compiled
+
+SINGLE_OBJECT_MAGIC = b"\xc3\x01"
+HEADER_SIZE = len(SINGLE_OBJECT_MAGIC) + 8
+
+# version -> [(field name, type)] added to the CloudEvent record
+VERSIONS = {
+  1: [],
+  2: [("priority", "int")],
+  3: [("priority", "int"), ("region", "string")],
+  4: [("priority", "int"), ("region", "string"), ("checksum", "bytes")],
+}
+LATEST = max(VERSIONS)
+
+_schemas = {}
+
+
+def schema_version(version):
+  """The CloudEvent schema of a version; extension fields default to null."""
+  schema = _schemas.get(version)
+  if schema is None:
+    base = avro_benchmark.schema_sequencial.to_json()
+    fields = base["fields"] + [{"name": name, "type": ["null", kind], "default": None}
+                               for name, kind in VERSIONS[version]]
+    schema = _schemas[version] = avro.schema.parse(json.dumps(dict(base, fields=fields)))
+  return schema
+
+
+def to_version(record, version):
+  """A CloudEvent record as a version-n producer writes it."""
+  if not VERSIONS[version]:
+    return record
+  attribute = dict(record["attribute"])
+  record = dict(record, attribute=attribute)
+  for name, _ in VERSIONS[version]:
+    record[name] = attribute.pop(name, None)
+  return record
+
+
+class SingleObjectWriter:
+  """Encodes datums of one schema with the single-object header."""
+
+  def __init__(self, schema):
+    self.compiled = avro_compiled.compile_schema(schema)
+    self.header = SINGLE_OBJECT_MAGIC + self.compiled.fingerprint
+
+  def encode(self, datum):
+    buf = bytearray(self.header)
+    self.compiled.write(buf, datum)
+    return bytes(buf)
+
+
+def writer_fingerprint(data):
+  if data[:2] != SINGLE_OBJECT_MAGIC:
+    raise avro.schema.AvroException("Not an Avro single-object encoded message")
+  return bytes(data[2:HEADER_SIZE])
+
+
+class ResolvingDecoder:
+  """Decodes single-object messages of any registered writer schema into
+  the reader schema."""
+
+  def __init__(self, reader, writers=()):
+    self.reader = reader
+    self.writers = {}  # writer fingerprint -> schema
+    self._plans = {}   # writer fingerprint -> compiled resolution
+    for writer in writers:
+      self.register(writer)
+
+  def register(self, writer):
+    self.writers[avro_compiled.fingerprint(writer)] = writer
+
+  def decode(self, data):
+    plan = self._plans.get(bytes(data[2:HEADER_SIZE]))
+    if plan is None or data[:2] != SINGLE_OBJECT_MAGIC:
+      key = writer_fingerprint(data)
+      writer = self.writers.get(key)
+      if writer is None:
+        raise avro.schema.AvroException("Unknown writer schema fingerprint %s" % key.hex())
+      plan = self._plans[key] = avro_compiled.compile_resolution(writer, self.reader)
+    return plan.read(data, HEADER_SIZE)[0]
+
+
+class ReferenceResolvingDecoder:
+  """The same with avro-python3: DatumReader(writer, reader) resolves while
+  it reads. cache=False builds a DatumReader per message, as code that
+  looks the writer schema up for every message does."""
+
+  def __init__(self, reader, writers=(), cache=True):
+    self.reader = reader
+    self.writers = {avro_compiled.fingerprint(writer): writer for writer in writers}
+    self.cache = cache
+    self._readers = {}
+
+  def decode(self, data):
+    key = writer_fingerprint(data)
+    datum_reader = self._readers.get(key) if self.cache else None
+    if datum_reader is None:
+      datum_reader = avro.io.DatumReader(self.writers[key], self.reader)
+      if self.cache:
+        self._readers[key] = datum_reader
+    return datum_reader.read(avro.io.BinaryDecoder(io.BytesIO(data[HEADER_SIZE:])))
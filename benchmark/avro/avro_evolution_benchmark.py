@@ -0,0 +1,96 @@
+"""Decoding a mixed-version CloudEvent stream into the latest schema.
+
+Every event of the stream is written by a producer on a randomly drawn
+schema version (avro_evolution.VERSIONS) in single-object encoding, and
+read back into the reader version with
+
+    datumreader          avro-python3, a DatumReader(writer, reader) per message
+    datumreader-cached   avro-python3, one DatumReader per writer schema
+    compiled             avro_evolution.ResolvingDecoder: compiled plans cached
+                         by (writer fingerprint, reader fingerprint)
+
+The compiled output is checked against avro-python3's before timing. The
+one-off cost of building a plan is reported separately.
+
+    python3 avro_evolution_benchmark.py --events 10000 --version 1 --version 4
+"""
+import argparse
+import random
+import statistics
+import time
+
+import avro_benchmark
+import avro_compiled
+import avro_evolution
+
+DECODERS = ("datumreader", "datumreader-cached", "compiled")
+
+
+def mixed_stream(profile, count, versions, seed):
+  rng = random.Random(seed)
+  writers = {version: avro_evolution.SingleObjectWriter(avro_evolution.schema_version(version))
+             for version in versions}
+  stream = []
+  for record in avro_benchmark.AvroCodec().build_events(profile, count, seed):
+    version = rng.choice(versions)
+    stream.append(writers[version].encode(avro_evolution.to_version(record, version)))
+  return stream
+
+
+def decoder(name, reader, writers):
+  if name == "compiled":
+    return avro_evolution.ResolvingDecoder(reader, writers)
+  return avro_evolution.ReferenceResolvingDecoder(reader, writers, cache=name == "datumreader-cached")
+
+
+def plan_cost(reader, writers):
+  """Median ns to build a compiled resolution plan, bypassing the cache."""
+  samples = []
+  for writer in writers:
+    start = time.perf_counter_ns()
+    avro_compiled.Resolution(writer, reader)
+    samples.append(time.perf_counter_ns() - start)
+  return statistics.median(samples)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--decoder", action="append", choices=DECODERS)
+  parser.add_argument("--version", action="append", type=int, choices=sorted(avro_evolution.VERSIONS),
+                      help="writer versions in the stream (repeatable, default: all)")
+  parser.add_argument("--reader-version", type=int, default=avro_evolution.LATEST,
+                      choices=sorted(avro_evolution.VERSIONS))
+  parser.add_argument("--profile", action="append", choices=avro_benchmark.corpus.PROFILES)
+  parser.add_argument("--events", type=int, default=10000)
+  parser.add_argument("--repetitions", type=int, default=3)
+  parser.add_argument("--seed", type=int, default=avro_benchmark.corpus.DEFAULT_SEED)
+  args = parser.parse_args(argv)
+  versions = sorted(set(args.version or avro_evolution.VERSIONS))
+  reader = avro_evolution.schema_version(args.reader_version)
+  writers = [avro_evolution.schema_version(version) for version in versions]
+  print(f"writer versions {versions}, reader version {args.reader_version}, "
+        f"compiled plan built in {plan_cost(reader, writers) / 1e6:.2f} ms")
+
+  header = f"{'decoder':<20} {'profile':<8} {'events':>8} {'us/event':>9} {'events/s':>10}"
+  print(header)
+  print("-" * len(header))
+  for profile in args.profile or ["large"]:
+    stream = mixed_stream(profile, args.events, versions, args.seed)
+    expected = [avro_evolution.ReferenceResolvingDecoder(reader, writers).decode(data) for data in stream]
+    for name in args.decoder or DECODERS:
+      decode = decoder(name, reader, writers).decode
+      if name == "compiled" and [decode(data) for data in stream] != expected:
+        raise AssertionError("compiled resolution differs from avro-python3")
+      timings = []
+      for _ in range(args.repetitions + 1):  # the first pass is warmup
+        start = time.perf_counter_ns()
+        for data in stream:
+          decode(data)
+        timings.append(time.perf_counter_ns() - start)
+      elapsed = statistics.median(timings[1:])
+      print(f"{name:<20} {profile:<8} {args.events:>8} {elapsed / args.events / 1000:>9.2f} "
+            f"{args.events / (elapsed / 1e9):>10.0f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,112 @@
+"""Decode speed and resident memory of dict trees versus slotted CloudEvents.
+
+A batch of events is decoded into
+
+    dict        avro_compiled records, the DatumReader shape
+    slotted     avro_slotted.CloudEvent objects, data left encoded
+    slotted-data  the same, then event.data read on every event
+
+and the decoded events are kept alive. Each decoder runs in its own
+interpreter (see memory.py), so the resident memory it reports is what the
+events hold and nothing left over from another decoder; it is scaled to a
+million events and compared with the wire size of the batch.
+
+    python3 avro_slotted_benchmark.py --profile large --events 100000
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import avro_benchmark
+import memory
+
+DECODERS = ("dict", "slotted", "slotted-data")
+
+
+def decode_function(name):
+  if name == "dict":
+    return avro_benchmark.AvroCompiledCodec().decode_batch
+  codec = avro_benchmark.AvroSlottedCodec()
+  if name == "slotted":
+    return codec.decode_batch
+
+  def decode_and_expand(data):
+    events = codec.decode_batch(data)
+    for event in events:
+      event.data
+    return events
+  return decode_and_expand
+
+
+def worker(name, profile, count, repetitions, seed):
+  decode = decode_function(name)
+  codec = avro_benchmark.AvroCompiledCodec()
+  data = codec.encode_batch(codec.build_events(profile, count, seed))
+  decode(codec.encode_batch(codec.build_events(profile, 1, seed)))  # warmup
+
+  gc.collect()
+  baseline = memory.current_rss()
+  start = time.perf_counter_ns()
+  events = decode(data)
+  timings = [time.perf_counter_ns() - start]
+  retained = memory.current_rss() - baseline
+  deep, objects = memory.deep_size(events)
+  del events
+  for _ in range(repetitions - 1):
+    start = time.perf_counter_ns()
+    decode(data)
+    timings.append(time.perf_counter_ns() - start)
+  return {
+    "decode_ns": statistics.median(timings),
+    "wire_bytes": len(data),
+    "retained_rss": retained,
+    "deep_bytes": deep,
+    "objects": objects,
+  }
+
+
+def run_isolated(name, profile, count, repetitions, seed):
+  spec = json.dumps([name, profile, count, repetitions, seed])
+  command = [sys.executable, os.path.abspath(__file__), "--worker", spec]
+  output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+  return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--decoder", action="append", choices=DECODERS)
+  parser.add_argument("--profile", action="append", choices=avro_benchmark.corpus.PROFILES)
+  parser.add_argument("--events", type=int, default=100000)
+  parser.add_argument("--repetitions", type=int, default=3)
+  parser.add_argument("--seed", type=int, default=avro_benchmark.corpus.DEFAULT_SEED)
+  parser.add_argument("--worker", help=argparse.SUPPRESS)
+  args = parser.parse_args(argv)
+
+  if args.worker:
+    print(json.dumps(worker(*json.loads(args.worker))))
+    return
+
+  per_million = 1e6 / args.events
+  header = (f"{'decoder':<13} {'profile':<8} {'events':>8} {'us/event':>9} {'events/s':>10} "
+            f"{'RSS MB/1M':>10} {'deep MB/1M':>10} {'objects/ev':>10} {'x wire':>7}")
+  print(header)
+  print("-" * len(header))
+  for profile in args.profile or ["large"]:
+    for name in args.decoder or DECODERS:
+      result = run_isolated(name, profile, args.events, args.repetitions, args.seed)
+      print(f"{name:<13} {profile:<8} {args.events:>8} "
+            f"{result['decode_ns'] / args.events / 1000:>9.2f} "
+            f"{args.events / (result['decode_ns'] / 1e9):>10.0f} "
+            f"{result['retained_rss'] * per_million / 2 ** 20:>10.0f} "
+            f"{result['deep_bytes'] * per_million / 2 ** 20:>10.0f} "
+            f"{result['objects'] / args.events:>10.1f} "
+            f"{result['retained_rss'] / result['wire_bytes']:>7.1f}")
+
+
+if __name__ == "__main__":
+  main()
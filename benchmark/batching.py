@@ -0,0 +1,203 @@
+"""Batch-size sweep and an adaptive batcher that holds a p99 latency target.
+
+Harness batch mode puts all events in one batch and sequential mode sends
+them one at a time. The sweep covers the sizes in between: the events are
+split into batches of 1, 2, 4, ... --max-batch events, and every batch is
+timed through encode_batch() + decode_batch(), giving events/s, bytes per
+event and the per-batch latency distribution for each size.
+
+AdaptiveBatcher picks the batch size at run time instead. After every batch
+the caller reports the batch's latency. Once a window of samples is in, the
+batcher backs off multiplicatively if their p99 is over the target and
+grows toward the size the target allows if there is headroom.
+
+    python3 batching.py --codec avro-compiled --codec protobuf --max-batch 4096 \
+        --target-p99-ms 5 --rate 50000
+
+With --rate, a batch's latency includes the time its first event waited for
+the batch to fill at that arrival rate, which is what bounds batch size in
+a producer.
+"""
+import argparse
+import collections
+import math
+import statistics
+import time
+
+import corpus
+import harness
+import results as results_file
+
+
+class AdaptiveBatcher:
+    """Chooses batch sizes that keep the p99 batch latency under a target.
+
+        batcher = AdaptiveBatcher(target_p99_ns=5_000_000)
+        for batch in batcher.batches(events):
+            start = time.perf_counter_ns()
+            send(batch)
+            batcher.observe(len(batch), time.perf_counter_ns() - start)
+    """
+
+    def __init__(self, target_p99_ns, initial=1, minimum=1, maximum=1 << 16,
+                 window=20, growth=2.0, backoff=0.5, headroom=0.8):
+        self.target_p99_ns = target_p99_ns
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = window
+        self.growth = growth
+        self.backoff = backoff
+        self.headroom = headroom
+        self.samples = collections.deque(maxlen=window)
+        self.history = []  # (batch size, p99 ns) at every decision
+
+    def p99(self):
+        return harness.percentile(sorted(self.samples), 99)
+
+    def observe(self, size, latency_ns):
+        """Report one batch; may change self.size for the next one."""
+        if size != self.size:
+            return  # a short final batch says nothing about self.size
+        self.samples.append(latency_ns)
+        if len(self.samples) < self.window:
+            return
+        p99 = self.p99()
+        self.history.append((self.size, p99))
+        if p99 > self.target_p99_ns:
+            self._resize(math.floor(self.size * self.backoff))
+        elif p99 < self.target_p99_ns * self.headroom:
+            # Latency grows about linearly with size: aim for the headroom
+            # line, but never more than one growth step at a time.
+            factor = min(self.growth, self.target_p99_ns * self.headroom / max(p99, 1))
+            self._resize(math.ceil(self.size * factor))
+        else:
+            self.samples.clear()  # in the band: keep the size, start a fresh window
+
+    def _resize(self, size):
+        self.size = max(self.minimum, min(self.maximum, size))
+        self.samples.clear()
+
+    def batches(self, events):
+        """Split a sequence into batches of the current size."""
+        position = 0
+        while position < len(events):
+            batch = events[position:position + self.size]
+            position += len(batch)
+            yield batch
+
+
+def process(codec, batch):
+    data = codec.encode_batch(batch)
+    codec.decode_batch(data)
+    return len(data)
+
+
+def fill_ns(size, rate):
+    """How long the first event of a batch waits for the rest at rate events/s."""
+    return (size - 1) / rate * 1e9 if rate else 0
+
+
+def sweep(codec, events, sizes, repetitions, rate=0):
+    """{size: (events/s, bytes per event, p50 ns, p99 ns)}; latencies include fill time."""
+    clock = time.perf_counter_ns
+    results = {}
+    for size in sizes:
+        batches = [events[i:i + size] for i in range(0, len(events), size)]
+        for batch in batches[:max(1, len(batches) // 10)]:  # warmup
+            process(codec, batch)
+        latencies, totals = [], []
+        for _ in range(repetitions):
+            total_bytes = 0
+            rep_start = clock()
+            for batch in batches:
+                start = clock()
+                total_bytes += process(codec, batch)
+                latencies.append(clock() - start + fill_ns(len(batch), rate))
+            totals.append(clock() - rep_start)
+        latencies.sort()
+        results[size] = (len(events) / (statistics.median(totals) / 1e9), total_bytes / len(events),
+                         harness.percentile(latencies, 50), harness.percentile(latencies, 99))
+    return results
+
+
+def run_adaptive(codec, events, batcher, count, rate=0):
+    """Push count events (cycling events) through the batcher; returns
+    (events/s, p99 ns of the final window, final size)."""
+    clock = time.perf_counter_ns
+    stream = [events[i % len(events)] for i in range(count)]
+    latencies = []
+    start = clock()
+    for batch in batcher.batches(stream):
+        batch_start = clock()
+        process(codec, batch)
+        latency = clock() - batch_start + fill_ns(len(batch), rate)
+        latencies.append(latency)
+        batcher.observe(len(batch), latency)
+    elapsed = clock() - start
+    recent = sorted(latencies[-batcher.window:])
+    return count / (elapsed / 1e9), harness.percentile(recent, 99), batcher.size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CloudEvent batch-size sweep and adaptive batching")
+    parser.add_argument("--codec", action="append", choices=sorted(harness.CODECS))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=8192)
+    parser.add_argument("--max-batch", type=int, default=4096,
+                        help="largest batch size of the sweep (powers of two from 1)")
+    parser.add_argument("--batch-size", action="append", type=int,
+                        help="sweep exactly these sizes instead (repeatable)")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=0,
+                        help="arrival rate in events/s; adds batch fill time to latency (0 = none)")
+    parser.add_argument("--target-p99-ms", type=float,
+                        help="also run the adaptive batcher against this p99 batch latency")
+    parser.add_argument("--adaptive-events", type=int, default=200000,
+                        help="events pushed through the adaptive batcher")
+    parser.add_argument("--seed", type=int, default=corpus.DEFAULT_SEED)
+    parser.add_argument("--output", metavar="PATH", help="also write the rows as JSON")
+    args = parser.parse_args(argv)
+    sizes = sorted(args.batch_size or [1 << i for i in range(args.max_batch.bit_length())
+                                       if 1 << i <= args.max_batch])
+
+    header = (f"{'codec':<14} {'profile':<8} {'batch':>7} {'events/s':>10} {'B/event':>9} "
+              f"{'p50 ms':>9} {'p99 ms':>9}")
+    print(header)
+    print("-" * len(header))
+    rows = []
+    adaptive = []
+    for codec_name in args.codec or ["avro-compiled", "protobuf"]:
+        codec = harness.load_codec(codec_name)
+        for profile in args.profile or harness.PROFILES:
+            events = codec.build_events(profile, args.events, args.seed)
+            for size, (rate, per_event, p50, p99) in sweep(codec, events, sizes, args.repetitions,
+                                                           args.rate).items():
+                rows.append({"codec": codec_name, "profile": profile, "batch": size,
+                             "events": args.events, "events_per_s": rate, "bytes_per_event": per_event,
+                             "p50_ns": p50, "p99_ns": p99})
+                print(f"{codec_name:<14} {profile:<8} {size:>7} {rate:>10.0f} {per_event:>9.1f} "
+                      f"{p50 / 1e6:>9.3f} {p99 / 1e6:>9.3f}")
+            if args.target_p99_ms:
+                batcher = AdaptiveBatcher(args.target_p99_ms * 1e6, maximum=max(sizes))
+                adaptive.append((codec_name, profile) + run_adaptive(
+                    codec, events, batcher, args.adaptive_events, args.rate))
+
+    if adaptive:
+        print()
+        header = (f"{'codec':<14} {'profile':<8} {'target ms':>9} {'final batch':>11} "
+                  f"{'events/s':>10} {'p99 ms':>9}")
+        print(header)
+        print("-" * len(header))
+        for codec_name, profile, rate, p99, size in adaptive:
+            print(f"{codec_name:<14} {profile:<8} {args.target_p99_ms:>9g} {size:>11} "
+                  f"{rate:>10.0f} {p99 / 1e6:>9.3f}")
+            rows.append({"codec": codec_name, "profile": profile, "adaptive": True,
+                         "target_p99_ms": args.target_p99_ms, "batch": size,
+                         "events": args.adaptive_events, "events_per_s": rate, "p99_ns": p99})
+    if args.output:
+        results_file.write(args.output, rows, args, tool="batching")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""Local, file-backed log broker stand-in for produce/consume benchmarks.
+
+Harness batch mode puts every event into one batch. A real producer batches
+by size and by time before appending to a partitioned log, and that choice
+interacts with the serialization format. This module models that path on
+the local disk:
+
+  - LogBroker: a topic of N partitions, each a directory of append-only
+    segment files (<base offset>.log, rolled at --segment-bytes). A record
+    batch is written in one write(): a header (base offset, event count,
+    payload length), the per-event create timestamps and the codec's
+    encode_batch() bytes. Consumer group offsets are kept in
+    offsets-<group>.json.
+  - Producer: accumulates events per partition (keyed by event id) and
+    appends a batch when its estimated encoded size reaches batch_bytes or
+    its oldest event has waited linger_ms, like Kafka's batch.size and
+    linger.ms.
+  - Consumer: fetches batches from its committed offsets, decodes them with
+    decode_batch() and commits.
+
+A producer thread offers events (at --rate, or flat out) while a consumer
+thread reads them back; the benchmark reports produce and consume
+throughput, end-to-end latency from an event's scheduled arrival to its
+decode, and the batches that resulted:
+
+    python3 broker.py --codec avro-compiled --codec protobuf --profile simple \
+        --linger-ms 0 --linger-ms 5 --batch-bytes 16384 --batch-bytes 262144 --rate 20000
+"""
+import argparse
+import array
+import bisect
+import json
+import os
+import shutil
+import statistics
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+import harness
+import results as results_file
+
+BATCH_HEADER = struct.Struct("<QII")  # base offset, event count, payload length
+SEGMENT_SUFFIX = ".log"
+
+
+def segment_name(base_offset):
+    return f"{base_offset:020d}{SEGMENT_SUFFIX}"
+
+
+class Partition:
+    """One partition: its segment files and an in-memory batch index."""
+
+    def __init__(self, directory, segment_bytes):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        self.segments = []      # [base offset, read fd, size]
+        self.batches = []       # base offset of every batch, ascending
+        self.locations = []     # (segment index, position) of every batch
+        self.next_offset = 0
+        self._writer = None
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(SEGMENT_SUFFIX):
+                self._recover(int(name[:-len(SEGMENT_SUFFIX)]))
+        if self.segments:
+            # Appends go to the last segment; the others are only read.
+            self._writer = open(self._path(self.segments[-1][0]), "ab", buffering=0)
+
+    def _path(self, base_offset):
+        return os.path.join(self.directory, segment_name(base_offset))
+
+    def _open_segment(self, base_offset):
+        path = self._path(base_offset)
+        self._writer = open(path, "ab", buffering=0)
+        self.segments.append([base_offset, os.open(path, os.O_RDONLY), os.path.getsize(path)])
+
+    def _recover(self, base_offset):
+        """Index the batches of an existing segment; a torn tail is cut off."""
+        path = self._path(base_offset)
+        self.segments.append([base_offset, os.open(path, os.O_RDONLY), os.path.getsize(path)])
+        segment = self.segments[-1]
+        fd, size = segment[1], segment[2]
+        position = 0
+        while position + BATCH_HEADER.size <= size:
+            offset, count, length = BATCH_HEADER.unpack(os.pread(fd, BATCH_HEADER.size, position))
+            end = position + BATCH_HEADER.size + 8 * count + length
+            if end > size:
+                break
+            self.batches.append(offset)
+            self.locations.append((len(self.segments) - 1, position))
+            self.next_offset = offset + count
+            position = end
+        if position != size:
+            os.truncate(path, position)
+            segment[2] = position
+
+    def append(self, payload, timestamps):
+        """Append one record batch; returns its base offset."""
+        with self.lock:
+            if not self.segments or self.segments[-1][2] >= self.segment_bytes:
+                if self._writer is not None:
+                    self._writer.close()
+                self._open_segment(self.next_offset)
+            base_offset = self.next_offset
+            segment = self.segments[-1]
+            record = (BATCH_HEADER.pack(base_offset, len(timestamps), len(payload))
+                      + timestamps.tobytes() + payload)
+            self._writer.write(record)
+            self.locations.append((len(self.segments) - 1, segment[2]))
+            self.batches.append(base_offset)  # last: readers check batches first
+            segment[2] += len(record)
+            self.next_offset = base_offset + len(timestamps)
+            return base_offset
+
+    def fetch(self, offset, max_bytes):
+        """Record batches holding offset and after, up to about max_bytes
+        (at least one): a list of (base offset, timestamps, payload)."""
+        batches = self.batches
+        index = bisect.bisect_right(batches, offset) - 1
+        index = max(index, 0)
+        result, total = [], 0
+        while index < len(batches) and (not result or total < max_bytes):
+            segment_index, position = self.locations[index]
+            fd = self.segments[segment_index][1]
+            base_offset, count, length = BATCH_HEADER.unpack(os.pread(fd, BATCH_HEADER.size, position))
+            body = os.pread(fd, 8 * count + length, position + BATCH_HEADER.size)
+            if base_offset + count > offset:
+                timestamps = array.array("q")
+                timestamps.frombytes(body[:8 * count])
+                result.append((base_offset, timestamps, body[8 * count:]))
+                total += len(body)
+            index += 1
+        return result
+
+    def size(self):
+        return sum(segment[2] for segment in self.segments)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        for segment in self.segments:
+            os.close(segment[1])
+
+
+class LogBroker:
+    """A single topic of partitioned append-only logs under directory."""
+
+    def __init__(self, directory, partitions=1, segment_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.partitions = [Partition(os.path.join(directory, f"partition-{i}"), segment_bytes)
+                           for i in range(partitions)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def partition_for(self, key):
+        return zlib.crc32(key.encode()) % len(self.partitions)
+
+    def append(self, partition, payload, timestamps):
+        return self.partitions[partition].append(payload, timestamps)
+
+    def fetch(self, partition, offset, max_bytes=1024 * 1024):
+        return self.partitions[partition].fetch(offset, max_bytes)
+
+    def end_offset(self, partition):
+        return self.partitions[partition].next_offset
+
+    def _offsets_path(self, group):
+        return os.path.join(self.directory, f"offsets-{group}.json")
+
+    def committed(self, group):
+        """{partition: next offset to consume} of a consumer group."""
+        try:
+            with open(self._offsets_path(group)) as f:
+                return {int(partition): offset for partition, offset in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+
+    def commit(self, group, offsets):
+        path = self._offsets_path(group)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({str(partition): offset for partition, offset in offsets.items()}, f)
+        os.replace(tmp, path)  # atomic, a crash never leaves half a file
+
+    def size(self):
+        return sum(partition.size() for partition in self.partitions)
+
+    def close(self):
+        for partition in self.partitions:
+            partition.close()
+
+
+class Producer:
+    """Batching producer: size- and linger-bound batches per partition.
+
+    The encoded size of a pending batch is estimated from the bytes per
+    event of the batches sent so far (the first event is encoded once to
+    seed the estimate), so batching does not encode every event twice.
+    """
+
+    def __init__(self, broker, codec, linger_ms=0.0, batch_bytes=16384, clock=time.perf_counter_ns):
+        self.broker = broker
+        self.codec = codec
+        self.linger_ns = int(linger_ms * 1e6)
+        self.batch_bytes = batch_bytes
+        self.clock = clock
+        self.pending = {}  # partition -> (events, timestamps)
+        self.batch_sizes = []
+        self._bytes_per_event = None
+        self._sent_bytes = self._sent_events = 0
+
+    def send(self, event, timestamp=None):
+        """Queue an event; timestamp is its create time (default: now)."""
+        if self._bytes_per_event is None:
+            self._bytes_per_event = len(self.codec.encode(event))
+        partition = self.broker.partition_for(self.codec.event_id(event))
+        pending = self.pending.get(partition)
+        if pending is None:
+            pending = self.pending[partition] = ([], array.array("q"))
+        events, timestamps = pending
+        events.append(event)
+        timestamps.append(self.clock() if timestamp is None else timestamp)
+        if len(events) * self._bytes_per_event >= self.batch_bytes:
+            self._send(partition)
+        self.poll()
+
+    def _send(self, partition):
+        events, timestamps = self.pending.pop(partition)
+        payload = self.codec.encode_batch(events)
+        self.broker.append(partition, payload, timestamps)
+        self.batch_sizes.append(len(events))
+        self._sent_bytes += len(payload)
+        self._sent_events += len(events)
+        self._bytes_per_event = self._sent_bytes / self._sent_events
+
+    def deadline(self):
+        """When the oldest pending batch's linger expires, or None."""
+        if not self.pending:
+            return None
+        return min(timestamps[0] for _, timestamps in self.pending.values()) + self.linger_ns
+
+    def poll(self):
+        """Send every batch whose linger has expired."""
+        if not self.pending:
+            return
+        now = self.clock()
+        for partition in [p for p, (_, timestamps) in self.pending.items()
+                          if now - timestamps[0] >= self.linger_ns]:
+            self._send(partition)
+
+    def flush(self):
+        for partition in list(self.pending):
+            self._send(partition)
+
+
+class Consumer:
+    """Reads every partition of the broker from a group's committed offsets."""
+
+    def __init__(self, broker, codec, group="benchmark", max_bytes=1024 * 1024):
+        self.broker = broker
+        self.codec = codec
+        self.group = group
+        self.max_bytes = max_bytes
+        committed = broker.committed(group)
+        self.positions = {partition: committed.get(partition, 0)
+                          for partition in range(len(broker.partitions))}
+
+    def poll(self):
+        """Fetch and decode what is available: a list of (events, timestamps)."""
+        result = []
+        for partition, position in self.positions.items():
+            if position >= self.broker.end_offset(partition):
+                continue
+            for base_offset, timestamps, payload in self.broker.fetch(partition, position, self.max_bytes):
+                events = self.codec.decode_batch(payload)
+                skip = position - base_offset if position > base_offset else 0
+                result.append((events[skip:], timestamps[skip:]))
+                position = base_offset + len(timestamps)
+            self.positions[partition] = position
+        return result
+
+    def commit(self):
+        self.broker.commit(self.group, self.positions)
+
+
+def run(codec, events, count, directory, partitions=1, linger_ms=0.0, batch_bytes=16384,
+        rate=0, segment_bytes=64 * 1024 * 1024):
+    """Produce count events (cycling events) while a consumer thread reads them.
+
+    Returns (produce seconds, consume seconds, latencies ns, batch sizes, bytes on disk).
+    """
+    clock = time.perf_counter_ns
+    with LogBroker(directory, partitions, segment_bytes) as broker:
+        producer = Producer(broker, codec, linger_ms, batch_bytes, clock)
+        consumer = Consumer(broker, codec)
+        latencies = []
+        consumed_at = []
+        errors = []
+        # Set once the producer has finished or failed: the consumer then stops
+        # when the log is drained instead of waiting for events that never come.
+        stopped = threading.Event()
+
+        def consume():
+            received = 0
+            try:
+                while received < count:
+                    drained = stopped.is_set()  # before the poll: nothing is appended after it
+                    batches = consumer.poll()
+                    if not batches:
+                        if drained:
+                            return
+                        time.sleep(0.0002)
+                        continue
+                    for decoded, timestamps in batches:
+                        now = clock()
+                        latencies.extend(now - created for created in timestamps)
+                        received += len(decoded)
+                    consumer.commit()
+                consumed_at.append(clock())
+            except Exception as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=consume)
+        interval = 1e9 / rate if rate else 0
+        start = clock()
+        thread.start()
+        try:
+            produced_at = produce(producer, events, count, start, interval, clock)
+        finally:
+            stopped.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+        return ((produced_at - start) / 1e9, (consumed_at[0] - start) / 1e9,
+                latencies, producer.batch_sizes, broker.size())
+
+
+def produce(producer, events, count, start, interval, clock):
+    """Send count events, one per interval ns if interval is set; returns the
+    clock once the last batch is out."""
+    for i in range(count):
+        created = None
+        if interval:
+            # Latency counts from the scheduled arrival (no coordinated
+            # omission); lingering batches are sent while waiting.
+            created = start + int(i * interval)
+            while True:
+                now = clock()
+                deadline = producer.deadline()
+                if deadline is not None and deadline <= now:
+                    producer.poll()
+                    continue
+                wait = min(created, deadline) if deadline is not None else created
+                if wait <= now:
+                    break
+                time.sleep((wait - now) / 1e9)
+        producer.send(events[i % len(events)], created)
+    # Whatever is left goes out when its linger expires, as it would.
+    while producer.pending:
+        deadline = producer.deadline()
+        time.sleep(max(0, deadline - clock()) / 1e9)
+        producer.poll()
+    return clock()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CloudEvent produce/consume through a local log broker")
+    parser.add_argument("--codec", action="append", choices=sorted(harness.CODECS))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--linger-ms", action="append", type=float,
+                        help="producer linger in ms (repeatable, default: 0 and 5)")
+    parser.add_argument("--batch-bytes", action="append", type=int,
+                        help="producer batch size bound in bytes (repeatable, default: 16384)")
+    parser.add_argument("--rate", action="append", type=float,
+                        help="offered load in events/s (repeatable, 0 = as fast as possible)")
+    parser.add_argument("--segment-bytes", type=int, default=64 * 1024 * 1024)
+    parser.add_argument("--directory", help="where the logs go (default: a temporary directory)")
+    parser.add_argument("--pool", type=int, default=1000,
+                        help="distinct events generated and cycled by the producer")
+    parser.add_argument("--output", metavar="PATH", help="also write the rows as JSON")
+    args = parser.parse_args(argv)
+
+    header = (f"{'codec':<14} {'profile':<8} {'linger ms':>9} {'batch B':>9} {'offered/s':>10} "
+              f"{'produce/s':>10} {'consume/s':>10} {'p50 us':>9} {'p99 us':>9} "
+              f"{'batches':>8} {'ev/batch':>9} {'log MB':>8}")
+    print(header)
+    print("-" * len(header))
+    rows = []
+    for codec_name in args.codec or ["avro-compiled", "protobuf"]:
+        codec = harness.load_codec(codec_name)
+        for profile in args.profile or harness.PROFILES:
+            events = codec.build_events(profile, min(args.pool, args.events))
+            # Unique ids, so events spread over the partitions by key.
+            events = [codec.with_id(event, f"{profile}-{i}") for i, event in enumerate(events)]
+            for linger_ms in args.linger_ms or [0.0, 5.0]:
+                for batch_bytes in args.batch_bytes or [16384]:
+                    for rate in args.rate or [0]:
+                        directory = tempfile.mkdtemp(dir=args.directory)
+                        try:
+                            produce_s, consume_s, latencies, batches, size = run(
+                                codec, events, args.events, directory, args.partitions,
+                                linger_ms, batch_bytes, rate, args.segment_bytes)
+                        finally:
+                            shutil.rmtree(directory)
+                        latencies.sort()
+                        rows.append({
+                            "codec": codec_name, "profile": profile, "linger_ms": linger_ms,
+                            "batch_bytes": batch_bytes, "rate": rate, "events": args.events,
+                            "produce_per_s": args.events / produce_s,
+                            "consume_per_s": args.events / consume_s,
+                            "p50_ns": statistics.median(latencies),
+                            "p99_ns": harness.percentile(latencies, 99),
+                            "batches": len(batches), "events_per_batch": statistics.fmean(batches),
+                            "log_bytes": size,
+                        })
+                        offered = f"{rate:.0f}" if rate else "max"
+                        print(f"{codec_name:<14} {profile:<8} {linger_ms:>9g} {batch_bytes:>9} "
+                              f"{offered:>10} {args.events / produce_s:>10.0f} "
+                              f"{args.events / consume_s:>10.0f} "
+                              f"{statistics.median(latencies) / 1000:>9.1f} "
+                              f"{harness.percentile(latencies, 99) / 1000:>9.1f} "
+                              f"{len(batches):>8} {statistics.fmean(batches):>9.1f} "
+                              f"{size / 2 ** 20:>8.2f}")
+    if args.output:
+        results_file.write(args.output, rows, args, tool="broker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Analytics scan: total data.bid_floor over an encoded batch, per codec.
+
+The row formats have to decode every event of the batch (and, for protobuf,
+json.loads every text_data payload) to reach one field; the columnar batch
+decodes only the data.bid_floor column and sums a packed array of doubles.
+
+    python3 columnar_aggregate_benchmark.py --events 1000000 --profile simple
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import columnar_batch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+
+
+def sum_avro(codec, data):
+    return sum(event["data"]["bid_floor"] for event in codec.decode_batch(data))
+
+
+def sum_protobuf(codec, data):
+    return sum(json.loads(event.text_data)["bid_floor"] for event in codec.decode_batch(data))
+
+
+def sum_columnar(codec, data):
+    return sum(columnar_batch.decode(data, ["data.bid_floor"])["data.bid_floor"].data)
+
+
+AGGREGATES = {
+    "avro": sum_avro,
+    "avro-compiled": sum_avro,
+    "columnar": sum_columnar,
+    "protobuf": sum_protobuf,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--codec", action="append", choices=sorted(AGGREGATES))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    header = f"{'codec':<14} {'profile':<8} {'events':>9} {'size MB':>9} {'scan ms':>10} {'events/s':>12}"
+    print(header)
+    print("-" * len(header))
+    for codec_name in args.codec or ["avro-compiled", "columnar", "protobuf"]:
+        codec = harness.load_codec(codec_name)
+        aggregate = AGGREGATES[codec_name]
+        for profile in args.profile or harness.PROFILES:
+            data = codec.encode_batch(codec.build_events(profile, args.events))
+            totals = []
+            for _ in range(args.repetitions):
+                start = time.perf_counter_ns()
+                aggregate(codec, data)
+                totals.append(time.perf_counter_ns() - start)
+            elapsed = statistics.median(totals)
+            print(f"{codec_name:<14} {profile:<8} {args.events:>9} {len(data) / 2 ** 20:>9.2f} "
+                  f"{elapsed / 1e6:>10.1f} {args.events / (elapsed / 1e9):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Compression stage for the CloudEvent codecs.
+
+CompressedCodec wraps any harness codec and compresses what it produces:
+every message in sequential mode, the whole batch in batch mode. The
+compressors are the stdlib ones, zlib (raw deflate), bz2 and lzma (raw
+LZMA2), so small messages do not pay for container headers and checksums.
+
+Generic compression barely helps a ~1 KB event: there is too little of it to
+find repetitions in. zlib can be primed with a preset dictionary (zdict)
+instead, and train_dictionary() builds one from sample events, so the
+envelope strings, attribute keys and payload field names every event shares
+are already "seen" before the first byte of a message.
+
+Compressor specs are <name>[:<level>] with name one of zlib, zlib-dict, bz2,
+lzma:
+
+    python3 harness.py --codec protobuf --profile simple --compress zlib-dict:6
+    python3 compression.py --codec avro-compiled --codec protobuf \
+        --compress zlib:1 --compress zlib:6 --compress zlib-dict:6 --compress lzma:6
+"""
+import argparse
+import bz2
+import collections
+import heapq
+import lzma
+import time
+import zlib
+
+import corpus
+import harness
+import results as results_file
+
+DICTIONARY_SIZE = 32 * 1024  # deflate cannot look further back than 32 KiB
+TRAINING_EVENTS = 1000
+TRAINING_BYTES = 1 << 20
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE, k=16, segment=256):
+    """Build a zlib preset dictionary from sample messages.
+
+    A simplified COVER (the zstd trainer): every k-byte substring is scored
+    by the number of samples it occurs in, and the segments of the samples
+    that cover the most frequent substrings are picked greedily until the
+    dictionary is full. Substrings that are already covered no longer count,
+    so the dictionary does not fill up with copies of one header, and
+    content unique to one sample (ids, random text) scores nothing.
+    """
+    samples = list(samples)
+    while len(samples) > 1 and sum(map(len, samples)) > TRAINING_BYTES:
+        samples = samples[::2]
+    frequency = collections.Counter()
+    for sample in samples:
+        frequency.update({sample[i:i + k] for i in range(len(sample) - k + 1)})
+
+    def score(candidate):
+        sample, start = candidate
+        grams = {sample[i:i + k] for i in range(start, min(start + segment, len(sample)) - k + 1)}
+        return sum(count for count in map(frequency.__getitem__, grams) if count > 1)
+
+    candidates = [(sample, start) for sample in samples
+                  for start in range(0, max(len(sample) - k, 1), segment // 4)]
+    heap = [(-score(candidate), i) for i, candidate in enumerate(candidates)]
+    heapq.heapify(heap)
+    chosen, total = [], 0
+    while heap and total < size:
+        _, i = heapq.heappop(heap)
+        current = score(candidates[i])
+        if current == 0:
+            break
+        if heap and current < -heap[0][0]:
+            heapq.heappush(heap, (-current, i))  # scores only drop: lazy greedy
+            continue
+        sample, start = candidates[i]
+        piece = sample[start:start + segment]
+        chosen.append(piece)
+        total += len(piece)
+        for j in range(len(piece) - k + 1):
+            frequency[piece[j:j + k]] = 0
+    # Most valuable segments last: nearest to the data, shortest distances.
+    return b"".join(reversed(chosen))[-size:]
+
+
+class Zlib:
+    def __init__(self, level=6, zdict=None):
+        self.level = level
+        self.zdict = zdict
+        self.name = f"zlib{'-dict' if zdict else ''}:{level}"
+        if zdict:
+            # Copying a primed (de)compressor is cheaper than priming a new one.
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+            self._decompressor = zlib.decompressobj(-15, zdict=zdict)
+
+    def compress(self, data):
+        if not self.zdict:
+            return zlib.compress(data, self.level, wbits=-15)
+        compressor = self._compressor.copy()
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+        if not self.zdict:
+            return zlib.decompress(data, wbits=-15)
+        decompressor = self._decompressor.copy()
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+class Bz2:
+    def __init__(self, level=9):
+        self.level = level
+        self.name = f"bz2:{level}"
+
+    def compress(self, data):
+        return bz2.compress(data, self.level)
+
+    def decompress(self, data):
+        return bz2.decompress(data)
+
+
+class Lzma:
+    def __init__(self, level=6):
+        self.level = level
+        self.name = f"lzma:{level}"
+        self._filters = [{"id": lzma.FILTER_LZMA2, "preset": level}]
+
+    def compress(self, data):
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=self._filters)
+
+    def decompress(self, data):
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=self._filters)
+
+
+COMPRESSORS = {
+    "zlib": (Zlib, 6),
+    "zlib-dict": (Zlib, 6),
+    "bz2": (Bz2, 9),
+    "lzma": (Lzma, 6),
+}
+
+
+def training_samples(codec, profile, seed=corpus.DEFAULT_SEED, count=TRAINING_EVENTS):
+    # A different seed than the measured corpus: the dictionary must not
+    # have seen the events it is judged on.
+    return [codec.encode(event) for event in codec.build_events(profile, count, seed + 1)]
+
+
+def make_compressor(spec, samples=None):
+    """Build the compressor for a spec; zlib-dict trains on samples."""
+    name, _, level = spec.partition(":")
+    if name not in COMPRESSORS:
+        raise ValueError(f"Unknown compressor {name!r}, expected one of {', '.join(COMPRESSORS)}")
+    compressor_type, default_level = COMPRESSORS[name]
+    level = int(level) if level else default_level
+    if name == "zlib-dict":
+        if not samples:
+            raise ValueError("zlib-dict needs sample messages to train its dictionary")
+        return compressor_type(level, train_dictionary(samples))
+    return compressor_type(level)
+
+
+class CompressedCodec:
+    """A harness codec whose messages and batches go through a compressor."""
+
+    def __init__(self, codec, compressor):
+        self.codec = codec
+        self.compressor = compressor
+        self.name = f"{codec.name}+{compressor.name}"
+
+    def __getattr__(self, name):
+        # Only what does not touch encoded bytes; anything else, such as
+        # encode_into(), would bypass the compressor.
+        if name in ("build_events", "event_id", "with_id", "envelope_paths"):
+            return getattr(self.codec, name)
+        raise AttributeError(name)
+
+    def encode(self, event):
+        return self.compressor.compress(self.codec.encode(event))
+
+    def decode(self, data):
+        return self.codec.decode(self.compressor.decompress(data))
+
+    def decode_envelope(self, data):
+        return self.codec.decode_envelope(self.compressor.decompress(data))
+
+    def encode_batch(self, events):
+        return self.compressor.compress(self.codec.encode_batch(events))
+
+    def decode_batch(self, data):
+        return self.codec.decode_batch(self.compressor.decompress(data))
+
+
+def wrap(codec, spec, profile, seed=corpus.DEFAULT_SEED):
+    samples = training_samples(codec, profile, seed) if spec.startswith("zlib-dict") else None
+    return CompressedCodec(codec, make_compressor(spec, samples))
+
+
+def measure(compressor, units, repetitions):
+    """Time the compression stage alone over pre-encoded units (messages or batches)."""
+    wall = time.perf_counter_ns
+    cpu = time.process_time_ns
+    latencies = []
+    compress_cpu, decompress_cpu = [], []
+    for _ in range(repetitions):
+        start_cpu = cpu()
+        compressed = []
+        for data in units:
+            start = wall()
+            compressed.append(compressor.compress(data))
+            latencies.append(wall() - start)
+        compress_cpu.append(cpu() - start_cpu)
+
+        start_cpu = cpu()
+        for data in compressed:
+            compressor.decompress(data)
+        decompress_cpu.append(cpu() - start_cpu)
+    latencies.sort()
+    return {
+        "size_bytes": sum(map(len, compressed)),
+        "compress_cpu_ns": sorted(compress_cpu)[len(compress_cpu) // 2],
+        "decompress_cpu_ns": sorted(decompress_cpu)[len(decompress_cpu) // 2],
+        "p50_ns": harness.percentile(latencies, 50),
+        "p99_ns": harness.percentile(latencies, 99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CloudEvent compression size x CPU x latency matrix")
+    parser.add_argument("--codec", action="append", choices=sorted(harness.CODECS))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--compress", action="append",
+                        help="compressor spec <name>[:<level>] (repeatable, default: a sweep)")
+    parser.add_argument("--unit", action="append", choices=("message", "batch"),
+                        help="compress every message or every batch (repeatable, default: both)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=corpus.DEFAULT_SEED)
+    parser.add_argument("--output", metavar="PATH", help="also write the rows as JSON")
+    args = parser.parse_args(argv)
+    specs = args.compress or ["zlib:1", "zlib:6", "zlib:9", "zlib-dict:6", "bz2:9", "lzma:0", "lzma:6"]
+
+    header = (f"{'codec':<14} {'profile':<8} {'unit':<8} {'compressor':<12} {'raw KB':>10} "
+              f"{'packed KB':>10} {'ratio':>6} {'comp us/ev':>11} {'decomp us/ev':>12} "
+              f"{'p50 us':>9} {'p99 us':>9}")
+    print(header)
+    print("-" * len(header))
+    rows = []
+    for codec_name in args.codec or ["avro-compiled", "protobuf"]:
+        codec = harness.load_codec(codec_name)
+        for profile in args.profile or harness.PROFILES:
+            events = codec.build_events(profile, args.events, args.seed)
+            samples = training_samples(codec, profile, args.seed)
+            compressors = [make_compressor(spec, samples) for spec in specs]
+            for unit in args.unit or ["message", "batch"]:
+                if unit == "message":
+                    units = [codec.encode(event) for event in events]
+                else:
+                    units = [codec.encode_batch(events[i:i + args.batch_size])
+                             for i in range(0, len(events), args.batch_size)]
+                raw = sum(map(len, units))
+                for compressor in compressors:
+                    m = measure(compressor, units, args.repetitions)
+                    rows.append(dict(m, codec=codec_name, profile=profile, unit=unit,
+                                     compressor=compressor.name, events=len(events), raw_bytes=raw))
+                    print(f"{codec_name:<14} {profile:<8} {unit:<8} {compressor.name:<12} "
+                          f"{raw / 1024:>10.1f} {m['size_bytes'] / 1024:>10.1f} "
+                          f"{raw / m['size_bytes']:>6.2f} "
+                          f"{m['compress_cpu_ns'] / len(events) / 1000:>11.2f} "
+                          f"{m['decompress_cpu_ns'] / len(events) / 1000:>12.2f} "
+                          f"{m['p50_ns'] / 1000:>9.1f} {m['p99_ns'] / 1000:>9.1f}")
+    if args.output:
+        results_file.write(args.output, rows, args, tool="compression")
+
+
+if __name__ == "__main__":
+    main()
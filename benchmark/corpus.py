@@ -0,0 +1,249 @@
+"""Deterministic synthetic CloudEvent corpus shared by every codec.
+
+A corpus is a list of canonical events, plain dicts that no codec owns:
+
+    {"id", "source", "specversion", "type", "datacontenttype",
+     "time": aware datetime, "attributes": {extension: value}, "data": dict}
+
+and each codec turns them into its native form with from_canonical(), so all
+formats are measured on the same logical events.
+
+Events are built column by column: the randomness for a field is drawn for
+all events at once from one seeded byte stream (randbytes + translate for
+strings, one array per numeric field) and the nested dicts are then zipped
+together bottom-up, which is orders of magnitude faster than per-value
+random.choices calls. Generated corpora are pickled to a local cache keyed
+by profile, seed, size and a hash of this module's source, so editing a
+template or the generator never serves a stale corpus.
+"""
+import array
+import hashlib
+import os
+import pickle
+import random
+import string
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_SEED = 0
+CACHE_DIR = os.environ.get(
+    "CORPUS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".corpus_cache"))
+
+ALPHABET = (string.ascii_letters + string.digits).encode("ascii")
+# Maps every byte value onto the 62-character alphabet (with a slight,
+# harmless bias towards the first 8 characters).
+_ALPHABET_TABLE = bytes(ALPHABET[b % len(ALPHABET)] for b in range(256))
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# The templates hold closures, which cannot be hashed by value; the source
+# they are written in can, and covers the generator code as well.
+with open(os.path.abspath(__file__), "rb") as _source:
+    SOURCE_HASH = hashlib.blake2b(_source.read(), digest_size=6).hexdigest()
+
+
+# Leaves of an event template; each produces one column of `count` values.
+
+def text(length=300):
+    def column(rng, count):
+        blob = rng.randbytes(count * length).translate(_ALPHABET_TABLE).decode("ascii")
+        return [blob[i:i + length] for i in range(0, count * length, length)]
+    return column
+
+
+def integer(low=0, high=100):
+    span = high - low + 1
+
+    def column(rng, count):
+        # Two random bytes per value keep the modulo bias small for span <= 256.
+        return [low + value % span for value in array.array("H", rng.randbytes(2 * count))]
+    return column
+
+
+def bit():
+    # 0/1 ints, not bools, like the random.randint(0, 1) flags they replace.
+    return integer(0, 1)
+
+
+def flag():
+    def column(rng, count):
+        return [value & 1 == 1 for value in rng.randbytes(count)]
+    return column
+
+
+def real(high=100.0):
+    scale = high / (1 << 53)
+
+    def column(rng, count):
+        return [(value >> 11) * scale for value in array.array("Q", rng.randbytes(8 * count))]
+    return column
+
+
+def raw(length=8):
+    def column(rng, count):
+        blob = rng.randbytes(count * length)
+        return [blob[i:i + length] for i in range(0, count * length, length)]
+    return column
+
+
+def uuid4():
+    def column(rng, count):
+        blob = rng.randbytes(16 * count)
+        return [str(uuid.UUID(bytes=blob[i:i + 16], version=4)) for i in range(0, 16 * count, 16)]
+    return column
+
+
+def ordinal():
+    def column(rng, count):
+        return list(range(count))
+    return column
+
+
+def timestamp(step=timedelta(milliseconds=1)):
+    def column(rng, count):
+        return [EPOCH + step * i for i in range(count)]
+    return column
+
+
+def _build(template, rng, count):
+    """Materialize `count` instances of template, one column per node."""
+    if callable(template):
+        return template(rng, count)
+    if isinstance(template, dict):
+        keys = list(template)
+        columns = [_build(template[key], rng, count) for key in keys]
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+    if isinstance(template, list):
+        columns = [_build(item, rng, count) for item in template]
+        return [list(values) for values in zip(*columns)]
+    return [template] * count  # constants (str, bytes, numbers, None) are immutable
+
+
+SIMPLE_DATA = {
+    "id": ordinal(),
+    "country": text(),
+    "device": integer(),
+    "zone": integer(),
+    "pricing_model": integer(),
+    "bid_floor": real(),
+    "smart_price": real(),
+    "winning_price": real(),
+    "event_type": integer(),
+    "network": integer(),
+}
+
+LARGE_DATA = {
+    "id": ordinal(),
+    "country": text(),
+    "device": integer(),
+    "zone": integer(),
+    "data_string": {"value": {"random_string": text()}},
+    "data_json": {"value": {
+        "is_active": bit(),
+        "user_id": uuid4(),
+        "price": real(),
+        "username": "user_example",
+        "is_verified": bit(),
+        "age": integer(),
+        "discount_rate": real(),
+        "email": "user@example.com",
+        "has_premium": bit(),
+        "rating": real(),
+        "login_attempts": integer(),
+        "account_balance": real(),
+        "country": text(),
+        "subscription_level": text(),
+        "notifications_enabled": bit(),
+        "last_login_days_ago": integer(),
+        "max_storage_gb": integer(),
+        "cpu_cores": integer(),
+        "temperature_celsius": real(),
+        "favorite_color": text(),
+        "email_verified": bit(),
+        "items_in_cart": bit(),
+        "session_time_minutes": real(),
+        "bio": text(),
+        "is_admin": bit(),
+        "posts_count": integer(),
+        "average_response_time": real(),
+        "timezone": text(),
+        "notifications_count": integer(),
+        "is_beta_user": bit(),
+    }},
+    "pricing_model": integer(),
+    "bid_floor": real(),
+    "smart_price": real(),
+    "winning_price": real(),
+    "event_type": integer(),
+    "network": integer(),
+    "cloud_event_data": {"value": {"data": [
+        {"value": {
+            "key1": None,
+            "key2": bit(),
+            "key3": real(),
+            "key4": text(),
+            "key5": {"nestedKey": {"value": {"innerKey": text()}}},
+        }},
+        {"value": {
+            "anotherKey": text(),
+            "number": real(),
+        }},
+    ]}},
+}
+
+
+def _envelope(attributes, data):
+    return {
+        "id": uuid4(),
+        "source": "/my/source",
+        "specversion": "1.0",
+        "type": "click",
+        "datacontenttype": "application/json",
+        "time": timestamp(),
+        "attributes": attributes,
+        "data": data,
+    }
+
+
+PROFILE_TEMPLATES = {
+    "simple": _envelope({"payload": b"\x01\x10"}, SIMPLE_DATA),
+    "large": _envelope({
+        "payload": raw(),
+        "processed": flag(),
+        "priority": integer(),
+        "region": text(),
+        "retry": flag(),
+        "payload_type": text(),
+        "checksum": raw(),
+        "error_code": None,
+    }, LARGE_DATA),
+}
+PROFILES = tuple(PROFILE_TEMPLATES)
+
+
+def generate(profile, count, seed=DEFAULT_SEED):
+    """Build `count` canonical events of a profile; same seed, same events."""
+    return _build(PROFILE_TEMPLATES[profile], random.Random(f"{profile}:{seed}"), count)
+
+
+def cache_path(profile, count, seed):
+    return os.path.join(CACHE_DIR, f"{profile}-seed{seed}-{count}-{SOURCE_HASH}.pickle")
+
+
+def load(profile, count, seed=DEFAULT_SEED, cache=True):
+    """Return the corpus from the fixture cache, generating it on a miss."""
+    if not cache:
+        return generate(profile, count, seed)
+    path = cache_path(profile, count, seed)
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    events = generate(profile, count, seed)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(events, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)  # atomic, so concurrent runs never see half a file
+    return events
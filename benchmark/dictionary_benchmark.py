@@ -0,0 +1,78 @@
+"""Dictionary-encoded batches vs the plain batch formats.
+
+For each format family the plain batch and its string-table variant encode
+the same events, and the decoded batch is compared on wire size, encode and
+decode time and the memory the decoded Python objects hold on to (measured
+with tracemalloc in a separate, untimed pass). Plain protobuf batches are
+turned into the same dicts the dictionary variant returns, so both sides pay
+for building Python objects.
+
+    python3 dictionary_benchmark.py --profile large --events 10000
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+import harness
+
+# family -> (plain codec, dictionary codec)
+FAMILIES = {
+    "avro": ("avro-compiled", "avro-dict"),
+    "protobuf": ("protobuf", "protobuf-dict"),
+}
+
+
+def decoder(codec):
+    if codec.name == "protobuf":
+        import protobuf_dictionary
+        return lambda data: [protobuf_dictionary.to_dict(event) for event in codec.decode_batch(data)]
+    return codec.decode_batch
+
+
+def measure(codec, events, repetitions):
+    decode = decoder(codec)
+    encode_ns, decode_ns = [], []
+    for _ in range(repetitions + 1):  # the first pass is warmup
+        start = time.perf_counter_ns()
+        data = codec.encode_batch(events)
+        encoded = time.perf_counter_ns()
+        decode(data)
+        encode_ns.append(encoded - start)
+        decode_ns.append(time.perf_counter_ns() - encoded)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        decoded = decode(data)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del decoded
+    return len(data), statistics.median(encode_ns[1:]), statistics.median(decode_ns[1:]), retained
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--family", action="append", choices=sorted(FAMILIES))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    header = (f"{'codec':<14} {'profile':<8} {'events':>8} {'size KB':>10} {'encode ms':>10} "
+              f"{'decode ms':>10} {'decoded KB':>11}")
+    print(header)
+    print("-" * len(header))
+    for family in args.family or sorted(FAMILIES):
+        for profile in args.profile or harness.PROFILES:
+            for codec_name in FAMILIES[family]:
+                codec = harness.load_codec(codec_name)
+                events = codec.build_events(profile, args.events)
+                size, encode_ns, decode_ns, retained = measure(codec, events, args.repetitions)
+                print(f"{codec_name:<14} {profile:<8} {args.events:>8} {size / 1024:>10.2f} "
+                      f"{encode_ns / 1e6:>10.1f} {decode_ns / 1e6:>10.1f} {retained / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""Shared benchmark harness for the CloudEvent codecs.
+
+Every codec registered in CODECS is driven through the same timing loop, so
+the Avro and protobuf numbers are produced the same way: warmup passes are
+discarded, every repetition is timed with perf_counter_ns and the per-event
+latency distribution is summarised as min/median/p95/p99.
+
+Run from the benchmark directory:
+
+    python3 harness.py --codec avro --mode sequential --profile large \
+        --events 10000 --repetitions 5 --warmup 1
+"""
+import argparse
+import collections.abc
+import gc
+import importlib
+import math
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import corpus
+import results as results_file
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Codec registry: name -> (sub-directory, module, class). Codecs are imported
+# lazily so that running one codec does not need the other's dependencies.
+CODECS = {
+    "avro": ("avro", "avro_benchmark", "AvroCodec"),
+    "avro-compiled": ("avro", "avro_benchmark", "AvroCompiledCodec"),
+    "avro-dict": ("avro", "avro_benchmark", "AvroDictionaryCodec"),
+    "avro-slotted": ("avro", "avro_benchmark", "AvroSlottedCodec"),
+    "binary": ("jsonformat", "json_benchmark", "BinaryModeCodec"),
+    "columnar": ("columnar", "columnar_benchmark", "ColumnarCodec"),
+    "json": ("jsonformat", "json_benchmark", "JsonCodec"),
+    "protobuf": ("protobuf", "protobuf_benchmark", "ProtobufCodec"),
+    "protobuf-dict": ("protobuf", "protobuf_benchmark", "ProtobufDictionaryCodec"),
+    "protobuf-typed": ("protobuf", "protobuf_benchmark", "ProtobufTypedCodec"),
+}
+
+PROFILES = corpus.PROFILES
+
+
+def load_codec(name):
+    directory, module_name, attr = CODECS[name]
+    path = os.path.join(BENCHMARK_DIR, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    module = importlib.import_module(module_name)
+    return getattr(module, attr)()
+
+
+def percentile(sorted_samples, pct):
+    # Nearest-rank percentile on an already sorted list.
+    if not sorted_samples:
+        return 0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_samples)) - 1)
+    return sorted_samples[rank]
+
+
+class Result:
+    def __init__(self, codec, mode, profile, phase, events):
+        self.codec = codec
+        self.mode = mode
+        self.profile = profile
+        self.phase = phase
+        self.events = events
+        self.latencies_ns = []  # per-event latency samples
+        self.totals_ns = []     # wall time of each repetition
+        self.size_bytes = 0
+        self.peak_memory = None
+        self.gc_collections = None  # garbage collections during the timed loops
+        self.gc_pause_ns = None     # and the time they took
+        self.allocated_blocks = None  # net sys.getallocatedblocks() change over them
+
+    def summary(self):
+        samples = sorted(self.latencies_ns)
+        median_total = statistics.median(self.totals_ns) if self.totals_ns else 0
+        return {
+            "codec": self.codec,
+            "mode": self.mode,
+            "profile": self.profile,
+            "phase": self.phase,
+            "events": self.events,
+            "repetitions": len(self.totals_ns),
+            "size_bytes": self.size_bytes,
+            "min_ns": samples[0] if samples else 0,
+            "median_ns": statistics.median(samples) if samples else 0,
+            "p95_ns": percentile(samples, 95),
+            "p99_ns": percentile(samples, 99),
+            "events_per_s": self.events / (median_total / 1e9) if median_total else 0,
+            "peak_memory": self.peak_memory,
+            "gc_collections": self.gc_collections,
+            "gc_pause_ns": self.gc_pause_ns,
+            "allocated_blocks": self.allocated_blocks,
+            "blocks_per_event": (self.allocated_blocks / (self.events * len(self.totals_ns))
+                                 if self.allocated_blocks is not None and self.totals_ns else None),
+        }
+
+
+class GcMonitor:
+    """Count cyclic-GC collections and their pause time via gc.callbacks, and
+    the allocator blocks (sys.getallocatedblocks()) the timed loop leaves
+    allocated: what it keeps, or fails to reuse, per event. The timing
+    samples the loop appends are not counted, and overhead, what the loop
+    itself leaves per pass (see loop_overhead()), is subtracted as well."""
+
+    def __init__(self, result, overhead=0):
+        self.result = result
+        self.overhead = overhead
+        self._start = 0
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter_ns()
+        else:
+            self.result.gc_collections += 1
+            self.result.gc_pause_ns += time.perf_counter_ns() - self._start
+
+    def __enter__(self):
+        if self.result.gc_collections is None:
+            self.result.gc_collections = self.result.gc_pause_ns = 0
+            self.result.allocated_blocks = 0
+        gc.callbacks.append(self._callback)
+        self._samples = len(self.result.latencies_ns)
+        self._blocks = sys.getallocatedblocks()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        blocks = sys.getallocatedblocks() - self._blocks - self.overhead
+        # One int object per sample appended, except the cached small ints.
+        samples = self.result.latencies_ns[self._samples:]
+        blocks -= sum(1 for sample in samples if sample > 256)
+        self.result.allocated_blocks += blocks
+        gc.callbacks.remove(self._callback)
+
+
+def loop_overhead(items, passes=3):
+    """Blocks a monitored timing loop over items leaves allocated with an
+    empty body, apart from its samples: the monitor's own bookkeeping. The
+    smallest of a few passes, so a stray allocation is not subtracted."""
+    clock = time.perf_counter_ns
+    overheads = []
+    for _ in range(passes):
+        probe = Result(None, None, None, None, len(items))
+        samples = probe.latencies_ns
+        with GcMonitor(probe):
+            rep_start = clock()
+            for _ in items:
+                start = clock()
+                samples.append(clock() - start)
+            probe.totals_ns.append(clock() - rep_start)
+        overheads.append(probe.allocated_blocks)
+    return min(overheads)
+
+
+def run_batch(codec, events, repetitions, warmup):
+    """All events in one batch message; one latency sample per repetition."""
+    count = len(events)
+    encode = Result(codec.name, "batch", None, "encode", count)
+    decode = Result(codec.name, "batch", None, "decode", count)
+
+    for _ in range(warmup):
+        codec.decode_batch(codec.encode_batch(events))
+
+    data = b""
+    for _ in range(repetitions):
+        start = time.perf_counter_ns()
+        data = codec.encode_batch(events)
+        elapsed = time.perf_counter_ns() - start
+        encode.totals_ns.append(elapsed)
+        encode.latencies_ns.append(elapsed / count)
+
+        start = time.perf_counter_ns()
+        codec.decode_batch(data)
+        elapsed = time.perf_counter_ns() - start
+        decode.totals_ns.append(elapsed)
+        decode.latencies_ns.append(elapsed / count)
+
+    encode.size_bytes = decode.size_bytes = len(data)
+    return [encode, decode]
+
+
+def run_sequential(codec, events, repetitions, warmup):
+    """One message per event; every event is timed on its own."""
+    count = len(events)
+    encode = Result(codec.name, "sequential", None, "encode", count)
+    decode = Result(codec.name, "sequential", None, "decode", count)
+    clock = time.perf_counter_ns
+
+    for _ in range(warmup):
+        for event in events:
+            codec.decode(codec.encode(event))
+
+    overhead = loop_overhead(events)
+    for _ in range(repetitions):
+        serialized = []
+        samples = encode.latencies_ns
+        with GcMonitor(encode, overhead):
+            rep_start = clock()
+            for event in events:
+                start = clock()
+                data = codec.encode(event)
+                samples.append(clock() - start)
+                serialized.append(data)
+            encode.totals_ns.append(clock() - rep_start)
+
+        samples = decode.latencies_ns
+        with GcMonitor(decode, overhead):
+            rep_start = clock()
+            for data in serialized:
+                start = clock()
+                codec.decode(data)
+                samples.append(clock() - start)
+            decode.totals_ns.append(clock() - rep_start)
+
+        encode.size_bytes = decode.size_bytes = sum(len(data) for data in serialized)
+    return [encode, decode]
+
+
+def _pooled_api(codec):
+    # Codecs without a pooled API get a stand-in with the same allocations
+    # as encode()/decode(), so they can run in pooled mode for comparison.
+    encode_into = getattr(codec, "encode_into", None)
+    if encode_into is None:
+        def encode_into(buf, event):
+            data = codec.encode(event)
+            buf[:] = data
+            return len(data)
+    decode_into = getattr(codec, "decode_into", None)
+    if decode_into is None:
+        def decode_into(data, target):
+            return codec.decode(data)
+    return encode_into, decode_into
+
+
+def run_pooled(codec, events, repetitions, warmup):
+    """Sequential, but encoding into one reused bytearray and decoding into one
+    reused target object through encode_into()/decode_into()."""
+    count = len(events)
+    encode = Result(codec.name, "pooled", None, "encode", count)
+    decode = Result(codec.name, "pooled", None, "decode", count)
+    encode_into, decode_into = _pooled_api(codec)
+    serialized = [codec.encode(event) for event in events]
+    clock = time.perf_counter_ns
+    buf = bytearray()
+    target = None
+
+    for _ in range(warmup):
+        for event, data in zip(events, serialized):
+            encode_into(buf, event)
+            target = decode_into(data, target)
+
+    overhead = loop_overhead(events)
+    for _ in range(repetitions):
+        samples = encode.latencies_ns
+        with GcMonitor(encode, overhead):
+            rep_start = clock()
+            for event in events:
+                start = clock()
+                encode_into(buf, event)
+                samples.append(clock() - start)
+            encode.totals_ns.append(clock() - rep_start)
+
+        samples = decode.latencies_ns
+        with GcMonitor(decode, overhead):
+            rep_start = clock()
+            for data in serialized:
+                start = clock()
+                target = decode_into(data, target)
+                samples.append(clock() - start)
+            decode.totals_ns.append(clock() - rep_start)
+
+    encode.size_bytes = decode.size_bytes = sum(len(data) for data in serialized)
+    return [encode, decode]
+
+
+def read_paths(event, paths):
+    """Read the split dotted paths from a decoded event, as a router would:
+    mapping levels (dicts, protobuf maps) by key, others by attribute."""
+    for path in paths:
+        value = event
+        for name in path:
+            if isinstance(value, collections.abc.Mapping):
+                value = value.get(name)
+            else:
+                value = getattr(value, name, None)
+            if value is None:
+                break
+
+
+def run_envelope(codec, events, repetitions, warmup):
+    """Full decode plus reading the envelope paths, vs an envelope-only
+    (projected) decode of single events. Both phases end with the same
+    fields read, so lazily parsing backends (upb) are not credited with
+    work they defer past the timed call."""
+    count = len(events)
+    serialized = [codec.encode(event) for event in events]
+    clock = time.perf_counter_ns
+    paths = [path.split(".") for path in codec.envelope_paths]
+
+    def decode_and_read(data):
+        read_paths(codec.decode(data), paths)
+
+    results = []
+    for phase, decode in (("decode", decode_and_read), ("envelope", codec.decode_envelope)):
+        result = Result(codec.name, "envelope", None, phase, count)
+        result.size_bytes = sum(len(data) for data in serialized)
+        for _ in range(warmup):
+            for data in serialized:
+                decode(data)
+        for _ in range(repetitions):
+            samples = result.latencies_ns
+            rep_start = clock()
+            for data in serialized:
+                start = clock()
+                decode(data)
+                samples.append(clock() - start)
+            result.totals_ns.append(clock() - rep_start)
+        results.append(result)
+    return results
+
+
+MODES = {
+    "batch": run_batch,
+    "sequential": run_sequential,
+    "pooled": run_pooled,
+    "envelope": run_envelope,
+}
+DEFAULT_MODES = ("batch", "sequential")
+
+
+def trace_peak_memory(codec, mode, events, results):
+    # tracemalloc slows allocation-heavy code down considerably, so peak
+    # memory is measured in an extra untimed pass instead of the timed ones.
+    tracemalloc.start()
+    try:
+        MODES[mode](codec, events, 1, 0)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    for result in results:
+        result.peak_memory = peak
+
+
+def run_scenario(codec_name, mode, profile, count, repetitions=5, warmup=1,
+                 trace_memory=False, seed=corpus.DEFAULT_SEED, compress=None):
+    codec = load_codec(codec_name)
+    if compress:
+        import compression
+        codec = compression.wrap(codec, compress, profile, seed)
+    events = codec.build_events(profile, count, seed)
+    results = MODES[mode](codec, events, repetitions, warmup)
+    if trace_memory:
+        trace_peak_memory(codec, mode, events, results)
+    for result in results:
+        result.profile = profile
+    return results
+
+
+def print_results(results):
+    header = (f"{'codec':<14} {'mode':<11} {'profile':<8} {'phase':<8} "
+              f"{'events':>8} {'size KB':>10} {'min us':>9} {'median us':>10} "
+              f"{'p95 us':>9} {'p99 us':>9} {'events/s':>12}")
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        s = result.summary()
+        line = (f"{s['codec']:<14} {s['mode']:<11} {s['profile']:<8} {s['phase']:<8} "
+                f"{s['events']:>8} {s['size_bytes'] / 1024:>10.2f} "
+                f"{s['min_ns'] / 1000:>9.2f} {s['median_ns'] / 1000:>10.2f} "
+                f"{s['p95_ns'] / 1000:>9.2f} {s['p99_ns'] / 1000:>9.2f} "
+                f"{s['events_per_s']:>12.0f}")
+        if s["peak_memory"] is not None:
+            line += f"  peak {s['peak_memory'] / 1024:.2f} KB"
+        if s["gc_collections"] is not None:
+            line += f"  gc {s['gc_collections']} ({s['gc_pause_ns'] / 1e6:.2f} ms)"
+        if s["blocks_per_event"] is not None:
+            line += f"  blocks/ev {s['blocks_per_event']:+.2f}"
+        print(line)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="CloudEvent codec benchmark")
+    parser.add_argument("--codec", action="append", choices=sorted(CODECS),
+                        help="codec to run (repeatable, default: all)")
+    parser.add_argument("--mode", action="append", choices=sorted(MODES),
+                        help="execution mode (repeatable, default: batch and sequential); "
+                             "envelope times a full decode plus reading the routing fields "
+                             "against a projected decode of only those fields")
+    parser.add_argument("--profile", action="append", choices=PROFILES,
+                        help="payload profile (repeatable, default: all)")
+    parser.add_argument("--events", type=int, default=10000,
+                        help="number of events per scenario")
+    parser.add_argument("--repetitions", type=int, default=5,
+                        help="timed repetitions per scenario")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="untimed warmup repetitions per scenario")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report tracemalloc peak from an extra untimed pass")
+    parser.add_argument("--seed", type=int, default=corpus.DEFAULT_SEED,
+                        help="corpus seed; the same seed yields the same events")
+    parser.add_argument("--compress", metavar="SPEC",
+                        help="compress every message/batch, e.g. zlib:6, zlib-dict:6, bz2:9, lzma:6")
+    parser.add_argument("--output", metavar="PATH",
+                        help="also write the results and environment as JSON (see results.py)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Recorded in the --output config as run, not as the None of a default.
+    codecs = args.codec = args.codec or sorted(CODECS)
+    modes = args.mode = args.mode or list(DEFAULT_MODES)
+    profiles = args.profile = args.profile or list(PROFILES)
+
+    results = []
+    for codec_name in codecs:
+        for mode in modes:
+            for profile in profiles:
+                results.extend(run_scenario(codec_name, mode, profile, args.events,
+                                            args.repetitions, args.warmup,
+                                            args.trace_memory, args.seed, args.compress))
+    print_results(results)
+    if args.output:
+        results_file.write(args.output, results, args)
+    return results
+
+
+if __name__ == "__main__":
+    main()
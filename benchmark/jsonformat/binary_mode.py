@@ -0,0 +1,129 @@
+"""CloudEvents binary content mode, as carried by the HTTP binding.
+
+The context and extension attributes travel as ce-<name> headers, the
+datacontenttype as Content-Type, and the body is the data itself, here the
+JSON payload. A message is written as an HTTP/1.1 style header block
+followed by the body, which is what goes over the wire:
+
+    ce-specversion: 1.0\\r\\n
+    ce-id: ...\\r\\n
+    ...
+    content-type: application/json\\r\\n
+    \\r\\n
+    {"id": 0, ...}
+
+Header values are strings: Boolean is "true"/"false", Integer decimal,
+Binary base64, and characters outside printable ASCII, space, double quote
+and percent are percent-encoded. Attributes without a value are left out.
+
+CloudEvents defines no batch format for binary mode, a batch of events is a
+batch of messages. encode_batch() writes them one after another, each behind
+its 4-byte big-endian length, as a broker record batch would carry them.
+
+https://github.com/cloudevents/spec/blob/v1.0.2/cloudevents/bindings/http-protocol-binding.md
+"""
+import base64
+import json
+import struct
+import urllib.parse
+
+HEADER_PREFIX = "ce-"
+CONTENT_TYPE = "content-type"
+JSON_CONTENT_TYPES = ("application/json", "text/json")
+_LENGTH = struct.Struct(">I")
+
+# Printable ASCII, less the characters the binding requires to be encoded.
+_SAFE = "".join(chr(c) for c in range(0x21, 0x7f) if chr(c) not in '"%')
+_SAFE_CHARS = frozenset(_SAFE)
+
+
+def header_value(value):
+    """String form of an attribute value for a ce-* header."""
+    kind = value.__class__
+    if kind is bool:
+        return "true" if value else "false"
+    if kind is int:
+        return str(value)
+    if kind is bytes:
+        return base64.b64encode(value).decode("ascii")
+    if value.isascii() and _SAFE_CHARS.issuperset(value):
+        return value
+    return urllib.parse.quote(value, safe=_SAFE)
+
+
+def _is_json(content_type):
+    return content_type.split(";", 1)[0].strip() in JSON_CONTENT_TYPES or content_type.endswith("+json")
+
+
+def from_canonical(event):
+    """Map a corpus.py canonical event onto (headers, data)."""
+    headers = {
+        "ce-specversion": header_value(event["specversion"]),
+        "ce-id": header_value(event["id"]),
+        "ce-source": header_value(event["source"]),
+        "ce-type": header_value(event["type"]),
+        "ce-time": event["time"].isoformat(),
+    }
+    for name, value in event["attributes"].items():
+        if value is not None:
+            headers[HEADER_PREFIX + name] = header_value(value)
+    headers[CONTENT_TYPE] = event["datacontenttype"]
+    return headers, event["data"]
+
+
+def encode(message):
+    headers, data = message
+    head = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    if data.__class__ is bytes:
+        body = data
+    else:
+        body = json.dumps(data).encode()
+    return (head + "\r\n").encode("ascii") + body
+
+
+def decode_headers(data):
+    """Return (headers, body offset) without touching the body."""
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    end = data.index(b"\r\n\r\n")
+    headers = {}
+    for line in data[:end].decode("ascii").split("\r\n"):
+        name, _, value = line.partition(": ")
+        headers[name.lower()] = urllib.parse.unquote(value) if "%" in value else value
+    return headers, end + 4
+
+
+def decode(data):
+    # A copy of any other buffer (an mmap slice): the body outlives the call.
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    headers, offset = decode_headers(data)
+    body = data[offset:]
+    if _is_json(headers.get(CONTENT_TYPE, "")):
+        return headers, json.loads(body)
+    return headers, body
+
+
+def encode_batch(messages):
+    parts = []
+    for message in messages:
+        data = encode(message)
+        parts.append(_LENGTH.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def split_batch(data):
+    """The encoded messages of a batch."""
+    pos, end = 0, len(data)
+    messages = []
+    while pos < end:
+        (size,) = _LENGTH.unpack_from(data, pos)
+        pos += _LENGTH.size
+        messages.append(data[pos:pos + size])
+        pos += size
+    return messages
+
+
+def decode_batch(data):
+    return [decode(message) for message in split_batch(data)]
@@ -0,0 +1,107 @@
+import os
+import sys
+
+import binary_mode
+import json_format
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # shared benchmark modules
+
+import corpus
+
+
+def _header(path):
+    # "attributes.region" -> "region"
+    return path.split(".", 1)[1] if path.startswith("attributes.") else path
+
+
+class JsonCodec:
+    """CloudEvents JSON format (structured mode), driven by harness.py.
+
+    Events are JSON format objects (json_format.from_canonical()); batches
+    use the JSON batch format, a JSON array of events.
+    """
+    name = "json"
+
+    # What a router looks at. JSON has to be parsed whole to find them.
+    envelope_paths = ("id", "source", "type", "attributes.region")
+
+    def build_events(self, profile, count, seed=corpus.DEFAULT_SEED):
+        return [json_format.from_canonical(event) for event in corpus.load(profile, count, seed)]
+
+    def event_id(self, event):
+        return event["id"]
+
+    def with_id(self, event, event_id):
+        return dict(event, id=event_id)
+
+    def encode(self, event):
+        return json_format.encode(event)
+
+    def decode(self, data):
+        return json_format.decode(data)
+
+    def decode_envelope(self, data):
+        event = json_format.decode(data)
+        result = {}
+        for path in self.envelope_paths:
+            if path.startswith("attributes."):
+                result.setdefault("attributes", {})[_header(path)] = event.get(_header(path))
+            else:
+                result[path] = event[path]
+        return result
+
+    def encode_batch(self, events):
+        return json_format.encode_batch(events)
+
+    def decode_batch(self, data):
+        return json_format.decode_batch(data)
+
+
+class BinaryModeCodec:
+    """CloudEvents binary content mode: ce-* headers plus a JSON body.
+
+    Events are (headers, data) pairs (binary_mode.from_canonical()); a
+    batch is a sequence of length-prefixed messages.
+    """
+    name = "binary"
+
+    # Routing only needs the headers; the body is never parsed.
+    envelope_paths = ("id", "source", "type", "attributes.region")
+
+    def build_events(self, profile, count, seed=corpus.DEFAULT_SEED):
+        return [binary_mode.from_canonical(event) for event in corpus.load(profile, count, seed)]
+
+    def event_id(self, event):
+        return event[0]["ce-id"]
+
+    def with_id(self, event, event_id):
+        headers, data = event
+        return dict(headers, **{"ce-id": binary_mode.header_value(event_id)}), data
+
+    def encode(self, event):
+        return binary_mode.encode(event)
+
+    def decode(self, data):
+        return binary_mode.decode(data)
+
+    def decode_envelope(self, data):
+        headers, _ = binary_mode.decode_headers(data)
+        result = {}
+        for path in self.envelope_paths:
+            value = headers.get(binary_mode.HEADER_PREFIX + _header(path))
+            if path.startswith("attributes."):
+                result.setdefault("attributes", {})[_header(path)] = value
+            else:
+                result[path] = value
+        return result
+
+    def encode_batch(self, events):
+        return binary_mode.encode_batch(events)
+
+    def decode_batch(self, data):
+        return binary_mode.decode_batch(data)
+
+
+if __name__ == "__main__":
+    import harness
+    harness.main(["--codec", "json", "--codec", "binary"] + sys.argv[1:])
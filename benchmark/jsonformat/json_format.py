@@ -0,0 +1,70 @@
+"""CloudEvents JSON event format (structured content mode).
+
+An event is one JSON object: the context attributes and extension
+attributes as top-level members, the payload in "data" (a JSON value) or
+"data_base64" (binary data). A batch is a JSON array of such objects, the
+application/cloudevents-batch+json format.
+
+https://github.com/cloudevents/spec/blob/v1.0.2/cloudevents/formats/json-format.md
+"""
+import base64
+import json
+
+CONTENT_TYPE = "application/cloudevents+json"
+BATCH_CONTENT_TYPE = "application/cloudevents-batch+json"
+
+# Compact separators: no whitespace on the wire.
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def attribute_value(value):
+    """JSON value of an extension attribute; Binary is base64 text."""
+    if value.__class__ is bytes:
+        return base64.b64encode(value).decode("ascii")
+    return value  # Boolean, Integer and String map onto JSON types
+
+
+def from_canonical(event):
+    """Map a corpus.py canonical event onto its JSON format object.
+
+    Extension attributes without a value are left out: the format has no
+    way to tell an unset attribute from an absent one.
+    """
+    structured = {
+        "specversion": event["specversion"],
+        "id": event["id"],
+        "source": event["source"],
+        "type": event["type"],
+        "datacontenttype": event["datacontenttype"],
+        "time": event["time"].isoformat(),
+    }
+    for name, value in event["attributes"].items():
+        if value is not None:
+            structured[name] = attribute_value(value)
+    data = event["data"]
+    if data.__class__ is bytes:
+        structured["data_base64"] = base64.b64encode(data).decode("ascii")
+    else:
+        structured["data"] = data
+    return structured
+
+
+def encode(event):
+    return _encoder.encode(event).encode()
+
+
+def decode(data):
+    # json.loads() takes bytes and bytearray but not other buffers (an mmap slice).
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def encode_batch(events):
+    return _encoder.encode(events).encode()
+
+
+def decode_batch(data):
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
@@ -0,0 +1,183 @@
+"""Run scenarios across protobuf backends and library versions, side by side.
+
+Which protobuf implementation cloudevents_pb2 runs on is decided when
+google.protobuf is first imported: the upb extension, the C++ extension or
+pure Python, chosen by PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION and by what
+the installed wheel provides. A missing extension falls back to pure Python
+silently, at a fraction of the throughput. Here every scenario runs in a
+fresh interpreter per (library site, backend):
+
+  - a site is the installed packages, or a directory given with --site that
+    holds other versions, e.g. made with
+        pip install --target sites/protobuf-4.25 protobuf==4.25.3
+    and put first on the child's PYTHONPATH;
+  - the protobuf codecs run once per --backend, with the environment
+    variable set; the child reports api_implementation.Type(), so a backend
+    that was asked for but not loaded shows up as a fallback (marked "!")
+    and one that cannot load at all as failed; either exits with status 1;
+  - the other codecs (avro-python3 and the compiled Avro codecs, JSON, ...)
+    run once per site, each compared with the avro (avro-python3) row of
+    the same site, mode, profile and phase; avro is added to the run when
+    another of them is asked for without it.
+
+    python3 matrix.py --codec protobuf --codec avro --codec avro-compiled \
+        --backend upb --backend python --site sites/protobuf-4.25 --events 2000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import corpus
+import harness
+import results as results_file
+
+BACKENDS = ("upb", "cpp", "python")
+INSTALLED = "installed"
+
+
+def uses_protobuf(codec_name):
+    return harness.CODECS[codec_name][0] == "protobuf"
+
+
+def child(spec):
+    codec_name, mode, profile, count, repetitions, warmup, seed = spec
+    results = harness.run_scenario(codec_name, mode, profile, count, repetitions, warmup, seed=seed)
+    environment = results_file.environment()
+    # The avro module the codec imported, whichever distribution provides it.
+    environment["avro"] = getattr(sys.modules.get("avro"), "__version__", None)
+    print(json.dumps({
+        "environment": environment,
+        "results": [result.summary() for result in results],
+    }))
+
+
+def run_isolated(site, backend, spec):
+    env = dict(os.environ)
+    env.pop("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", None)
+    if backend:
+        env["PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION"] = backend
+    if site != INSTALLED:
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.abspath(site), env.get("PYTHONPATH")]))
+    command = [sys.executable, os.path.abspath(__file__), "--child", json.dumps(spec)]
+    completed = subprocess.run(command, capture_output=True, text=True, env=env)
+    if completed.returncode:
+        # An extension that cannot load at all (e.g. cpp on a wheel without it).
+        return {"error": (completed.stderr.strip().splitlines() or ["exit %d" % completed.returncode])[-1]}
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def variant_label(site, backend):
+    name = os.path.basename(os.path.normpath(site))
+    return f"{backend}@{name}" if backend else name
+
+
+def print_table(title, variants, rows):
+    """rows: {(codec, mode, profile, phase): {variant: cell text}}"""
+    width = max([14] + [len(variant_label(*variant)) + 2 for variant in variants]
+                + [len(cell) + 2 for cells in rows.values() for cell in cells.values()])
+    header = f"{title:<42}" + "".join(f"{variant_label(*variant):>{width}}" for variant in variants)
+    print(header)
+    print("-" * len(header))
+    for key, cells in rows.items():
+        print(f"{' '.join(key):<42}" + "".join(f"{cells.get(variant, '-'):>{width}}"
+                                                for variant in variants))
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CloudEvent codec backend/version matrix")
+    parser.add_argument("--codec", action="append", choices=sorted(harness.CODECS),
+                        help="codec to run (repeatable, default: protobuf, avro, avro-compiled)")
+    parser.add_argument("--backend", action="append", choices=BACKENDS,
+                        help="protobuf backend (repeatable, default: upb and python)")
+    parser.add_argument("--site", action="append", default=[],
+                        help="directory with other library versions, put first on PYTHONPATH "
+                             "(repeatable; the installed packages always run)")
+    parser.add_argument("--mode", action="append", choices=sorted(harness.MODES))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=corpus.DEFAULT_SEED)
+    parser.add_argument("--output", metavar="PATH", help="also write every run as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(json.loads(args.child))
+        return 0
+
+    codecs = args.codec or ["protobuf", "avro", "avro-compiled"]
+    if "avro" not in codecs and not all(map(uses_protobuf, codecs)):
+        codecs.append("avro")  # what the other codecs are compared with
+    # avro ahead of the other codecs, so its rates exist when theirs are compared.
+    codecs.sort(key=lambda name: (not uses_protobuf(name), name != "avro"))
+    backends = args.backend or ["upb", "python"]
+    sites = [INSTALLED] + args.site
+    runs = []
+    tables = {}         # title -> (variants, rows)
+    environments = {}   # variant -> what the child actually loaded
+    rates = {}          # (codec, mode, profile, phase, site, backend) -> events/s
+    fallbacks = []
+    for codec_name in codecs:
+        title = "protobuf" if uses_protobuf(codec_name) else "other codecs"
+        variants = [(site, backend) for site in sites
+                    for backend in (backends if uses_protobuf(codec_name) else [None])]
+        rows = tables.setdefault(title, (variants, {}))[1]
+        for mode in args.mode or ["batch", "sequential"]:
+            for profile in args.profile or ["large"]:
+                spec = [codec_name, mode, profile, args.events, args.repetitions, args.warmup, args.seed]
+                for variant in variants:
+                    run = run_isolated(*variant, spec)
+                    runs.append(dict(run, site=variant[0], backend=variant[1], spec=spec))
+                    if "error" in run:
+                        environments.setdefault(variant, {"error": run["error"]})
+                        continue
+                    environments.setdefault(variant, run["environment"])
+                    active = run["environment"]["protobuf_backend"]
+                    fell_back = variant[1] is not None and active != variant[1]
+                    if fell_back and variant not in fallbacks:
+                        fallbacks.append(variant)
+                    for summary in run["results"]:
+                        key = (codec_name, mode, profile, summary["phase"])
+                        rate = summary["events_per_s"]
+                        rates[key + variant] = rate
+                        reference = None
+                        if uses_protobuf(codec_name) and variant != variants[0]:
+                            reference = rates.get(key + variants[0])
+                        elif not uses_protobuf(codec_name) and codec_name != "avro":
+                            reference = rates.get(("avro", mode, profile, summary["phase"]) + variant)
+                        cell = f"{rate:.0f}"
+                        if reference:
+                            cell += f" ({rate / reference:.2f}x)"
+                        rows.setdefault(key, {})[variant] = cell + ("!" if fell_back else "")
+
+    for variant, environment in environments.items():
+        if "error" in environment:
+            print(f"{variant_label(*variant):<20} failed: {environment['error']}")
+            continue
+        line = (f"{variant_label(*variant):<20} python {environment['python']}, "
+                f"protobuf {environment['protobuf']} (asked {variant[1] or '-'}, "
+                f"active {environment['protobuf_backend']})")
+        if environment["avro"]:
+            line += f", avro {environment['avro']}"
+        print(line)
+    print()
+    for title, (variants, rows) in tables.items():
+        compared = "x first column" if title == "protobuf" else "x avro, same site"
+        print_table(f"{title}: events/s ({compared})", variants, rows)
+    for site, backend in fallbacks:
+        print(f"! {variant_label(site, backend)}: {backend} was asked for but "
+              f"{environments[(site, backend)]['protobuf_backend']} was loaded")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(runs, f, indent=2)
+    failed = any("error" in environment for environment in environments.values())
+    return 1 if fallbacks or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
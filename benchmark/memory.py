@@ -0,0 +1,230 @@
+"""Memory accounting for the codecs, measured apart from the timing runs.
+
+harness.py --trace-memory only reports the tracemalloc peak of a pass. It
+does not say what a decoded batch keeps alive afterwards, and it cannot see
+memory that is not allocated through Python's allocator. Here every
+(codec, mode, profile, phase) scenario runs in a fresh interpreter, which:
+
+  1. builds the events; for the decode phase it encodes them and drops the
+     events, so only the messages are live;
+  2. collects garbage, resets the RSS high-water mark (/proc/self/clear_refs)
+     and records the resident size and sys.getallocatedblocks();
+  3. runs the phase once and holds on to its output (the messages for
+     encode, the decoded events or batch for decode), then reports:
+
+       peak RSS     high-water resident size during the phase, over the baseline
+       retained RSS resident size still used once the phase has returned
+       blocks/ev    allocator blocks the output keeps alive, per event
+       deep/ev      bytes of the output's object graph (sys.getsizeof over
+                    gc.get_referents), per event
+       objects/ev   objects in that graph, per event
+
+  4. repeats the phase under tracemalloc for the traced peak and the traced
+     bytes still live afterwards; the difference is the transient garbage.
+
+CPython has no counter of every malloc call, so allocations are counted as
+the blocks the output retains. upb keeps messages in arenas outside Python's
+allocator: where the output is upb or cpp messages (protobuf decode), the
+deep and traced sizes only cover the Python wrappers, so they are printed as
+n/a (the JSON output keeps them) and the RSS columns are the numbers to
+provision from. Encoded bytes and decoded dicts are measured as usual.
+
+    python3 memory.py --codec avro-compiled --codec protobuf --profile large --events 100000
+"""
+import argparse
+import collections.abc
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+import corpus
+import harness
+import results as results_file
+
+PHASES = ("encode", "decode")
+MODES = ("batch", "sequential")
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+# Shared by every event rather than owned by it; never counted.
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType, types.CodeType)
+
+
+def current_rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+def reset_peak_rss():
+    """Reset VmHWM so that peak_rss() covers only what follows; False where
+    the kernel does not allow it (peak_rss() then falls back to ru_maxrss)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def deep_size(root):
+    """(bytes, objects) of everything reachable from root, each object once."""
+    seen = set()
+    stack = [root]
+    size = count = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        count += 1
+        stack.extend(gc.get_referents(obj))
+    return size, count
+
+
+def native_messages(output):
+    """True if output is, or is a sequence of, protobuf messages held by a
+    native backend (upb or cpp) outside Python's allocator."""
+    try:
+        from google.protobuf import message
+        from google.protobuf.internal import api_implementation
+    except ImportError:
+        return False
+    if api_implementation.Type() == "python":
+        return False
+    if isinstance(output, collections.abc.Sequence) and not isinstance(output, (bytes, str)):
+        output = output[0] if len(output) else None
+    return isinstance(output, message.Message)
+
+
+def phase_function(codec, mode, phase):
+    if phase == "encode":
+        if mode == "batch":
+            return codec.encode_batch
+        return lambda events: [codec.encode(event) for event in events]
+    if mode == "batch":
+        return codec.decode_batch
+    return lambda messages: [codec.decode(data) for data in messages]
+
+
+def prepare(codec, mode, phase, profile, count, seed):
+    events = codec.build_events(profile, count, seed)
+    if phase == "encode":
+        return events
+    return phase_function(codec, mode, "encode")(events)
+
+
+def measure(codec_name, mode, phase, profile, count, seed):
+    """Run one scenario in this process; returns the figures as a dict."""
+    codec = harness.load_codec(codec_name)
+    run = phase_function(codec, mode, phase)
+    data = prepare(codec, mode, phase, profile, count, seed)
+    run(prepare(codec, mode, phase, profile, 1, seed))  # warm imports and caches
+
+    gc.collect()
+    exact_peak = reset_peak_rss()
+    baseline_rss = current_rss()
+    baseline_blocks = sys.getallocatedblocks()
+    start = time.perf_counter_ns()
+    output = run(data)
+    elapsed = time.perf_counter_ns() - start
+    gc.collect()
+    figures = {
+        "peak_rss": peak_rss() - baseline_rss,
+        "exact_peak": exact_peak,
+        "retained_rss": current_rss() - baseline_rss,
+        "retained_blocks": sys.getallocatedblocks() - baseline_blocks,
+        "elapsed_ns": elapsed,
+    }
+    figures["deep_bytes"], figures["objects"] = deep_size(output)
+    figures["native"] = native_messages(output)
+    del output
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        output = run(data)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    figures["traced_peak"] = peak
+    figures["traced_retained"] = retained
+    return figures
+
+
+def run_isolated(codec_name, mode, phase, profile, count, seed):
+    spec = json.dumps([codec_name, mode, phase, profile, count, seed])
+    command = [sys.executable, os.path.abspath(__file__), "--child", spec]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CloudEvent codec memory accounting")
+    parser.add_argument("--codec", action="append", choices=sorted(harness.CODECS))
+    parser.add_argument("--mode", action="append", choices=MODES)
+    parser.add_argument("--phase", action="append", choices=PHASES)
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=corpus.DEFAULT_SEED)
+    parser.add_argument("--output", metavar="PATH", help="also write the figures as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(*json.loads(args.child))))
+        return
+
+    header = (f"{'codec':<14} {'mode':<11} {'profile':<8} {'phase':<7} "
+              f"{'peak RSS MB':>11} {'ret RSS MB':>10} {'blocks/ev':>9} {'deep B/ev':>9} "
+              f"{'objects/ev':>10} {'traced pk B/ev':>14} {'transient B/ev':>14}")
+    print(header)
+    print("-" * len(header))
+    rows = []
+    inexact = False
+    for codec_name in args.codec or ["avro-compiled", "protobuf"]:
+        for mode in args.mode or MODES:
+            for profile in args.profile or ["large"]:
+                for phase in args.phase or PHASES:
+                    figures = run_isolated(codec_name, mode, phase, profile, args.events, args.seed)
+                    rows.append(dict(figures, codec=codec_name, mode=mode, profile=profile,
+                                     phase=phase, events=args.events))
+                    inexact = inexact or not figures["exact_peak"]
+                    per_event = lambda key: figures[key] / args.events
+                    if figures["native"]:
+                        # Arena memory: the Python-side figures would read as ~0.
+                        python_side = f"{'n/a':>9} {'n/a':>10} {'n/a':>14} {'n/a':>14}"
+                    else:
+                        python_side = (f"{per_event('deep_bytes'):>9.0f} {per_event('objects'):>10.1f} "
+                                       f"{per_event('traced_peak'):>14.0f} "
+                                       f"{(figures['traced_peak'] - figures['traced_retained']) / args.events:>14.0f}")
+                    print(f"{codec_name:<14} {mode:<11} {profile:<8} {phase:<7} "
+                          f"{figures['peak_rss'] / 2 ** 20:>11.1f} "
+                          f"{figures['retained_rss'] / 2 ** 20:>10.1f} "
+                          f"{per_event('retained_blocks'):>9.1f} {python_side}")
+    if inexact:
+        print("\nVmHWM could not be reset: peak RSS is the process high-water mark over the baseline")
+    if args.output:
+        results_file.write(args.output, rows, args, tool="memory")
+
+
+if __name__ == "__main__":
+    main()
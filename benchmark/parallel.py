@@ -0,0 +1,204 @@
+"""Multi-core scaling of the CloudEvent codecs.
+
+Each worker process builds its own shard of events, then all workers encode
+(and afterwards decode) their shards in lock-step behind a barrier, so the
+phase wall time is measured from the first worker starting to the last one
+finishing. Sweeping the worker count gives the speedup and parallel
+efficiency of every codec.
+
+Events are never pickled: every worker generates its shard locally, from
+its own seed (--seed plus the worker index), so the shards are distinct
+events rather than N copies of one that shared caches would favour. With
+--collect the encoded bytes are handed back to the parent inside the timed
+encode phase, as one joined blob plus an array of lengths per worker sent
+with Connection.send_bytes, which is what a real fan-out encoder would pay.
+
+    python3 parallel.py --codec avro-compiled --codec protobuf --profile large \
+        --events 200000 --workers 1 --workers 2 --workers 4 --target-rate 500000
+"""
+import argparse
+import array
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+
+import corpus
+import harness
+import results as results_file
+
+
+def encode_shard(codec, events, mode, batch_size):
+    if mode == "batch":
+        return [codec.encode_batch(events[i:i + batch_size])
+                for i in range(0, len(events), batch_size)]
+    return [codec.encode(event) for event in events]
+
+
+def decode_shard(codec, serialized, mode):
+    decode = codec.decode_batch if mode == "batch" else codec.decode
+    for data in serialized:
+        decode(data)
+
+
+def worker(codec_name, profile, count, seed, mode, batch_size, repetitions, collect,
+           barrier, conn):
+    codec = harness.load_codec(codec_name)
+    events = codec.build_events(profile, count, seed)
+    clock = time.perf_counter_ns  # CLOCK_MONOTONIC: comparable across processes
+    timings = []
+    serialized = encode_shard(codec, events, mode, batch_size)  # warmup
+    try:
+        for _ in range(repetitions):
+            barrier.wait()
+            start = clock()
+            serialized = encode_shard(codec, events, mode, batch_size)
+            if collect:
+                conn.send_bytes(array.array("Q", map(len, serialized)).tobytes())
+                conn.send_bytes(b"".join(serialized))
+            encode_end = clock()
+
+            barrier.wait()
+            decode_start = clock()
+            decode_shard(codec, serialized, mode)
+            timings.append((start, encode_end, decode_start, clock()))
+    except threading.BrokenBarrierError:
+        # Another worker failed or timed out; closing the pipe tells the parent.
+        conn.close()
+        return
+    conn.send((timings, sum(len(data) for data in serialized)))
+    conn.close()
+
+
+def split(count, workers):
+    base, extra = divmod(count, workers)
+    return [base + (1 if i < extra else 0) for i in range(workers)]
+
+
+def run_workers(codec_name, profile, count, workers, mode="sequential", batch_size=1000,
+                repetitions=3, collect=False, barrier_timeout=600, seed=corpus.DEFAULT_SEED):
+    """Run one configuration; returns [(encode_ns, decode_ns)] per repetition.
+
+    Raises RuntimeError if a worker dies or a barrier wait times out after
+    barrier_timeout seconds, instead of leaving the other workers waiting.
+    """
+    barrier = multiprocessing.Barrier(workers, timeout=barrier_timeout)
+    processes, conns = [], []
+    for index, shard in enumerate(split(count, workers)):
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=worker,
+            args=(codec_name, profile, shard, seed + index, mode, batch_size, repetitions,
+                  collect, barrier, child_conn))
+        process.start()
+        child_conn.close()
+        processes.append(process)
+        conns.append(parent_conn)
+
+    reports = {}
+    failed = 0
+    pending = list(conns)
+    while pending:
+        for conn in multiprocessing.connection.wait(pending):
+            try:
+                if collect and len(reports.get(conn, ())) < 2 * repetitions:
+                    # Collected encodings: lengths, then the joined blob.
+                    reports.setdefault(conn, []).append(conn.recv_bytes())
+                    continue
+                reports[conn] = conn.recv()
+            except EOFError:
+                # The worker exited without its report; release the others.
+                failed += 1
+                barrier.abort()
+            pending.remove(conn)
+    for process in processes:
+        process.join()
+    if failed:
+        raise RuntimeError(f"{codec_name}: {failed} of {workers} workers returned no report "
+                           f"(exit codes {[process.exitcode for process in processes]})")
+
+    per_rep = []
+    for rep in range(repetitions):
+        timings = [reports[conn][0][rep] for conn in conns]
+        encode_ns = max(t[1] for t in timings) - min(t[0] for t in timings)
+        decode_ns = max(t[3] for t in timings) - min(t[2] for t in timings)
+        per_rep.append((encode_ns, decode_ns))
+    return per_rep
+
+
+def sweep(codec_name, profile, count, worker_counts, **kwargs):
+    """Return {phase: [(workers, events/s)]} for each worker count."""
+    curves = {"encode": [], "decode": []}
+    for workers in worker_counts:
+        per_rep = run_workers(codec_name, profile, count, workers, **kwargs)
+        encode_ns = sorted(rep[0] for rep in per_rep)[len(per_rep) // 2]
+        decode_ns = sorted(rep[1] for rep in per_rep)[len(per_rep) // 2]
+        curves["encode"].append((workers, count / (encode_ns / 1e9)))
+        curves["decode"].append((workers, count / (decode_ns / 1e9)))
+    return curves
+
+
+def cores_needed(curve, target_rate):
+    for workers, rate in curve:
+        if rate >= target_rate:
+            return str(workers)
+    # Extrapolate from the best observed per-core rate.
+    per_core = max(rate / workers for workers, rate in curve)
+    return f">{curve[-1][0]} (~{target_rate / per_core:.0f} at best efficiency)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CloudEvent codec multi-core scaling")
+    parser.add_argument("--codec", action="append", choices=sorted(harness.CODECS))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--mode", choices=("sequential", "batch"), default="sequential")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="events per batch message in batch mode")
+    parser.add_argument("--events", type=int, default=100000,
+                        help="total events, split across the workers")
+    parser.add_argument("--workers", action="append", type=int,
+                        help="worker counts to sweep (default: 1..cpu count)")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--collect", action="store_true",
+                        help="send encoded bytes back to the parent during encode")
+    parser.add_argument("--target-rate", type=float,
+                        help="events/s to size the number of cores for")
+    parser.add_argument("--barrier-timeout", type=float, default=600,
+                        help="seconds a worker waits for the others before the run fails")
+    parser.add_argument("--seed", type=int, default=corpus.DEFAULT_SEED,
+                        help="corpus seed of the first worker; worker i uses seed + i")
+    parser.add_argument("--output", metavar="PATH", help="also write the rows as JSON")
+    args = parser.parse_args(argv)
+    worker_counts = args.workers or list(range(1, (os.cpu_count() or 1) + 1))
+
+    header = (f"{'codec':<14} {'profile':<8} {'phase':<7} {'workers':>7} "
+              f"{'events/s':>12} {'speedup':>8} {'efficiency':>10}")
+    print(header)
+    print("-" * len(header))
+    rows = []
+    for codec_name in args.codec or sorted(harness.CODECS):
+        for profile in args.profile or harness.PROFILES:
+            curves = sweep(codec_name, profile, args.events, worker_counts,
+                           mode=args.mode, batch_size=args.batch_size,
+                           repetitions=args.repetitions, collect=args.collect,
+                           barrier_timeout=args.barrier_timeout, seed=args.seed)
+            for phase, curve in curves.items():
+                base_workers, base_rate = curve[0]
+                for workers, rate in curve:
+                    speedup = rate / base_rate * base_workers
+                    rows.append({"codec": codec_name, "profile": profile, "mode": args.mode,
+                                 "phase": phase, "workers": workers, "events": args.events,
+                                 "events_per_s": rate, "speedup": speedup,
+                                 "efficiency": speedup / workers})
+                    print(f"{codec_name:<14} {profile:<8} {phase:<7} {workers:>7} "
+                          f"{rate:>12.0f} {speedup:>8.2f} {speedup / workers:>10.2f}")
+                if args.target_rate:
+                    print(f"{'':<14} {'':<8} {phase:<7} cores for {args.target_rate:.0f} events/s: "
+                          f"{cores_needed(curve, args.target_rate)}")
+    if args.output:
+        results_file.write(args.output, rows, args, tool="parallel")
+
+
+if __name__ == "__main__":
+    main()
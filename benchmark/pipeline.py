@@ -0,0 +1,243 @@
+"""asyncio producer -> encoder -> transport -> decoder pipeline.
+
+A producer offers events at a fixed rate, an encoder stage serializes them
+with one of the harness codecs into length-prefixed frames, a send stage
+writes the frames to a local transport (a Unix socket, or an in-memory
+stream with the same write/drain/readexactly interface), a receive stage
+reads them back and a decoder stage decodes them. Every pair of stages is
+connected by a bounded queue and the transport applies drain()
+backpressure, so a slow stage throttles the ones before it instead of
+buffering without limit.
+
+Latency is measured from an event's release by the producer until it has
+been decoded. The producer releases every event that is due whenever it
+wakes up; how late that is against the offered schedule is reported as
+generator lag, so timer overshoot is neither counted as pipeline latency
+nor hidden (a stalled pipeline shows up as lag through backpressure).
+
+    python3 pipeline.py --codec protobuf --profile large --events 50000 \
+        --rate 20000 --transport unix
+"""
+import argparse
+import asyncio
+import collections
+import os
+import statistics
+import struct
+import tempfile
+import time
+
+import harness
+import results as results_file
+
+FRAME_HEADER = struct.Struct(">I")
+SPIN_NS = 1_000_000  # gaps shorter than this are waited out by yielding, not sleeping
+
+
+class MemoryStream:
+    """In-memory byte stream with StreamWriter/StreamReader-like methods."""
+
+    def __init__(self, high_water=64 * 1024):
+        self._buffer = bytearray()
+        self._high_water = high_water
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._closed = False
+
+    # writer side
+    def write(self, data):
+        self._buffer += data
+        self._readable.set()
+        if len(self._buffer) >= self._high_water:
+            self._writable.clear()
+
+    async def drain(self):
+        await self._writable.wait()
+
+    def close(self):
+        self._closed = True
+        self._readable.set()
+
+    async def wait_closed(self):
+        pass
+
+    # reader side
+    async def readexactly(self, n):
+        while len(self._buffer) < n:
+            if self._closed:
+                raise asyncio.IncompleteReadError(bytes(self._buffer), n)
+            self._readable.clear()
+            await self._readable.wait()
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        if len(self._buffer) < self._high_water:
+            self._writable.set()
+        return data
+
+
+async def open_transport(kind):
+    """Return (reader, writer, cleanup) for the requested local transport."""
+    if kind == "memory":
+        stream = MemoryStream()
+        return stream, stream, None
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "pipeline.sock")
+    accepted = asyncio.get_running_loop().create_future()
+
+    async def on_connect(reader, writer):
+        accepted.set_result((reader, writer))
+
+    server = await asyncio.start_unix_server(on_connect, path)
+    _, writer = await asyncio.open_unix_connection(path)
+    reader, server_writer = await accepted
+
+    async def cleanup():
+        server_writer.close()
+        server.close()
+        await server.wait_closed()
+        os.remove(path)
+        os.rmdir(directory)
+    return reader, writer, cleanup
+
+
+async def produce(events, count, rate, queue, lags):
+    clock = time.perf_counter_ns
+    interval = 1e9 / rate if rate else 0
+    start = clock()
+    i = 0
+    while i < count:
+        now = clock()
+        if interval:
+            due = start + int(i * interval)
+            if due > now:
+                # Event-loop timers overshoot by about half a millisecond, so
+                # sleep through the bulk of a gap and yield through the rest.
+                await asyncio.sleep(max(0, due - now - SPIN_NS) / 1e9)
+                continue
+            # How late the generator releases an event; every event that is
+            # due goes out on this wakeup, so lateness does not accumulate.
+            lags.append(now - due)
+        await queue.put((now, events[i % len(events)]))
+        i += 1
+    await queue.put(None)
+
+
+async def encode_stage(codec, queue, frames):
+    total = 0
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        released, event = item
+        data = codec.encode(event)
+        await frames.put((released, FRAME_HEADER.pack(len(data)) + data))
+        total += len(data)
+    await frames.put(None)
+    return total
+
+
+async def send_stage(frames, writer, sent_at):
+    while True:
+        item = await frames.get()
+        if item is None:
+            break
+        released, frame = item
+        sent_at.append(released)  # the transport keeps order, so a FIFO suffices
+        writer.write(frame)
+        await writer.drain()
+    writer.close()
+
+
+async def receive_stage(count, reader, sent_at, received):
+    for _ in range(count):
+        header = await reader.readexactly(FRAME_HEADER.size)
+        data = await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+        await received.put((sent_at.popleft(), data))
+    await received.put(None)
+
+
+async def decode_stage(codec, received, latencies):
+    clock = time.perf_counter_ns
+    while True:
+        item = await received.get()
+        if item is None:
+            return clock()
+        released, data = item
+        codec.decode(data)
+        latencies.append(clock() - released)
+
+
+async def run_pipeline(codec, events, count, rate=0, transport="memory", queue_size=1024):
+    """Returns (latencies, generator lags, elapsed ns, encoded bytes)."""
+    queue, frames, received = (asyncio.Queue(maxsize=queue_size) for _ in range(3))
+    reader, writer, cleanup = await open_transport(transport)
+    sent_at = collections.deque()
+    latencies, lags = [], []
+    start = time.perf_counter_ns()
+    _, total, _, _, end = await asyncio.gather(
+        produce(events, count, rate, queue, lags),
+        encode_stage(codec, queue, frames),
+        send_stage(frames, writer, sent_at),
+        receive_stage(count, reader, sent_at, received),
+        decode_stage(codec, received, latencies))
+    if cleanup is not None:
+        await cleanup()
+    return latencies, lags, end - start, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CloudEvent asyncio pipeline benchmark")
+    parser.add_argument("--codec", action="append", choices=sorted(harness.CODECS))
+    parser.add_argument("--profile", action="append", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rate", action="append", type=float,
+                        help="offered load in events/s (repeatable, 0 = as fast as possible)")
+    parser.add_argument("--transport", choices=("memory", "unix"), default="memory")
+    parser.add_argument("--queue-size", type=int, default=1024,
+                        help="bound of each queue between two stages")
+    parser.add_argument("--pool", type=int, default=1000,
+                        help="distinct events generated and cycled by the producer")
+    parser.add_argument("--output", metavar="PATH", help="also write the rows as JSON")
+    args = parser.parse_args(argv)
+
+    header = (f"{'codec':<14} {'profile':<8} {'offered/s':>10} {'achieved/s':>11} "
+              f"{'median us':>10} {'p95 us':>10} {'p99 us':>10} {'max us':>10} "
+              f"{'lag p50 us':>10} {'lag p99 us':>10}")
+    print(header)
+    print("-" * len(header))
+    rows = []
+    for codec_name in args.codec or sorted(harness.CODECS):
+        codec = harness.load_codec(codec_name)
+        for profile in args.profile or harness.PROFILES:
+            events = codec.build_events(profile, min(args.pool, args.events))
+            for rate in args.rate or [0]:
+                latencies, lags, elapsed, _ = asyncio.run(run_pipeline(
+                    codec, events, args.events, rate, args.transport, args.queue_size))
+                latencies.sort()
+                lags.sort()
+                rows.append({
+                    "codec": codec_name, "profile": profile, "rate": rate, "events": args.events,
+                    "events_per_s": args.events / (elapsed / 1e9),
+                    "median_ns": statistics.median(latencies),
+                    "p95_ns": harness.percentile(latencies, 95),
+                    "p99_ns": harness.percentile(latencies, 99),
+                    "max_ns": latencies[-1],
+                    "lag_p50_ns": harness.percentile(lags, 50) if lags else None,
+                    "lag_p99_ns": harness.percentile(lags, 99) if lags else None,
+                })
+                offered = f"{rate:.0f}" if rate else "max"
+                lag = (f"{harness.percentile(lags, 50) / 1000:>10.1f} "
+                       f"{harness.percentile(lags, 99) / 1000:>10.1f}" if lags else f"{'-':>10} {'-':>10}")
+                print(f"{codec_name:<14} {profile:<8} {offered:>10} "
+                      f"{args.events / (elapsed / 1e9):>11.0f} "
+                      f"{statistics.median(latencies) / 1000:>10.1f} "
+                      f"{harness.percentile(latencies, 95) / 1000:>10.1f} "
+                      f"{harness.percentile(latencies, 99) / 1000:>10.1f} "
+                      f"{latencies[-1] / 1000:>10.1f} {lag}")
+    if args.output:
+        results_file.write(args.output, rows, args, tool="pipeline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Opt-in profiling of a harness scenario.
+
+    python3 profiling.py --codec avro-compiled --mode sequential --profile large \
+        --events 2000 --output profiles --fields
+
+runs the scenario three times, never inside the timed harness runs:
+
+  - under cProfile, writing <output>/<scenario>.prof (for pstats, snakeviz)
+    and printing the functions with the most cumulative time;
+  - under a stack sampler (SIGPROF every --interval ms of CPU time), writing
+    <output>/<scenario>.folded in the collapsed-stack format flamegraph.pl,
+    speedscope and inferno read. cProfile only records caller -> callee
+    pairs, not whole stacks, so the folded stacks come from the sampler;
+  - with --fields and an Avro codec, through the codec's own writer
+    instrumented with avro_compiled.FieldProbe (avro.io.DatumWriter for
+    avro, the compiled writer for the others), printing the time and bytes
+    spent on every schema field and union branch.
+"""
+import argparse
+import collections
+import cProfile
+import io
+import os
+import pstats
+import signal
+
+import corpus
+import harness
+
+
+class StackSampler:
+    """Sample the main thread's Python stack on SIGPROF (CPU time)."""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = collections.Counter()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous)
+
+    def write_folded(self, path):
+        with open(path, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def field_costs(codec, events, mode):
+    """Encode events with the writer codec uses, instrumented with an
+    avro_compiled.FieldProbe; returns (writer description, probe).
+
+    The avro codec writes through avro.io.DatumWriter, so its costs come from
+    a ProbedDatumWriter; the other Avro codecs write through avro_compiled.
+    """
+    import avro.io
+    import avro_benchmark
+    import avro_compiled
+    import avro_dictionary
+    probe = avro_compiled.FieldProbe()
+    if mode != "batch":
+        schema, data = avro_benchmark.schema_sequencial, events
+    elif codec.name == "avro-dict":
+        schema, data = avro_benchmark.schema_dictionary_batch, [avro_dictionary.to_batch(events)]
+    else:
+        schema, data = avro_benchmark.schema_batch, [{"events": events}]
+    if codec.name == "avro":
+        writer = avro_compiled.ProbedDatumWriter(schema, probe)
+        for datum in data:
+            writer.write(datum, avro.io.BinaryEncoder(io.BytesIO()))
+        return f"avro.io.DatumWriter, {schema.name}", probe
+    writer = avro_compiled.CompiledSchema(schema, probe)
+    for datum in data:
+        writer.encode(datum)
+    return f"avro_compiled writer, {schema.name}", probe
+
+
+def print_field_costs(description, probe):
+    print(f"encode cost per field and union branch ({description})")
+    costs = [(label, cost) for label, cost in probe.costs.items() if cost[0]]
+    total_ns = sum(cost[2] for _, cost in costs) or 1
+    total_bytes = sum(cost[4] for _, cost in costs) or 1
+    header = (f"{'field / branch':<36} {'calls':>9} {'incl ms':>9} {'self ms':>9} {'self %':>7} "
+              f"{'incl KB':>10} {'self KB':>10} {'self %':>7}")
+    print(header)
+    print("-" * len(header))
+    for label, (calls, ns, self_ns, size, self_size) in sorted(costs, key=lambda item: -item[1][2]):
+        print(f"{label:<36} {calls:>9} {ns / 1e6:>9.2f} {self_ns / 1e6:>9.2f} "
+              f"{self_ns / total_ns:>7.1%} {size / 1024:>10.1f} {self_size / 1024:>10.1f} "
+              f"{self_size / total_bytes:>7.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile a CloudEvent codec scenario")
+    parser.add_argument("--codec", required=True, choices=sorted(harness.CODECS))
+    parser.add_argument("--mode", default="sequential", choices=sorted(harness.MODES))
+    parser.add_argument("--profile", default="large", choices=harness.PROFILES)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--repetitions", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=corpus.DEFAULT_SEED)
+    parser.add_argument("--output", default="profiles", help="directory for .prof and .folded files")
+    parser.add_argument("--interval", type=float, default=1.0, help="sampling interval in ms of CPU time")
+    parser.add_argument("--top", type=int, default=25, help="functions to list from cProfile")
+    parser.add_argument("--fields", action="store_true",
+                        help="per schema field / union branch encode cost (Avro codecs)")
+    args = parser.parse_args(argv)
+    if args.fields and not args.codec.startswith("avro"):
+        parser.error("--fields needs an Avro codec")
+
+    codec = harness.load_codec(args.codec)
+    events = codec.build_events(args.profile, args.events, args.seed)
+    run = harness.MODES[args.mode]
+    os.makedirs(args.output, exist_ok=True)
+    base = os.path.join(args.output, f"{args.codec}-{args.mode}-{args.profile}")
+
+    run(codec, events, 1, 0)  # warm caches and compiled schemas outside the profiles
+    profiler = cProfile.Profile()
+    profiler.runcall(run, codec, events, args.repetitions, 0)
+    profiler.dump_stats(base + ".prof")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.top)
+
+    with StackSampler(args.interval / 1000) as sampler:
+        run(codec, events, args.repetitions, 0)
+    sampler.write_folded(base + ".folded")
+    print(f"wrote {base}.prof and {base}.folded ({sum(sampler.stacks.values())} samples)")
+
+    if args.fields:
+        print()
+        print_field_costs(*field_costs(codec, events, args.mode))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: adevents.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0e\x61\x64\x65vents.proto\"\xbf\x01\n\x07\x41\x64\x45vent\x12\n\n\x02id\x18\x01 \x01(\x03\x12\x0f\n\x07\x63ountry\x18\x02 \x01(\t\x12\x0e\n\x06\x64\x65vice\x18\x03 \x01(\x05\x12\x0c\n\x04zone\x18\x04 \x01(\x05\x12\x15\n\rpricing_model\x18\x05 \x01(\x05\x12\x11\n\tbid_floor\x18\x06 \x01(\x01\x12\x13\n\x0bsmart_price\x18\x07 \x01(\x01\x12\x15\n\rwinning_price\x18\x08 \x01(\x01\x12\x12\n\nevent_type\x18\t \x01(\x05\x12\x0f\n\x07network\x18\n \x01(\x05\"\x89\n\n\x0cLargeAdEvent\x12\n\n\x02id\x18\x01 \x01(\x03\x12\x0f\n\x07\x63ountry\x18\x02 \x01(\t\x12\x0e\n\x06\x64\x65vice\x18\x03 \x01(\x05\x12\x0c\n\x04zone\x18\x04 \x01(\x05\x12-\n\x0b\x64\x61ta_string\x18\x05 \x01(\x0b\x32\x18.LargeAdEvent.DataString\x12,\n\tdata_json\x18\x06 \x01(\x0b\x32\x19.LargeAdEvent.UserProfile\x12\x15\n\rpricing_model\x18\x07 \x01(\x05\x12\x11\n\tbid_floor\x18\x08 \x01(\x01\x12\x13\n\x0bsmart_price\x18\t \x01(\x01\x12\x15\n\rwinning_price\x18\n \x01(\x01\x12\x12\n\nevent_type\x18\x0b \x01(\x05\x12\x0f\n\x07network\x18\x0c \x01(\x05\x12\x36\n\x10\x63loud_event_data\x18\r \x01(\x0b\x32\x1c.LargeAdEvent.CloudEventData\x1a#\n\nDataString\x12\x15\n\rrandom_string\x18\x01 \x01(\t\x1a\x9e\x05\n\x0bUserProfile\x12\x11\n\tis_active\x18\x01 \x01(\x08\x12\x0f\n\x07user_id\x18\x02 \x01(\t\x12\r\n\x05price\x18\x03 \x01(\x01\x12\x10\n\x08username\x18\x04 \x01(\t\x12\x13\n\x0bis_verified\x18\x05 \x01(\x08\x12\x0b\n\x03\x61ge\x18\x06 \x01(\x05\x12\x15\n\rdiscount_rate\x18\x07 \x01(\x01\x12\r\n\x05\x65mail\x18\x08 \x01(\t\x12\x13\n\x0bhas_premium\x18\t \x01(\x08\x12\x0e\n\x06rating\x18\n \x01(\x01\x12\x16\n\x0elogin_attempts\x18\x0b \x01(\x05\x12\x17\n\x0f\x61\x63\x63ount_balance\x18\x0c \x01(\x01\x12\x0f\n\x07\x63ountry\x18\r \x01(\t\x12\x1a\n\x12subscription_level\x18\x0e \x01(\t\x12\x1d\n\x15notifications_enabled\x18\x0f \x01(\x08\x12\x1b\n\x13last_login_days_ago\x18\x10 \x01(\x05\x12\x16\n\x0emax_storage_gb\x18\x11 \x01(\x05\x12\x11\n\tcpu_cores\x18\x12 \x01(\x05\x12\x1b\n\x13temperature_celsius\x18\x13 \x01(\x01\x12\x16\n\x0e\x66\x61vorite_color\x18\x14 \x01(\t\x12\x16\n\x0e\x65mail_verified\x18\x15 \x01(\x08\x12\x15\n\ritems_in_cart\x18\x16 \x01(\x05\x12\x1c\n\x14session_time_minutes\x18\x17 \x01(\x01\x12\x0b\n\x03\x62io\x18\x18 \x01(\t\x12\x10\n\x08is_admin\x18\x19 \x01(\x08\x12\x13\n\x0bposts_count\x18\x1a \x01(\x05\x12\x1d\n\x15\x61verage_response_time\x18\x1b \x01(\x01\x12\x10\n\x08timezone\x18\x1c \x01(\t\x12\x1b\n\x13notifications_count\x18\x1d \x01(\x05\x12\x14\n\x0cis_beta_user\x18\x1e \x01(\x08\x1aX\n\x0e\x43loudEventData\x12$\n\x06\x64\x65tail\x18\x01 \x01(\x0b\x32\x14.LargeAdEvent.Detail\x12 \n\x04note\x18\x02 \x01(\x0b\x32\x12.LargeAdEvent.Note\x1a\x61\n\x06\x44\x65tail\x12\x11\n\x04key1\x18\x01 \x01(\tH\x00\x88\x01\x01\x12\x0c\n\x04key2\x18\x02 \x01(\x08\x12\x0c\n\x04key3\x18\x03 \x01(\x01\x12\x0c\n\x04key4\x18\x04 \x01(\t\x12\x11\n\tinner_key\x18\x05 \x01(\tB\x07\n\x05_key1\x1a+\n\x04Note\x12\x13\n\x0b\x61nother_key\x18\x01 \x01(\t\x12\x0e\n\x06number\x18\x02 \x01(\x01\x62\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'adevents_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _ADEVENT._serialized_start=19
+  _ADEVENT._serialized_end=210
+  _LARGEADEVENT._serialized_start=213
+  _LARGEADEVENT._serialized_end=1502
+  _LARGEADEVENT_DATASTRING._serialized_start=560
+  _LARGEADEVENT_DATASTRING._serialized_end=595
+  _LARGEADEVENT_USERPROFILE._serialized_start=598
+  _LARGEADEVENT_USERPROFILE._serialized_end=1268
+  _LARGEADEVENT_CLOUDEVENTDATA._serialized_start=1270
+  _LARGEADEVENT_CLOUDEVENTDATA._serialized_end=1358
+  _LARGEADEVENT_DETAIL._serialized_start=1360
+  _LARGEADEVENT_DETAIL._serialized_end=1457
+  _LARGEADEVENT_NOTE._serialized_start=1459
+  _LARGEADEVENT_NOTE._serialized_end=1502
+# @@protoc_insertion_point(module_scope)
@@ -15,7 +15,7 @@ from google.protobuf import any_pb2 as google_dot_protobuf_dot_any__pb2
 from google.protobuf import timestamp_pb2 as google_dot_protobuf_dot_timestamp__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11\x63loudevents.proto\x1a\x19google/protobuf/any.proto\x1a\x1fgoogle/protobuf/timestamp.proto\"\x8c\x04\n\nCloudEvent\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0e\n\x06source\x18\x02 \x01(\t\x12\x14\n\x0cspec_version\x18\x03 \x01(\t\x12\x0c\n\x04type\x18\x04 \x01(\t\x12/\n\nattributes\x18\x05 \x03(\x0b\x32\x1b.CloudEvent.AttributesEntry\x12\x15\n\x0b\x62inary_data\x18\x06 \x01(\x0cH\x00\x12\x13\n\ttext_data\x18\x07 \x01(\tH\x00\x12*\n\nproto_data\x18\x08 \x01(\x0b\x32\x14.google.protobuf.AnyH\x00\x1aW\n\x0f\x41ttributesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x33\n\x05value\x18\x02 \x01(\x0b\x32$.CloudEvent.CloudEventAttributeValue:\x02\x38\x01\x1a\xd3\x01\n\x18\x43loudEventAttributeValue\x12\x14\n\nce_boolean\x18\x01 \x01(\x08H\x00\x12\x14\n\nce_integer\x18\x02 \x01(\x05H\x00\x12\x13\n\tce_string\x18\x03 \x01(\tH\x00\x12\x12\n\x08\x63\x65_bytes\x18\x04 \x01(\x0cH\x00\x12\x10\n\x06\x63\x65_uri\x18\x05 \x01(\tH\x00\x12\x14\n\nce_uri_ref\x18\x06 \x01(\tH\x00\x12\x32\n\x0c\x63\x65_timestamp\x18\x07 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x00\x42\x06\n\x04\x61ttrB\x06\n\x04\x64\x61ta\".\n\x0f\x43loudEventBatch\x12\x1b\n\x06\x65vents\x18\x01 \x03(\x0b\x32\x0b.CloudEventb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11\x63loudevents.proto\x1a\x19google/protobuf/any.proto\x1a\x1fgoogle/protobuf/timestamp.proto\"\x8c\x04\n\nCloudEvent\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0e\n\x06source\x18\x02 \x01(\t\x12\x14\n\x0cspec_version\x18\x03 \x01(\t\x12\x0c\n\x04type\x18\x04 \x01(\t\x12/\n\nattributes\x18\x05 \x03(\x0b\x32\x1b.CloudEvent.AttributesEntry\x12\x15\n\x0b\x62inary_data\x18\x06 \x01(\x0cH\x00\x12\x13\n\ttext_data\x18\x07 \x01(\tH\x00\x12*\n\nproto_data\x18\x08 \x01(\x0b\x32\x14.google.protobuf.AnyH\x00\x1aW\n\x0f\x41ttributesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x33\n\x05value\x18\x02 \x01(\x0b\x32$.CloudEvent.CloudEventAttributeValue:\x02\x38\x01\x1a\xd3\x01\n\x18\x43loudEventAttributeValue\x12\x14\n\nce_boolean\x18\x01 \x01(\x08H\x00\x12\x14\n\nce_integer\x18\x02 \x01(\x05H\x00\x12\x13\n\tce_string\x18\x03 \x01(\tH\x00\x12\x12\n\x08\x63\x65_bytes\x18\x04 \x01(\x0cH\x00\x12\x10\n\x06\x63\x65_uri\x18\x05 \x01(\tH\x00\x12\x14\n\nce_uri_ref\x18\x06 \x01(\tH\x00\x12\x32\n\x0c\x63\x65_timestamp\x18\x07 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x00\x42\x06\n\x04\x61ttrB\x06\n\x04\x64\x61ta\".\n\x0f\x43loudEventBatch\x12\x1b\n\x06\x65vents\x18\x01 \x03(\x0b\x32\x0b.CloudEvent\"\xe6\x01\n\x12\x43loudEventEnvelope\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0e\n\x06source\x18\x02 \x01(\t\x12\x14\n\x0cspec_version\x18\x03 \x01(\t\x12\x0c\n\x04type\x18\x04 \x01(\t\x12\x37\n\nattributes\x18\x05 \x03(\x0b\x32#.CloudEventEnvelope.AttributesEntry\x1aW\n\x0f\x41ttributesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x33\n\x05value\x18\x02 \x01(\x0b\x32$.CloudEvent.CloudEventAttributeValue:\x02\x38\x01\"S\n\x19\x44ictionaryCloudEventBatch\x12\x0f\n\x07strings\x18\x01 \x03(\t\x12%\n\x06\x65vents\x18\x02 \x03(\x0b\x32\x15.DictionaryCloudEvent\"\xc9\x04\n\x14\x44ictionaryCloudEvent\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0e\n\x06source\x18\x02 \x01(\r\x12\x14\n\x0cspec_version\x18\x03 \x01(\r\x12\x0c\n\x04type\x18\x04 \x01(\r\x12\x39\n\nattributes\x18\x05 \x03(\x0b\x32%.DictionaryCloudEvent.AttributesEntry\x12\x15\n\x0b\x62inary_data\x18\x06 \x01(\x0cH\x00\x12\x13\n\ttext_data\x18\x07 \x01(\tH\x00\x12*\n\nproto_data\x18\x08 \x01(\x0b\x32\x14.google.protobuf.AnyH\x00\x1aW\n\x0f\x41ttributesEntry\x12\x0b\n\x03key\x18\x01 \x01(\r\x12\x33\n\x05value\x18\x02 \x01(\x0b\x32$.DictionaryCloudEvent.AttributeValue:\x02\x38\x01\x1a\xfc\x01\n\x0e\x41ttributeValue\x12\x14\n\nce_boolean\x18\x01 \x01(\x08H\x00\x12\x14\n\nce_integer\x18\x02 \x01(\x05H\x00\x12\x13\n\tce_string\x18\x03 \x01(\tH\x00\x12\x12\n\x08\x63\x65_bytes\x18\x04 \x01(\x0cH\x00\x12\x10\n\x06\x63\x65_uri\x18\x05 \x01(\tH\x00\x12\x14\n\nce_uri_ref\x18\x06 \x01(\tH\x00\x12\x32\n\x0c\x63\x65_timestamp\x18\x07 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x00\x12\x19\n\x0f\x63\x65_string_index\x18\x08 \x01(\rH\x00\x12\x16\n\x0c\x63\x65_uri_index\x18\t \x01(\rH\x00\x42\x06\n\x04\x61ttrB\x06\n\x04\x64\x61tab\x06proto3')
 
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'cloudevents_pb2', globals())
@@ -24,6 +24,10 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
   _CLOUDEVENT_ATTRIBUTESENTRY._options = None
   _CLOUDEVENT_ATTRIBUTESENTRY._serialized_options = b'8\001'
+  _CLOUDEVENTENVELOPE_ATTRIBUTESENTRY._options = None
+  _CLOUDEVENTENVELOPE_ATTRIBUTESENTRY._serialized_options = b'8\001'
+  _DICTIONARYCLOUDEVENT_ATTRIBUTESENTRY._options = None
+  _DICTIONARYCLOUDEVENT_ATTRIBUTESENTRY._serialized_options = b'8\001'
   _CLOUDEVENT._serialized_start=82
   _CLOUDEVENT._serialized_end=606
   _CLOUDEVENT_ATTRIBUTESENTRY._serialized_start=297
@@ -32,4 +36,16 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _CLOUDEVENT_CLOUDEVENTATTRIBUTEVALUE._serialized_end=598
   _CLOUDEVENTBATCH._serialized_start=608
   _CLOUDEVENTBATCH._serialized_end=654
+  _CLOUDEVENTENVELOPE._serialized_start=657
+  _CLOUDEVENTENVELOPE._serialized_end=887
+  _CLOUDEVENTENVELOPE_ATTRIBUTESENTRY._serialized_start=297
+  _CLOUDEVENTENVELOPE_ATTRIBUTESENTRY._serialized_end=384
+  _DICTIONARYCLOUDEVENTBATCH._serialized_start=889
+  _DICTIONARYCLOUDEVENTBATCH._serialized_end=972
+  _DICTIONARYCLOUDEVENT._serialized_start=975
+  _DICTIONARYCLOUDEVENT._serialized_end=1560
+  _DICTIONARYCLOUDEVENT_ATTRIBUTESENTRY._serialized_start=1210
+  _DICTIONARYCLOUDEVENT_ATTRIBUTESENTRY._serialized_end=1297
+  _DICTIONARYCLOUDEVENT_ATTRIBUTEVALUE._serialized_start=1300
+  _DICTIONARYCLOUDEVENT_ATTRIBUTEVALUE._serialized_end=1552
 # @@protoc_insertion_point(module_scope)
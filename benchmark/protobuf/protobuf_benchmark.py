@@ -1,401 +1,125 @@
-import json
 from cloudevents_pb2 import CloudEvent, CloudEventBatch
-from google.protobuf import timestamp_pb2
-from google.protobuf.any_pb2 import Any
-from datetime import datetime, UTC
-import time
-import tracemalloc
-import uuid
-import random
-import string
-
-simple_message = []
-large_message = []
-
-def create_cloud_event(id):
-    event = CloudEvent()
-
-    # Required Attributes
-    event.id = str(uuid.uuid4())
-    event.source = "/my/source"
-    event.spec_version = "1.0"
-    event.type = "click"
-
-
-    # Optional and Extension Attributes
-    ts = timestamp_pb2.Timestamp()
-    ts.FromDatetime(datetime.now(UTC))
-    attr_val_ts = CloudEvent.CloudEventAttributeValue()
-    attr_val_ts.ce_timestamp.CopyFrom(ts)
-    event.attributes["time"].CopyFrom(attr_val_ts)
-
-    datacontent_type = CloudEvent.CloudEventAttributeValue()
-    datacontent_type.ce_uri = "application/json"
-    event.attributes["datacontenttype"].CopyFrom(datacontent_type)
-
-    payload = CloudEvent.CloudEventAttributeValue()
-    payload.ce_bytes = b"\x01\x10"
-    event.attributes["payload"].CopyFrom(payload)
-
-    # Set data
-    data = {
-        "id": int(id),
-        "country": '' . join(random.choices(string.ascii_letters + string.digits, k=300)),
-        "device": random.randint(0, 100),
-        "zone": random.randint(0, 100),
-        "pricing_model": random.randint(0, 100),
-        "bid_floor": random.uniform(0, 100),
-        "smart_price": random.uniform(0, 100),
-        "winning_price": random.uniform(0, 100),
-        "event_type": random.randint(0, 100),
-        "network": random.randint(0, 100)
-    }
-    event.text_data = json.dumps(data)
-    
-    return event
-
-def create_cloud_event_large(id):
-    event = CloudEvent()
-
-    # Required Attributes
-    event.id = str(uuid.uuid4())
-    event.source = "/my/source"
-    event.spec_version = "1.0"
-    event.type = "click"
-
-    # Optional and Extension Attributes
-    processed = CloudEvent.CloudEventAttributeValue()
-    processed.ce_boolean = True
-    event.attributes["processed"].CopyFrom(processed)
-
-    attr_val_int = CloudEvent.CloudEventAttributeValue()
-    attr_val_int.ce_integer = 42
-    event.attributes["count"].CopyFrom(attr_val_int)
-
-    ts = timestamp_pb2.Timestamp()
-    ts.FromDatetime(datetime.now(UTC))
-    attr_val_ts = CloudEvent.CloudEventAttributeValue()
-    attr_val_ts.ce_timestamp.CopyFrom(ts)
-    event.attributes["time"].CopyFrom(attr_val_ts)
-
-    datacontent_type = CloudEvent.CloudEventAttributeValue()
-    datacontent_type.ce_uri = "application/json"
-    event.attributes["datacontenttype"].CopyFrom(datacontent_type)
-
-    payload = CloudEvent.CloudEventAttributeValue()
-    payload.ce_bytes = b"\x01\x10"
-    event.attributes["datacontenttype"].CopyFrom(payload)
-
-    priority = CloudEvent.CloudEventAttributeValue()
-    priority.ce_integer = 5
-    event.attributes["priority"].CopyFrom(priority)
-
-    region = CloudEvent.CloudEventAttributeValue()
-    region.ce_uri = "us-west"
-    event.attributes["region"].CopyFrom(region)
-
-    retry = CloudEvent.CloudEventAttributeValue()
-    retry.ce_boolean = False
-    event.attributes["retry"].CopyFrom(retry)
-
-    payload_type = CloudEvent.CloudEventAttributeValue()
-    payload_type.ce_uri = "json"
-    event.attributes["payload_type"].CopyFrom(payload_type)
-
-    checksum = CloudEvent.CloudEventAttributeValue()
-    checksum.ce_bytes = b"\x9f\x8c\x7a"
-    event.attributes["datacontenttype"].CopyFrom(checksum)
-
-    empty_attr = CloudEvent.CloudEventAttributeValue()  # no attr set = None
-    event.attributes["error_code"].CopyFrom(empty_attr)
-
-    # Set data
-    data = {
-        "id": int(id),
-        "country": ''.join(random.choices(string.ascii_letters + string.digits, k=300)),
-        "device": random.randint(0, 100),
-        "zone": random.randint(0, 100),
-        "data_string": {
-          "value": {
-            "random_string": ''.join(random.choices(string.ascii_letters + string.digits, k=300)) # create a 300-character long random string 
-          }
-        },
-        "data_json": {
-          "value": {
-                "is_active": random.randint(0, 1),
-                "user_id": str(uuid.uuid4()),
-                "price": random.uniform(0, 100),
-                "username": "user_example",
-                "is_verified": random.randint(0, 1),
-                "age": random.randint(0, 100),
-                "discount_rate": random.uniform(0, 100),
-                "email": "user@example.com",
-                "has_premium": random.randint(0, 1),
-                "rating": random.uniform(0, 100),
-                "login_attempts": random.randint(0, 100),
-                "account_balance": random.uniform(0, 100),
-                "country": ''.join(random.choices(string.ascii_letters + string.digits, k=300)),
-                "subscription_level": ''.join(random.choices(string.ascii_letters + string.digits, k=300)),
-                "notifications_enabled": random.randint(0, 1),
-                "last_login_days_ago": random.randint(0, 100),
-                "max_storage_gb": random.randint(0, 100),
-                "cpu_cores": random.randint(0, 100),
-                "temperature_celsius": random.uniform(0, 100),
-                "favorite_color": ''.join(random.choices(string.ascii_letters + string.digits, k=300)),
-                "email_verified": random.randint(0, 1),
-                "items_in_cart": random.randint(0, 1),
-                "session_time_minutes": random.uniform(0, 100),
-                "bio": ''.join(random.choices(string.ascii_letters + string.digits, k=300)),
-                "is_admin": random.randint(0, 1),
-                "posts_count": random.randint(0, 100),
-                "average_response_time": random.uniform(0, 100),
-                "timezone": ''.join(random.choices(string.ascii_letters + string.digits, k=300)),
-                "notifications_count": random.randint(0, 100),
-                "is_beta_user": random.randint(0, 1)
-            }
-        },
-        "pricing_model": random.randint(0, 100),
-        "bid_floor": random.uniform(0, 100),
-        "smart_price": random.uniform(0, 100),
-        "winning_price": random.uniform(0, 100),
-        "event_type": random.randint(0, 100),
-        "network": random.randint(0, 100),
-        "cloud_event_data": {
-           "value": {
-               "data": [
-                  {
-                    "value": {
-                      "key1": None,
-                      "key2": random.randint(0, 1),
-                      "key3": random.uniform(0, 100),
-                      "key4": ''.join(random.choices(string.ascii_letters + string.digits, k=300)),
-                      "key5": {
-                        "nestedKey": {
-                          "value": {
-                            "innerKey": ''.join(random.choices(string.ascii_letters + string.digits, k=300))
-                          }
-                        }
-                      }
-                    }
-                  },
-                  {
-                    "value": {
-                      "anotherKey": ''.join(random.choices(string.ascii_letters + string.digits, k=300)),
-                      "number": random.uniform(0, 100)
-                    }
-                  },
-                ]
-            }
-        }
-      } 
-    event.text_data = json.dumps(data)
-    
-    return event
-
-def create_messages(num_messages=10000):
-    # create simple message
-    for i in range(num_messages):
-      simple_message.append(create_cloud_event(i))
-
-    # create large message
-    for i in range(num_messages):
-      large_message.append(create_cloud_event_large(i))
-
-def batch_execution_simple_messages():
-    print("\nStarting serialize batch event with simple messages ...\n")
-    start_time = time.time()
-    tracemalloc.start()
-    wrapper = CloudEventBatch(events = simple_message)
-
-    # Serialize all at once
-    data = wrapper.SerializeToString()  
-    total_size = len(data)
-   
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    elapsed = time.time() - start_time
-
-    print(f"Messages processed: {len(simple_message)}")
-    print(f"Total size: {total_size / 1024:.2f} KB")
-    print(f"Avg size per message: {total_size / len(simple_message):.2f} bytes")
-    print(f"Time taken: {elapsed:.4f} seconds")
-    print(f"Avg time per message: {elapsed / len(simple_message) * 1000:.4f} ms")
-    print(f"Peak memory usage: {peak / 1024:.2f} KB")
-    print("\nEnding serialize event with simple messages ...\n")
-
-    print("\nStarting decode batch event with simple messages ...\n")
-    start_time = time.time()
-    tracemalloc.start()
-
-    data_serialized = CloudEventBatch()
-    data_serialized.ParseFromString(data)
-
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    elapsed = time.time() - start_time
-
-    print(f"Messages processed: {len(simple_message)}")
-    print(f"Total size: {total_size / 1024:.2f} KB")
-    print(f"Time taken: {elapsed:.4f} seconds")
-    print(f"Peak memory usage: {peak / 1024:.2f} KB")
-    print("\nEnding decode event with simple messages ...\n")
-
-
-def batch_execution_large_messages():
-    print("\nStarting serialize batch event with large messages ...\n")
-    start_time = time.time()
-    tracemalloc.start()
-    wrapper = CloudEventBatch(events = large_message)
-
-    # Serialize all at once
-    data = wrapper.SerializeToString()  
-    total_size = len(data)
-   
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    elapsed = time.time() - start_time
-
-    print(f"Messages processed: {len(large_message)}")
-    print(f"Total size: {total_size / 1024:.2f} KB")
-    print(f"Avg size per message: {total_size / len(large_message):.2f} bytes")
-    print(f"Time taken: {elapsed:.4f} seconds")
-    print(f"Avg time per message: {elapsed / len(large_message) * 1000:.4f} ms")
-    print(f"Peak memory usage: {peak / 1024:.2f} KB")
-    print("\nEnding serialize event with large messages ...\n")
-
-    print("\nStarting decode batch event with large messages ...\n")
-    start_time = time.time()
-    tracemalloc.start()
-
-    data_serialized = CloudEventBatch()
-    data_serialized.ParseFromString(data)
-
-    total_size = len(data)
-   
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    elapsed = time.time() - start_time
-
-    print(f"Messages processed: {len(large_message)}")
-    print(f"Total size: {total_size / 1024:.2f} KB")
-    print(f"Time taken: {elapsed:.4f} seconds")
-    print(f"Peak memory usage: {peak / 1024:.2f} KB")
-    print("\nEnding decode batch event with large messages ...\n")
-
-
-def sequencial_execution_simple_message():
-    simple_message_serialized = []
-
-    print("\nStarting serialize sequencial event with simple messages ...\n")
-    total_size = 0
-    start_time = time.time()
-    tracemalloc.start()
-
-    num_messages = len(simple_message)
-    for i in range(num_messages):
-        # SerializeToString(): serializes the message and returns it as a string. 
+import os
+import protobuf_builder
+import protobuf_dictionary
+import protobuf_payload
+import protobuf_projection
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # shared benchmark modules
+
+import corpus
+
+# Extension attribute values by Python type; None leaves the value unset.
+ATTRIBUTE_KINDS = protobuf_builder.ATTRIBUTE_KINDS
+
+def from_canonical(event, set_data=protobuf_payload.set_json):
+    """Map a corpus.py canonical event onto a CloudEvent message.
+
+    set_data stores the data payload, see protobuf_payload.data_setter().
+    """
+    message = CloudEvent()
+    message.id = event["id"]
+    message.source = event["source"]
+    message.spec_version = event["specversion"]
+    message.type = event["type"]
+
+    message.attributes["time"].ce_timestamp.FromDatetime(event["time"])
+    message.attributes["datacontenttype"].ce_uri = event["datacontenttype"]
+    if event.get("dataschema"):
+        message.attributes["dataschema"].ce_uri = event["dataschema"]
+    for name, value in event["attributes"].items():
+        attribute = message.attributes[name]
+        if value is None:
+            attribute.SetInParent()  # present, with no attr set
+        else:
+            setattr(attribute, ATTRIBUTE_KINDS[type(value)], value)
+
+    set_data(message, event["data"])
+    return message
+
+class ProtobufCodec:
+    """Generated cloudevents_pb2 messages, driven by harness.py."""
+    name = "protobuf"
+
+    # What a router looks at; everything else, above all the data payload,
+    # is left undecoded by decode_envelope().
+    envelope_paths = ("id", "source", "type", "attributes.region")
+
+    # Encoding of the data payload, one of protobuf_payload.PAYLOADS.
+    payload = "json"
+
+    def build_events(self, profile, count, seed=corpus.DEFAULT_SEED):
+        set_data = protobuf_payload.data_setter(profile, self.payload)
+        events = protobuf_payload.with_content_type(corpus.load(profile, count, seed), profile, self.payload)
+        return [from_canonical(event, set_data) for event in events]
+
+    def event_id(self, event):
+        return event.id
+
+    def with_id(self, event, event_id):
+        copy = CloudEvent()
+        copy.CopyFrom(event)
+        copy.id = event_id
+        return copy
+
+    def encode(self, event):
+        # SerializeToString(): serializes the message and returns it as a string.
         # Note that the bytes are binary, not text; we only use the str type as a convenient container.
-        
         # No need for BytesIO or separate encoder/decoder like Avro.
-        # messages have SerializeToString() and ParseFromString() built in.
-        # Works for any nested messages, repeated fields, etc.
-
         # https://protobuf.dev/getting-started/pythontutorial/
-        message_bytes = simple_message[i].SerializeToString()
-        simple_message_serialized.append(message_bytes)
-        total_size += len(message_bytes)
-
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    elapsed = time.time() - start_time
+        return event.SerializeToString()
 
-    print(f"Messages processed: {num_messages}")
-    print(f"Total size: {total_size / 1024:.2f} KB")
-    print(f"Avg size per message: {total_size / num_messages:.2f} bytes")
-    print(f"Time taken: {elapsed:.4f} seconds")
-    print(f"Avg time per message: {elapsed / num_messages * 1000:.4f} ms")
-    print(f"Peak memory usage: {peak / 1024:.2f} KB")
-    print("\nEnding serialize sequencial event with simple messages ...\n")
-
-    print("\nStarting decode sequencial event with simple messages ...\n")
-    total_size = 0
-    start_time = time.time()
-    tracemalloc.start()
-
-    num_messages = len(simple_message_serialized)
-    for i in range(num_messages):
+    def decode(self, data):
         msg = CloudEvent()
-        msg.ParseFromString(simple_message_serialized[i])
+        msg.ParseFromString(data)
+        return msg
 
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    elapsed = time.time() - start_time
+    def encode_into(self, buf, event):
+        # The Python protobuf API cannot serialize into an existing buffer,
+        # so this still creates one bytes object per event.
+        data = event.SerializeToString()
+        buf[:] = data
+        return len(data)
 
-    print(f"Messages processed: {num_messages}")
-    print(f"Time taken: {elapsed:.4f} seconds")
-    print(f"Peak memory usage: {peak / 1024:.2f} KB")
-    print("\nEnding decode sequencial event with simple messages ...\n")
+    def decode_into(self, data, target):
+        # ParseFromString() clears the message first, so one CloudEvent
+        # serves every event.
+        if target is None:
+            target = CloudEvent()
+        target.ParseFromString(data)
+        return target
 
-def sequencial_execution_large_message():
-    large_message_serialized = []
-    print("\nStarting serialize event with large messages ...\n")
-    total_size = 0
-    start_time = time.time()
-    tracemalloc.start()
+    def decode_envelope(self, data):
+        return protobuf_projection.decode_projected(data, self.envelope_paths)
 
-    num_messages = len(large_message)
-    for i in range(num_messages):
-        # SerializeToString(): serializes the message and returns it as a string. 
-        # Note that the bytes are binary, not text; we only use the str type as a convenient container.
-        # https://protobuf.dev/getting-started/pythontutorial/
+    def encode_batch(self, events):
+        return CloudEventBatch(events=events).SerializeToString()
 
-        # No need for BytesIO or separate encoder/decoder like Avro.
-        # messages have SerializeToString() and ParseFromString() built in.
-        # Works for any nested messages, repeated fields, etc.
-        message_bytes = large_message[i].SerializeToString()
-        large_message_serialized.append(message_bytes)
-        total_size += len(message_bytes)
+    def decode_batch(self, data):
+        batch = CloudEventBatch()
+        batch.ParseFromString(data)
+        return batch.events
 
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    elapsed = time.time() - start_time
 
-    print(f"Messages processed: {num_messages}")
-    print(f"Total size: {total_size / 1024:.2f} KB")
-    print(f"Avg size per message: {total_size / num_messages:.2f} bytes")
-    print(f"Time taken: {elapsed:.4f} seconds")
-    print(f"Avg time per message: {elapsed / num_messages * 1000:.4f} ms")
-    print(f"Peak memory usage: {peak / 1024:.2f} KB")
-    print("\nEnding serialize event with large messages ...\n")
+class ProtobufDictionaryCodec(ProtobufCodec):
+    """Batches with a per-batch string table, decoded to dicts of interned strings."""
+    name = "protobuf-dict"
 
-    print("\nStarting decode event with large messages ...\n")
-    total_size = 0
-    start_time = time.time()
-    tracemalloc.start()
+    def encode_batch(self, events):
+        return protobuf_dictionary.encode_batch(events)
 
-    num_messages = len(large_message_serialized)
-    for i in range(num_messages):
-        msg = CloudEvent()
-        msg.ParseFromString(large_message_serialized[i])
+    def decode_batch(self, data):
+        return protobuf_dictionary.decode_batch(data)
 
-    current, peak = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    elapsed = time.time() - start_time
 
-    print(f"Messages processed: {num_messages}")
-    print(f"Time taken: {elapsed:.4f} seconds")
-    print(f"Peak memory usage: {peak / 1024:.2f} KB")
-    print("\nEnding decode event with large messages ...\n")
-    
+class ProtobufTypedCodec(ProtobufCodec):
+    """Same envelope, with the payload as a typed adevents_pb2 message in binary_data."""
+    name = "protobuf-typed"
+    payload = "bytes"
 
-def run():
-    sequencial_execution_simple_message()
-    sequencial_execution_large_message()
-    batch_execution_simple_messages()
-    batch_execution_large_messages()
 
-  
 # https://protobuf.dev/
 if __name__ == "__main__":
-    create_messages(10)
-    run()
\ No newline at end of file
+    import harness
+    harness.main(["--codec", "protobuf"] + sys.argv[1:])
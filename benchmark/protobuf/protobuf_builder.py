@@ -0,0 +1,144 @@
+"""Template-based CloudEvent construction.
+
+from_canonical() builds every event from scratch: four envelope strings,
+one map entry per attribute, Timestamp.FromDatetime() for the time. In a
+producer most of that is the same for every event of a stream. An
+EventTemplate sets the constant part once, in a prototype message, and per
+event only fills in what varies:
+
+    template = EventTemplate("/my/source", "1.0", "click", "application/json",
+                             attributes={"payload": b"\\x01\\x10"})
+    event = template.build(event_id, time_ns, {"region": "eu"}, data)
+    events = template.build_columns(ids, times, {"region": regions}, data)
+
+Every event starts as a copy of the prototype, either CopyFrom(prototype)
+("copy") or by parsing the prototype's pre-serialized bytes ("header").
+The time is written as seconds/nanos straight into the map entry's
+Timestamp, from an aware datetime or from integer epoch nanoseconds.
+"""
+import time as _time
+from datetime import datetime, timezone
+
+from cloudevents_pb2 import CloudEvent
+import protobuf_payload
+
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+STRATEGIES = ("copy", "header")
+
+# Extension attribute values by Python type; None leaves the value unset.
+ATTRIBUTE_KINDS = {
+    bool: "ce_boolean",
+    int: "ce_integer",
+    str: "ce_string",
+    bytes: "ce_bytes",
+}
+
+
+def _set_attribute(attribute, value):
+    if value is None:
+        attribute.SetInParent()  # present, with no attr set
+    else:
+        setattr(attribute, ATTRIBUTE_KINDS[type(value)], value)
+
+
+def timestamp_parts(value):
+    """(seconds, nanos) of an aware datetime or of integer epoch nanoseconds."""
+    if type(value) is int:
+        return divmod(value, 1_000_000_000)
+    delta = value - UNIX_EPOCH
+    return delta.days * 86400 + delta.seconds, delta.microseconds * 1000
+
+
+class EventTemplate:
+    """A prototype CloudEvent holding the fields every event shares."""
+
+    def __init__(self, source, spec_version="1.0", type="", datacontenttype=None,
+                 attributes=None, set_data=protobuf_payload.set_json, strategy="header",
+                 dataschema=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected one of {', '.join(STRATEGIES)}")
+        prototype = CloudEvent(source=source, spec_version=spec_version, type=type)
+        if datacontenttype is not None:
+            prototype.attributes["datacontenttype"].ce_uri = datacontenttype
+        if dataschema is not None:
+            prototype.attributes["dataschema"].ce_uri = dataschema
+        for name, value in (attributes or {}).items():
+            _set_attribute(prototype.attributes[name], value)
+        self.prototype = prototype
+        self.header = prototype.SerializeToString()
+        self.set_data = set_data
+        self.strategy = strategy
+
+    def _new(self):
+        event = CloudEvent()
+        if self.strategy == "header":
+            event.MergeFromString(self.header)
+        else:
+            event.CopyFrom(self.prototype)
+        return event
+
+    def build(self, id, time=None, attributes=None, data=None):
+        """One event; time defaults to now, attributes holds the varying ones."""
+        event = self._new()
+        event.id = id
+        timestamp = event.attributes["time"].ce_timestamp
+        timestamp.seconds, timestamp.nanos = timestamp_parts(_time.time_ns() if time is None else time)
+        if attributes:
+            for name, value in attributes.items():
+                _set_attribute(event.attributes[name], value)
+        if data is not None:
+            self.set_data(event, data)
+        return event
+
+    def build_columns(self, ids, times=None, attributes=None, data=None):
+        """Build len(ids) events from columns: times, {name: values} and data
+        are parallel to ids; times default to now."""
+        count = len(ids)
+        if times is None:
+            now = _time.time_ns()
+            times = [now] * count
+        names = list(attributes or ())
+        attribute_rows = zip(*(attributes[name] for name in names)) if names else [()] * count
+        data = data if data is not None else [None] * count
+        new, set_data, parts, kinds = self._new, self.set_data, timestamp_parts, ATTRIBUTE_KINDS
+
+        events = []
+        for id, time, values, payload in zip(ids, times, attribute_rows, data):
+            event = new()
+            event.id = id
+            entries = event.attributes
+            timestamp = entries["time"].ce_timestamp
+            timestamp.seconds, timestamp.nanos = parts(time)
+            for name, value in zip(names, values):
+                if value is None:
+                    entries[name].SetInParent()
+                else:
+                    setattr(entries[name], kinds[value.__class__], value)
+            if payload is not None:
+                set_data(event, payload)
+            events.append(event)
+        return events
+
+
+def split_corpus(events):
+    """Split canonical corpus events into the shared envelope and the columns
+    that vary: returns (template keyword arguments, build_columns arguments)."""
+    first = events[0]
+    constant = {name: value for name, value in first["attributes"].items()
+                if all(event["attributes"][name] == value for event in events)}
+    varying = [name for name in first["attributes"] if name not in constant]
+    template = {
+        "source": first["source"],
+        "spec_version": first["specversion"],
+        "type": first["type"],
+        "datacontenttype": first["datacontenttype"],
+        "dataschema": first.get("dataschema"),
+        "attributes": constant,
+    }
+    columns = {
+        "ids": [event["id"] for event in events],
+        "times": [event["time"] for event in events],
+        "attributes": {name: [event["attributes"][name] for event in events] for name in varying},
+        "data": [event["data"] for event in events],
+    }
+    return template, columns
@@ -0,0 +1,106 @@
+"""Cost of building protobuf CloudEvents next to the cost of serializing them.
+
+harness.py builds the messages before it starts the clock, so its numbers
+leave out what a producer pays first. Here the same corpus events are
+turned into CloudEvent messages by
+
+    canonical     protobuf_benchmark.from_canonical(), one event at a time
+    copy          EventTemplate.build() per event, CopyFrom(prototype)
+    header        EventTemplate.build() per event, parsed pre-serialized header
+    columns       EventTemplate.build_columns() over the whole corpus
+
+and each build is timed together with the SerializeToString() that follows.
+--payload none leaves the data out, to compare envelope construction alone.
+The corpus is split into columns (protobuf_builder.split_corpus()) outside
+the timing, as a producer would already hold its fields.
+
+    python3 protobuf_builder_benchmark.py --events 10000 --payload json --payload bytes
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import protobuf_benchmark
+import protobuf_builder
+import protobuf_payload
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+BUILDERS = ("canonical", "copy", "header", "columns")
+PAYLOADS = ("none",) + protobuf_payload.PAYLOADS
+
+
+def data_setter(profile, payload):
+    if payload == "none":
+        return lambda event, data: None
+    return protobuf_payload.data_setter(profile, payload)
+
+
+def builder(name, events, set_data):
+    """Return a function that builds every corpus event with the named builder."""
+    if name == "canonical":
+        from_canonical = protobuf_benchmark.from_canonical
+        return lambda: [from_canonical(event, set_data) for event in events]
+    template, columns = protobuf_builder.split_corpus(events)
+    strategy = "header" if name == "columns" else name
+    template = protobuf_builder.EventTemplate(set_data=set_data, strategy=strategy, **template)
+    if name == "columns":
+        return lambda: template.build_columns(**columns)
+    build = template.build
+    names = list(columns["attributes"])
+    rows = list(zip(columns["ids"], columns["times"],
+                    [dict(zip(names, values)) for values in zip(*columns["attributes"].values())]
+                    if names else [None] * len(events),
+                    columns["data"]))
+    return lambda: [build(id, time, attributes, data) for id, time, attributes, data in rows]
+
+
+def run(build, repetitions):
+    clock = time.perf_counter_ns
+    build_ns, serialize_ns = [], []
+    for _ in range(repetitions + 1):  # the first pass is warmup
+        start = clock()
+        messages = build()
+        built = clock()
+        for message in messages:
+            message.SerializeToString()
+        build_ns.append(built - start)
+        serialize_ns.append(clock() - built)
+    return statistics.median(build_ns[1:]), statistics.median(serialize_ns[1:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builder", action="append", choices=BUILDERS)
+    parser.add_argument("--payload", action="append", choices=PAYLOADS,
+                        help="data payload encoding (repeatable, default: json)")
+    parser.add_argument("--profile", action="append", choices=corpus.PROFILES)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    header = (f"{'builder':<10} {'payload':<8} {'profile':<8} {'events':>8} {'build us':>9} "
+              f"{'serial. us':>10} {'build %':>8} {'events/s':>10}")
+    print(header)
+    print("-" * len(header))
+    for profile in args.profile or corpus.PROFILES:
+        corpus_events = corpus.load(profile, args.events)
+        for payload in args.payload or ["json"]:
+            events = (corpus_events if payload == "none"
+                      else protobuf_payload.with_content_type(corpus_events, profile, payload))
+            set_data = data_setter(profile, payload)
+            for name in args.builder or BUILDERS:
+                build_ns, serialize_ns = run(builder(name, events, set_data), args.repetitions)
+                total = build_ns + serialize_ns
+                print(f"{name:<10} {payload:<8} {profile:<8} {args.events:>8} "
+                      f"{build_ns / args.events / 1000:>9.2f} "
+                      f"{serialize_ns / args.events / 1000:>10.2f} {build_ns / total:>8.1%} "
+                      f"{args.events / (total / 1e9):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Dictionary-encoded CloudEvent batches (DictionaryCloudEventBatch).
+
+encode_batch() moves source, spec_version, type, attribute keys and every
+attribute string value that repeats within the batch into the batch's
+string table; events refer to them by index. decode_batch() hands events
+back as plain dicts in the shape of to_dict(), with those strings interned:
+one str object per distinct value rather than one per event.
+"""
+import collections
+import sys
+
+from cloudevents_pb2 import DictionaryCloudEventBatch
+
+# Attribute kinds that can be replaced by a reference into the table.
+INDEXED_KINDS = {"ce_string": "ce_string_index", "ce_uri": "ce_uri_index"}
+RESOLVED_KINDS = {"ce_string_index", "ce_uri_index"}
+
+
+def _attribute(value):
+    kind = value.WhichOneof("attr")
+    return getattr(value, kind) if kind else None
+
+
+def to_dict(event):
+    """A parsed CloudEvent as a plain dict; the shape decode_batch() returns."""
+    kind = event.WhichOneof("data")
+    return {
+        "id": event.id,
+        "source": event.source,
+        "spec_version": event.spec_version,
+        "type": event.type,
+        "attributes": {key: _attribute(value) for key, value in event.attributes.items()},
+        "data": getattr(event, kind) if kind else None,
+    }
+
+
+def encode_batch(events):
+    """Serialize CloudEvent messages as a DictionaryCloudEventBatch."""
+    repeated = collections.Counter()
+    for event in events:
+        for value in event.attributes.values():
+            kind = value.WhichOneof("attr")
+            if kind in INDEXED_KINDS:
+                repeated[getattr(value, kind)] += 1
+
+    table = {}
+    batch = DictionaryCloudEventBatch()
+    for event in events:
+        encoded = batch.events.add()
+        encoded.id = event.id
+        encoded.source = table.setdefault(event.source, len(table))
+        encoded.spec_version = table.setdefault(event.spec_version, len(table))
+        encoded.type = table.setdefault(event.type, len(table))
+        for key, value in event.attributes.items():
+            target = encoded.attributes[table.setdefault(key, len(table))]
+            kind = value.WhichOneof("attr")
+            if kind is None:
+                target.SetInParent()
+            elif kind == "ce_timestamp":
+                target.ce_timestamp.CopyFrom(value.ce_timestamp)
+            elif kind in INDEXED_KINDS and repeated[getattr(value, kind)] > 1:
+                setattr(target, INDEXED_KINDS[kind], table.setdefault(getattr(value, kind), len(table)))
+            else:
+                setattr(target, kind, getattr(value, kind))
+        kind = event.WhichOneof("data")
+        if kind == "proto_data":
+            encoded.proto_data.CopyFrom(event.proto_data)
+        elif kind is not None:
+            setattr(encoded, kind, getattr(event, kind))
+    batch.strings.extend(table)
+    return batch.SerializeToString()
+
+
+def decode_batch(data):
+    """Parse a DictionaryCloudEventBatch into dicts sharing interned strings."""
+    batch = DictionaryCloudEventBatch.FromString(data)
+    strings = [sys.intern(string) for string in batch.strings]
+    events = []
+    for event in batch.events:
+        attributes = {}
+        for key, value in event.attributes.items():
+            kind = value.WhichOneof("attr")
+            if kind in RESOLVED_KINDS:
+                attributes[strings[key]] = strings[getattr(value, kind)]
+            else:
+                attributes[strings[key]] = getattr(value, kind) if kind else None
+        kind = event.WhichOneof("data")
+        events.append({
+            "id": event.id,
+            "source": strings[event.source],
+            "spec_version": strings[event.spec_version],
+            "type": strings[event.type],
+            "attributes": attributes,
+            "data": getattr(event, kind) if kind else None,
+        })
+    return events
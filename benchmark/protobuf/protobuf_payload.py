@@ -0,0 +1,110 @@
+"""Encodings of the CloudEvent data payload.
+
+    json    json.dumps(data) in text_data, the original format
+    any     typed adevents_pb2 message packed into proto_data (Any)
+    bytes   typed adevents_pb2 message serialized into binary_data
+
+data_setter() returns the function that stores a canonical corpus data dict
+in a CloudEvent, data_getter() the consumer side that turns a decoded
+CloudEvent back into something with fields: a dict for json, a typed message
+for any and bytes. with_content_type() labels the events to match: a typed
+payload is application/protobuf with a dataschema naming its message type.
+"""
+import json
+
+from google.protobuf.descriptor import FieldDescriptor
+
+from adevents_pb2 import AdEvent, LargeAdEvent
+
+PAYLOADS = ("json", "any", "bytes")
+PROTOBUF_CONTENT_TYPE = "application/protobuf"
+TYPE_URL_PREFIX = "type.googleapis.com/"
+
+
+def _fields(message_type, values):
+    # The corpus writes flags as 0/1 ints; typed bool fields want bools.
+    fields = message_type.DESCRIPTOR.fields_by_name
+    return {name: bool(value) if fields[name].type == FieldDescriptor.TYPE_BOOL else value
+            for name, value in values.items()}
+
+
+def simple_message(data):
+    return AdEvent(**data)
+
+
+def large_message(data):
+    detail, note = (entry["value"] for entry in data["cloud_event_data"]["value"]["data"])
+    return LargeAdEvent(
+        id=data["id"],
+        country=data["country"],
+        device=data["device"],
+        zone=data["zone"],
+        data_string=LargeAdEvent.DataString(**data["data_string"]["value"]),
+        data_json=LargeAdEvent.UserProfile(**_fields(LargeAdEvent.UserProfile, data["data_json"]["value"])),
+        pricing_model=data["pricing_model"],
+        bid_floor=data["bid_floor"],
+        smart_price=data["smart_price"],
+        winning_price=data["winning_price"],
+        event_type=data["event_type"],
+        network=data["network"],
+        cloud_event_data=LargeAdEvent.CloudEventData(
+            detail=LargeAdEvent.Detail(
+                key1=detail["key1"],
+                key2=bool(detail["key2"]),
+                key3=detail["key3"],
+                key4=detail["key4"],
+                inner_key=detail["key5"]["nestedKey"]["value"]["innerKey"]),
+            note=LargeAdEvent.Note(another_key=note["anotherKey"], number=note["number"])))
+
+
+# profile -> (typed payload message, canonical data -> message)
+MESSAGES = {
+    "simple": (AdEvent, simple_message),
+    "large": (LargeAdEvent, large_message),
+}
+
+
+def with_content_type(events, profile, payload="json"):
+    """The canonical events with the datacontenttype (and dataschema) of
+    the payload encoding; json keeps the corpus's application/json."""
+    if payload == "json":
+        return events
+    schema = TYPE_URL_PREFIX + MESSAGES[profile][0].DESCRIPTOR.full_name
+    return [dict(event, datacontenttype=PROTOBUF_CONTENT_TYPE, dataschema=schema) for event in events]
+
+
+def set_json(event, data):
+    event.text_data = json.dumps(data)
+
+
+def data_setter(profile, payload="json"):
+    """Return set(event, data) storing canonical data with the given encoding."""
+    if payload == "json":
+        return set_json
+    build = MESSAGES[profile][1]
+    if payload == "any":
+        def set_any(event, data):
+            event.proto_data.Pack(build(data))
+        return set_any
+    if payload == "bytes":
+        def set_bytes(event, data):
+            event.binary_data = build(data).SerializeToString()
+        return set_bytes
+    raise ValueError(f"Unknown payload encoding {payload!r}")
+
+
+def data_getter(profile, payload="json"):
+    """Return get(event) decoding the payload of a parsed CloudEvent."""
+    if payload == "json":
+        return lambda event: json.loads(event.text_data)
+    message_type = MESSAGES[profile][0]
+    if payload == "any":
+        def get_any(event):
+            message = message_type()
+            if not event.proto_data.Unpack(message):
+                raise ValueError(f"proto_data holds {event.proto_data.type_url}, not {message_type.__name__}")
+            return message
+        return get_any
+    if payload == "bytes":
+        return lambda event: message_type.FromString(event.binary_data)
+    raise ValueError(f"Unknown payload encoding {payload!r}")
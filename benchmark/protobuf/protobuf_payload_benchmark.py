@@ -0,0 +1,86 @@
+"""JSON-text vs typed payload encodings of the protobuf CloudEvent, end to end.
+
+For every payload encoding in protobuf_payload.PAYLOADS the same corpus
+events go through the whole path a producer and a consumer pay for:
+
+    encode   canonical event -> CloudEvent (payload included) -> bytes
+    decode   bytes -> CloudEvent -> payload (json.loads, Any.Unpack, FromString)
+    access   read data.bid_floor, data.country and data.network per event
+
+    python3 protobuf_payload_benchmark.py --events 10000 --profile large
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from cloudevents_pb2 import CloudEvent
+import protobuf_benchmark
+import protobuf_payload
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+ACCESSED = ("bid_floor", "country", "network")
+
+
+def json_access(data):
+    return [data[name] for name in ACCESSED]
+
+
+def typed_access(message):
+    return [getattr(message, name) for name in ACCESSED]
+
+
+def run(profile, payload, events, repetitions):
+    events = protobuf_payload.with_content_type(events, profile, payload)
+    set_data = protobuf_payload.data_setter(profile, payload)
+    get_data = protobuf_payload.data_getter(profile, payload)
+    access = json_access if payload == "json" else typed_access
+    clock = time.perf_counter_ns
+    timings = {"encode": [], "decode": [], "access": []}
+    for _ in range(repetitions + 1):  # the first pass is warmup
+        start = clock()
+        serialized = [protobuf_benchmark.from_canonical(event, set_data).SerializeToString()
+                      for event in events]
+        encoded = clock()
+        payloads = [get_data(CloudEvent.FromString(data)) for data in serialized]
+        decoded = clock()
+        for data in payloads:
+            access(data)
+        accessed = clock()
+        for phase, elapsed in (("encode", encoded - start), ("decode", decoded - encoded),
+                               ("access", accessed - decoded)):
+            timings[phase].append(elapsed)
+    size = sum(map(len, serialized))
+    return size, {phase: statistics.median(samples[1:]) for phase, samples in timings.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload", action="append", choices=protobuf_payload.PAYLOADS)
+    parser.add_argument("--profile", action="append", choices=corpus.PROFILES)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    header = (f"{'payload':<8} {'profile':<8} {'events':>8} {'size KB':>10} {'encode us':>10} "
+              f"{'decode us':>10} {'access us':>10} {'total us':>10} {'events/s':>10}")
+    print(header)
+    print("-" * len(header))
+    for profile in args.profile or corpus.PROFILES:
+        events = corpus.load(profile, args.events)
+        for payload in args.payload or protobuf_payload.PAYLOADS:
+            size, timings = run(profile, payload, events, args.repetitions)
+            total = sum(timings.values())
+            per_event = {phase: elapsed / args.events / 1000 for phase, elapsed in timings.items()}
+            print(f"{payload:<8} {profile:<8} {args.events:>8} {size / 1024:>10.2f} "
+                  f"{per_event['encode']:>10.2f} {per_event['decode']:>10.2f} "
+                  f"{per_event['access']:>10.2f} {total / args.events / 1000:>10.2f} "
+                  f"{args.events / (total / 1e9):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Lazy, projected access to serialized CloudEvents.
+
+CloudEventView walks the top-level fields of a serialized CloudEvent once,
+recording where each field lives, and decodes a field only when it is
+accessed. The data oneof (text_data, binary_data or proto_data) is stepped
+over by its length prefix and never copied or parsed unless asked for, which
+is all a router that looks at id/source/type and a couple of attributes
+needs.
+
+The view is pure Python, so it only pays off on the pure-python protobuf
+backend. The upb and cpp backends already parse lazily in C and beat any
+Python-level scanner; there decode_projected() parses the bytes as a
+CloudEventEnvelope instead, which has the same envelope fields but no data
+oneof, so the payload is kept as raw unknown-field bytes and never decoded.
+
+What that saves depends on the backend. upb parses lazily already, so a full
+FromString() is cheap until fields are read: in harness.py --mode envelope,
+which reads the same routing fields after the full decode, the projection is
+about 1.2x (large) to 1.4x (simple) faster on upb, and about 5x on the
+pure-python backend, where every field of a full decode is parsed up front.
+"""
+from google.protobuf import timestamp_pb2
+from google.protobuf.internal import api_implementation
+
+from cloudevents_pb2 import CloudEvent, CloudEventEnvelope
+from protobuf_stream import decode_varint
+
+NATIVE_BACKEND = api_implementation.Type() != "python"
+
+# CloudEvent field numbers
+ID, SOURCE, SPEC_VERSION, TYPE, ATTRIBUTES = 1, 2, 3, 4, 5
+DATA_FIELDS = {6: "binary_data", 7: "text_data", 8: "proto_data"}
+
+# CloudEventAttributeValue oneof members by field number
+ATTRIBUTE_KINDS = {1: "ce_boolean", 2: "ce_integer", 3: "ce_string", 4: "ce_bytes",
+                   5: "ce_uri", 6: "ce_uri_ref", 7: "ce_timestamp"}
+
+
+def _read_varint(buf, pos):
+    value, new_pos = decode_varint(buf, pos)
+    if value is None:
+        raise ValueError("Truncated CloudEvent")
+    return value, new_pos
+
+
+def iter_fields(buf, pos=0, end=None):
+    """Yield (field number, wire type, start, end) for each field in buf.
+
+    For length-delimited fields start/end delimit the payload, for the other
+    wire types the encoded value.
+    """
+    end = len(buf) if end is None else end
+    while pos < end:
+        tag, pos = _read_varint(buf, pos)
+        wire_type = tag & 7
+        if wire_type == 2:
+            size, pos = _read_varint(buf, pos)
+            start = pos
+            pos += size
+        elif wire_type == 0:
+            start = pos
+            _, pos = _read_varint(buf, pos)
+        elif wire_type == 1:
+            start = pos
+            pos += 8
+        elif wire_type == 5:
+            start = pos
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type}")
+        if pos > end:
+            raise ValueError("Truncated CloudEvent")
+        yield tag >> 3, wire_type, start, pos
+
+
+def decode_attribute_value(buf, start, end):
+    """Decode a serialized CloudEventAttributeValue into a Python value."""
+    value = None
+    for number, _, field_start, field_end in iter_fields(buf, start, end):
+        kind = ATTRIBUTE_KINDS.get(number)
+        if kind == "ce_boolean":
+            value = _read_varint(buf, field_start)[0] != 0
+        elif kind == "ce_integer":
+            value = _read_varint(buf, field_start)[0]
+            if value >= 1 << 63:
+                value -= 1 << 64  # negative int32 is sign-extended to 64 bits
+        elif kind == "ce_bytes":
+            value = bytes(buf[field_start:field_end])
+        elif kind == "ce_timestamp":
+            value = timestamp_pb2.Timestamp.FromString(bytes(buf[field_start:field_end]))
+        elif kind is not None:
+            value = str(buf[field_start:field_end], "utf-8")
+    return value
+
+
+class CloudEventView:
+    """Read-only view over a serialized CloudEvent that decodes on access."""
+
+    __slots__ = ("_buf", "_spans", "_entries", "_attributes", "_data")
+
+    def __init__(self, data):
+        self._buf = data
+        self._spans = {}
+        self._entries = []       # (start, end) of each attributes map entry
+        self._attributes = None  # key -> (start, end) of the value, on first use
+        self._data = None        # (field name, start, end)
+        for number, _, start, end in iter_fields(data):
+            if number == ATTRIBUTES:
+                self._entries.append((start, end))
+            elif number in DATA_FIELDS:
+                self._data = (DATA_FIELDS[number], start, end)
+            else:
+                self._spans[number] = (start, end)
+
+    def _attribute_spans(self):
+        if self._attributes is None:
+            buf = self._buf
+            self._attributes = {}
+            for start, end in self._entries:
+                key = ""
+                value_span = (start, start)
+                for number, _, field_start, field_end in iter_fields(buf, start, end):
+                    if number == 1:
+                        key = str(buf[field_start:field_end], "utf-8")
+                    elif number == 2:
+                        value_span = (field_start, field_end)
+                self._attributes[key] = value_span
+        return self._attributes
+
+    def _string(self, number):
+        span = self._spans.get(number)
+        if span is None:
+            return ""
+        return str(self._buf[span[0]:span[1]], "utf-8")
+
+    @property
+    def id(self):
+        return self._string(ID)
+
+    @property
+    def source(self):
+        return self._string(SOURCE)
+
+    @property
+    def spec_version(self):
+        return self._string(SPEC_VERSION)
+
+    @property
+    def type(self):
+        return self._string(TYPE)
+
+    def attribute_names(self):
+        return list(self._attribute_spans())
+
+    def attribute(self, name, default=None):
+        span = self._attribute_spans().get(name)
+        if span is None:
+            return default
+        return decode_attribute_value(self._buf, *span)
+
+    def data_kind(self):
+        return self._data[0] if self._data else None
+
+    def raw_data(self):
+        """The undecoded payload bytes, as a zero-copy memoryview."""
+        if self._data is None:
+            return None
+        _, start, end = self._data
+        return memoryview(self._buf)[start:end]
+
+    def message(self):
+        """Fully parse the event, for the few that need more than the envelope."""
+        event = CloudEvent()
+        event.ParseFromString(self._buf)
+        return event
+
+
+ENVELOPE_FIELDS = ("id", "source", "spec_version", "type")
+
+_projections = {}  # paths -> (envelope fields, attribute names)
+
+
+def _projection(paths):
+    projection = _projections.get(paths)
+    if projection is None:
+        fields, attributes = [], []
+        for path in paths:
+            if path.startswith("attributes."):
+                attributes.append(path[len("attributes."):])
+            elif path in ENVELOPE_FIELDS:
+                fields.append(path)
+            else:
+                raise ValueError(f"Cannot project CloudEvent field {path!r}")
+        projection = _projections[paths] = (tuple(fields), tuple(attributes))
+    return projection
+
+
+def _attribute_value(value):
+    kind = value.WhichOneof("attr")
+    return getattr(value, kind) if kind else None
+
+
+def decode_projected(data, paths):
+    """Decode only the dotted paths (a tuple) from a serialized CloudEvent.
+
+    Envelope fields are addressed by name ("id", "type"), attributes as
+    "attributes.<key>".
+    """
+    fields, attributes = _projection(paths)
+    if NATIVE_BACKEND:
+        envelope = CloudEventEnvelope.FromString(data)
+        result = {name: getattr(envelope, name) for name in fields}
+        if attributes:
+            values = envelope.attributes
+            found = result["attributes"] = {}
+            for name in attributes:
+                value = values.get(name)  # unlike [], does not insert a missing key
+                found[name] = None if value is None else _attribute_value(value)
+        return result
+    view = CloudEventView(data)
+    result = {name: getattr(view, name) for name in fields}
+    if attributes:
+        result["attributes"] = {name: view.attribute(name) for name in attributes}
+    return result
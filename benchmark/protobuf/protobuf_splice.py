@@ -0,0 +1,184 @@
+"""CloudEvent wire bytes spliced together from cached envelope fragments.
+
+A serialized protobuf message is just its fields one after the other, and
+a map entry is an ordinary length-delimited field, so an encoder can write
+CloudEvent bytes without ever building a CloudEvent message. Most of an
+event's envelope is the same for every event of a stream: source,
+spec_version, type, datacontenttype and attributes such as a constant
+payload flag. SplicingEncoder encodes those static field groups once, caches
+the bytes keyed by their values and per event only encodes what varies (id,
+time, the remaining attributes and the data payload):
+
+    encoder = SplicingEncoder(static=("payload",))
+    data = encoder.encode(canonical_event)      # a corpus.py event
+    batch = encoder.encode_batch(canonical_events)
+
+Fields are written in field-number order and map entries sorted by key, so
+ParseFromString() reads the output back as the event from_canonical() builds,
+and the bytes are those of SerializeToString(deterministic=True) with the
+python and cpp protobuf backends. (upb sorts map keys differently when one
+key is a prefix of another, "payload_type" before "payload", so there only
+the order of such entries differs.)
+"""
+import json
+
+from google.protobuf import any_pb2
+
+import protobuf_builder
+import protobuf_payload
+
+# Tags: field number << 3 | wire type (0 varint, 2 length-delimited).
+ID, SOURCE, SPEC_VERSION, TYPE, ATTRIBUTE = b"\x0a", b"\x12", b"\x1a", b"\x22", b"\x2a"
+BINARY_DATA, TEXT_DATA, PROTO_DATA = b"\x32", b"\x3a", b"\x42"
+ENTRY_KEY, ENTRY_VALUE = b"\x0a", b"\x12"
+CE_BOOLEAN, CE_INTEGER, CE_STRING, CE_BYTES, CE_URI, CE_TIMESTAMP = (
+    b"\x08", b"\x10", b"\x1a", b"\x22", b"\x2a", b"\x3a")
+SECONDS, NANOS = b"\x08", b"\x10"
+BATCH_EVENT = b"\x0a"
+
+_SMALL_VARINTS = [bytes([value]) for value in range(0x80)]
+# Attribute values whose whole map entry is worth caching: few distinct values.
+CACHED_KINDS = (bool, int, type(None))
+MAX_CACHED_ENTRIES = 4096
+
+
+def varint(value):
+    if value < 0x80:
+        return _SMALL_VARINTS[value]
+    out = bytearray()
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def delimited(tag, data):
+    size = len(data)
+    return tag + (_SMALL_VARINTS[size] if size < 0x80 else varint(size)) + data
+
+
+def timestamp_value(value):
+    seconds, nanos = protobuf_builder.timestamp_parts(value)
+    timestamp = b""
+    if seconds:
+        timestamp += SECONDS + varint(seconds & 0xFFFFFFFFFFFFFFFF)
+    if nanos:
+        timestamp += NANOS + varint(nanos)
+    return delimited(CE_TIMESTAMP, timestamp)
+
+
+def attribute_value(value):
+    """Serialized CloudEventAttributeValue of an extension attribute value."""
+    kind = type(value)
+    if value is None:
+        return b""  # present, with no attr set
+    if kind is bool:
+        return CE_BOOLEAN + (b"\x01" if value else b"\x00")
+    if kind is int:
+        return CE_INTEGER + varint(value & 0xFFFFFFFFFFFFFFFF)  # int32: negatives sign-extended
+    if kind is str:
+        return delimited(CE_STRING, value.encode())
+    if kind is bytes:
+        return delimited(CE_BYTES, value)
+    raise TypeError(f"Unsupported attribute value {value!r}")
+
+
+def attribute_entry(name, value):
+    """One attributes map entry (field 5) with an already serialized value."""
+    return delimited(ATTRIBUTE, delimited(ENTRY_KEY, name.encode()) + delimited(ENTRY_VALUE, value))
+
+
+def data_encoder(profile, payload="json"):
+    """Return encode(data) -> data oneof field bytes, matching
+    protobuf_payload.data_setter(profile, payload)."""
+    if payload == "json":
+        return lambda data: delimited(TEXT_DATA, json.dumps(data).encode())
+    message_type, build = protobuf_payload.MESSAGES[profile]
+    if payload == "bytes":
+        return lambda data: delimited(BINARY_DATA, build(data).SerializeToString())
+    if payload == "any":
+        type_url = (protobuf_payload.TYPE_URL_PREFIX + message_type.DESCRIPTOR.full_name).encode()
+
+        def encode_any(data):
+            packed = any_pb2.Any(type_url=type_url.decode(), value=build(data).SerializeToString())
+            return delimited(PROTO_DATA, packed.SerializeToString())
+        return encode_any
+    raise ValueError(f"Unknown payload {payload!r}, expected one of {', '.join(protobuf_payload.PAYLOADS)}")
+
+
+class SplicingEncoder:
+    """Encode canonical events as CloudEvent bytes around cached static fields.
+
+    static names the extension attributes that are constant within a
+    stream; source, spec_version, type, datacontenttype and dataschema
+    always are. An event whose static values are new gets its own cached
+    plan, so a wrong guess costs a cache entry, never a wrong encoding.
+    """
+
+    def __init__(self, static=(), encode_data=None):
+        self.static = tuple(static)
+        self.encode_data = encode_data or data_encoder(None, "json")
+        self.plans = {}
+        self.entries = {}  # (name, type, value) -> map entry, for CACHED_KINDS values
+
+    def _plan(self, event, names):
+        """Static bytes and varying (name, serialized key) pairs, in
+        serialization order."""
+        static = {"datacontenttype": delimited(CE_URI, event["datacontenttype"].encode())}
+        if event.get("dataschema"):
+            static["dataschema"] = delimited(CE_URI, event["dataschema"].encode())
+        for name in self.static:
+            static[name] = attribute_value(event["attributes"][name])
+        plan = [b"".join(delimited(tag, event[field].encode()) for tag, field in
+                         ((SOURCE, "source"), (SPEC_VERSION, "specversion"), (TYPE, "type"))
+                         if event[field])]
+        for name in sorted(set(names) | {"time"} | set(static)):
+            if name in static:
+                entry = attribute_entry(name, static[name])
+                if isinstance(plan[-1], bytes):
+                    plan[-1] += entry  # runs of static entries become one fragment
+                else:
+                    plan.append(entry)
+            else:
+                plan.append((name, delimited(ENTRY_KEY, name.encode())))
+        return plan
+
+    def _entry(self, name, key, value):
+        if value.__class__ not in CACHED_KINDS:
+            return delimited(ATTRIBUTE, key + delimited(ENTRY_VALUE, attribute_value(value)))
+        # Keyed by type as well: True == 1, but one is a ce_boolean, the other a ce_integer.
+        cache_key = (name, value.__class__, value)
+        entry = self.entries.get(cache_key)
+        if entry is None:
+            entry = delimited(ATTRIBUTE, key + delimited(ENTRY_VALUE, attribute_value(value)))
+            if len(self.entries) < MAX_CACHED_ENTRIES:
+                self.entries[cache_key] = entry
+        return entry
+
+    def encode(self, event):
+        attributes = event["attributes"]
+        static = tuple(attributes[name] for name in self.static)
+        key = (event["source"], event["specversion"], event["type"], event["datacontenttype"],
+               event.get("dataschema"), tuple(attributes), static,
+               tuple(value.__class__ for value in static))
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = self.plans[key] = self._plan(event, key[5])
+        parts = [delimited(ID, event["id"].encode())] if event["id"] else []
+        entry = self._entry
+        for item in plan:
+            if item.__class__ is bytes:
+                parts.append(item)
+            elif item[0] == "time":
+                parts.append(delimited(ATTRIBUTE, item[1] + delimited(ENTRY_VALUE, timestamp_value(event["time"]))))
+            else:
+                name, key = item
+                parts.append(entry(name, key, attributes[name]))
+        parts.append(self.encode_data(event["data"]))
+        return b"".join(parts)
+
+    def encode_batch(self, events):
+        """A serialized CloudEventBatch: every event as a repeated field 1."""
+        encode = self.encode
+        return b"".join(delimited(BATCH_EVENT, encode(event)) for event in events)
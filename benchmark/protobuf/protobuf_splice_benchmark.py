@@ -0,0 +1,129 @@
+"""Spliced envelope bytes vs SerializeToString(), per event and per batch.
+
+Every encoder starts from the same corpus events and produces CloudEvent
+(sequential) or CloudEventBatch (batch) bytes:
+
+    serialize     SerializeToString() of messages built before timing,
+                  what harness.py measures
+    canonical     from_canonical() + SerializeToString()
+    template      EventTemplate.build_columns() + SerializeToString()
+    splice        SplicingEncoder: cached static fields + encoded variable ones
+
+The output of every encoder is parsed back and compared with the messages
+from_canonical() builds before anything is timed, and the splicer is first
+checked on attribute values that compare equal across types (True == 1).
+
+    python3 protobuf_splice_benchmark.py --events 10000 --payload json --payload bytes
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from cloudevents_pb2 import CloudEvent, CloudEventBatch
+import protobuf_benchmark
+import protobuf_builder
+import protobuf_payload
+import protobuf_splice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+ENCODERS = ("serialize", "canonical", "template", "splice")
+PATHS = ("sequential", "batch")
+
+
+def encoder(name, path, profile, payload, events):
+    """Return a function producing the serialized events (sequential) or batch."""
+    set_data = protobuf_payload.data_setter(profile, payload)
+    if name == "splice":
+        template, _ = protobuf_builder.split_corpus(events)
+        splicer = protobuf_splice.SplicingEncoder(template["attributes"],
+                                                  protobuf_splice.data_encoder(profile, payload))
+        if path == "batch":
+            return lambda: splicer.encode_batch(events)
+        encode = splicer.encode
+        return lambda: [encode(event) for event in events]
+
+    if name == "serialize":
+        messages = [protobuf_benchmark.from_canonical(event, set_data) for event in events]
+        build = lambda: messages
+    elif name == "canonical":
+        from_canonical = protobuf_benchmark.from_canonical
+        build = lambda: [from_canonical(event, set_data) for event in events]
+    else:
+        template, columns = protobuf_builder.split_corpus(events)
+        template = protobuf_builder.EventTemplate(set_data=set_data, **template)
+        build = lambda: template.build_columns(**columns)
+    if path == "batch":
+        return lambda: CloudEventBatch(events=build()).SerializeToString()
+    return lambda: [message.SerializeToString() for message in build()]
+
+
+def check(output, path, expected):
+    if path == "batch":
+        decoded = list(CloudEventBatch.FromString(output).events)
+    else:
+        decoded = [CloudEvent.FromString(data) for data in output]
+    if decoded != expected:
+        raise AssertionError("encoder output does not parse back to the corpus events")
+
+
+def check_value_types(event, profile, payload):
+    """Splice one event with bool and int attribute values that compare equal,
+    varying and static, and check each keeps its own type."""
+    set_data = protobuf_payload.data_setter(profile, payload)
+    splicer = protobuf_splice.SplicingEncoder(("static_flag",),
+                                              protobuf_splice.data_encoder(profile, payload))
+    events = [dict(event, attributes=dict(event["attributes"], flag=value, static_flag=value))
+              for value in (True, 1, False, 0, 1, True)]
+    check([splicer.encode(event) for event in events], "sequential",
+          [protobuf_benchmark.from_canonical(event, set_data) for event in events])
+
+
+def run(encode, repetitions):
+    timings = []
+    for _ in range(repetitions + 1):  # the first pass is warmup
+        start = time.perf_counter_ns()
+        output = encode()
+        timings.append(time.perf_counter_ns() - start)
+    size = len(output) if isinstance(output, bytes) else sum(map(len, output))
+    return size, statistics.median(timings[1:])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--encoder", action="append", choices=ENCODERS)
+    parser.add_argument("--path", action="append", choices=PATHS)
+    parser.add_argument("--payload", action="append", choices=protobuf_payload.PAYLOADS,
+                        help="data payload encoding (repeatable, default: json)")
+    parser.add_argument("--profile", action="append", choices=corpus.PROFILES)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    header = (f"{'encoder':<10} {'path':<11} {'payload':<8} {'profile':<8} {'events':>8} "
+              f"{'size KB':>10} {'us/event':>9} {'events/s':>10}")
+    print(header)
+    print("-" * len(header))
+    for profile in args.profile or corpus.PROFILES:
+        corpus_events = corpus.load(profile, args.events)
+        for payload in args.payload or ["json"]:
+            events = protobuf_payload.with_content_type(corpus_events, profile, payload)
+            set_data = protobuf_payload.data_setter(profile, payload)
+            expected = [protobuf_benchmark.from_canonical(event, set_data) for event in events]
+            check_value_types(events[0], profile, payload)
+            for path in args.path or PATHS:
+                for name in args.encoder or ENCODERS:
+                    encode = encoder(name, path, profile, payload, events)
+                    check(encode(), path, expected)
+                    size, elapsed = run(encode, args.repetitions)
+                    print(f"{name:<10} {path:<11} {payload:<8} {profile:<8} {args.events:>8} "
+                          f"{size / 1024:>10.2f} {elapsed / args.events / 1000:>9.2f} "
+                          f"{args.events / (elapsed / 1e9):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Length-delimited CloudEvent streams.
+
+Each event is written as a varint byte length followed by the serialized
+CloudEvent, the same framing as Java's writeDelimitedTo/parseDelimitedFrom.
+The writer appends to any binary file object; the reader is a generator that
+yields events as soon as their bytes have arrived, holding at most one read
+chunk plus one event in memory no matter how long the stream is.
+"""
+from cloudevents_pb2 import CloudEvent
+
+CHUNK_SIZE = 64 * 1024
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(buf, pos):
+    """Return (value, new_pos), or (None, pos) if buf ends mid-varint."""
+    result = shift = 0
+    end = len(buf)
+    while pos < end:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 64:
+            raise ValueError("Malformed varint in delimited stream")
+    return None, pos
+
+
+class DelimitedWriter:
+    def __init__(self, writer):
+        self._writer = writer
+        self.messages_written = 0
+        self.bytes_written = 0
+
+    def write(self, message):
+        self.write_bytes(message.SerializeToString())
+
+    def write_bytes(self, data):
+        header = encode_varint(len(data))
+        self._writer.write(header)
+        self._writer.write(data)
+        self.messages_written += 1
+        self.bytes_written += len(header) + len(data)
+
+    def flush(self):
+        self._writer.flush()
+
+
+def iter_frames(reader, chunk_size=CHUNK_SIZE, max_size=MAX_MESSAGE_SIZE):
+    """Yield the raw bytes of each framed message in reader."""
+    # read1 returns whatever is buffered instead of blocking for a full
+    # chunk, so events on a pipe are yielded as soon as they arrive.
+    read = getattr(reader, "read1", None) or reader.read
+    # Chunks are appended in place; consumed frames are dropped from the
+    # front only before the next read, so a frame that arrives in many short
+    # reads is not copied again on every one of them.
+    buf = bytearray()
+    pos = 0
+    while True:
+        size, start = decode_varint(buf, pos)
+        if size is not None:
+            if size > max_size:
+                raise ValueError(f"Delimited message of {size} bytes exceeds {max_size}")
+            end = start + size
+            if end <= len(buf):
+                yield bytes(buf[start:end])
+                pos = end
+                continue
+            wanted = end - len(buf)
+        else:
+            wanted = 1
+        chunk = read(max(chunk_size, wanted))
+        if not chunk:
+            if pos < len(buf):
+                raise EOFError("Truncated delimited stream")
+            return
+        if pos:
+            del buf[:pos]
+            pos = 0
+        buf += chunk
+
+
+def read_delimited(reader, message_type=CloudEvent, **kwargs):
+    """Yield parsed messages from a length-delimited stream."""
+    for data in iter_frames(reader, **kwargs):
+        message = message_type()
+        message.ParseFromString(data)
+        yield message
@@ -0,0 +1,127 @@
+"""Length-delimited CloudEvent stream vs the monolithic CloudEventBatch.
+
+Every configuration runs in its own subprocess so that the reported peak RSS
+(ru_maxrss) belongs to that configuration alone. Events are drawn from a
+small pre-generated pool and cycled, so generating 1M+ events neither
+dominates the run time nor the memory high-water mark.
+
+    python3 protobuf_stream_benchmark.py --events 1000000 --profile large
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from cloudevents_pb2 import CloudEventBatch
+import protobuf_benchmark
+import protobuf_stream
+
+POOL_SIZE = 1000
+
+
+def event_stream(profile, count):
+    pool = protobuf_benchmark.ProtobufCodec().build_events(profile, min(POOL_SIZE, count))
+    return itertools.islice(itertools.cycle(pool), count)
+
+
+def run_monolithic(profile, count, path):
+    events = list(event_stream(profile, count))
+
+    start = time.perf_counter_ns()
+    with open(path, "wb") as f:
+        f.write(CloudEventBatch(events=events).SerializeToString())
+    encode_ns = time.perf_counter_ns() - start
+    del events
+
+    start = time.perf_counter_ns()
+    batch = CloudEventBatch()
+    with open(path, "rb") as f:
+        batch.ParseFromString(f.read())
+    decoded_count = len(batch.events)
+    decode_ns = time.perf_counter_ns() - start
+    return encode_ns, decode_ns, decoded_count
+
+
+def run_delimited(profile, count, path):
+    events = event_stream(profile, count)
+
+    start = time.perf_counter_ns()
+    with open(path, "wb") as f:
+        writer = protobuf_stream.DelimitedWriter(f)
+        for event in events:
+            writer.write(event)
+    encode_ns = time.perf_counter_ns() - start
+
+    start = time.perf_counter_ns()
+    decoded_count = 0
+    with open(path, "rb") as f:
+        for _ in protobuf_stream.read_delimited(f):
+            decoded_count += 1
+    decode_ns = time.perf_counter_ns() - start
+    return encode_ns, decode_ns, decoded_count
+
+
+SCENARIOS = {
+    "monolithic": run_monolithic,
+    "delimited": run_delimited,
+}
+
+
+def worker(args):
+    fd, path = tempfile.mkstemp(suffix=".pb")
+    os.close(fd)
+    try:
+        encode_ns, decode_ns, decoded = SCENARIOS[args.worker](args.profile[0], args.events, path)
+        size = os.path.getsize(path)
+    finally:
+        os.remove(path)
+    assert decoded == args.events, (decoded, args.events)
+    print(json.dumps({
+        "encode_ns": encode_ns,
+        "decode_ns": decode_ns,
+        "size_bytes": size,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }))
+
+
+def run_isolated(kind, profile, count):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", kind,
+               "--profile", profile, "--events", str(count)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--profile", action="append",
+                        choices=protobuf_benchmark.corpus.PROFILES)
+    parser.add_argument("--worker", choices=sorted(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.profile = args.profile or ["simple"]
+
+    if args.worker:
+        worker(args)
+        return
+
+    header = (f"{'format':<12} {'profile':<8} {'events':>9} {'size MB':>9} "
+              f"{'encode ev/s':>12} {'decode ev/s':>12} {'peak RSS MB':>12}")
+    print(header)
+    print("-" * len(header))
+    for profile in args.profile:
+        for kind in SCENARIOS:
+            result = run_isolated(kind, profile, args.events)
+            print(f"{kind:<12} {profile:<8} {args.events:>9} "
+                  f"{result['size_bytes'] / 2 ** 20:>9.2f} "
+                  f"{args.events / (result['encode_ns'] / 1e9):>12.0f} "
+                  f"{args.events / (result['decode_ns'] / 1e9):>12.0f} "
+                  f"{result['max_rss_kb'] / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
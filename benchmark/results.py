@@ -0,0 +1,272 @@
+"""Machine-readable benchmark results and regression comparison.
+
+harness.py --output results.json writes every scenario's summary, its raw
+per-repetition wall times and the environment it ran in (Python, codec
+library versions, protobuf backend, CPU count, command line). compare()
+matches two such files scenario by scenario and flags a regression when
+
+  - throughput dropped by more than the threshold and a permutation test on
+    the per-repetition throughput samples says the drop is significant, or
+  - peak memory (--trace-memory) grew by more than the threshold.
+
+    python3 harness.py --events 10000 --repetitions 10 --output baseline.json
+    ... upgrade protobuf, change a schema ...
+    python3 harness.py --events 10000 --repetitions 10 --output current.json
+    python3 results.py baseline.json current.json --threshold 0.05
+
+Files are only compared when both runs used the same configuration
+(--events, --seed, --mode): a throughput change between 1000 and 100000
+events says nothing about the code. results.py refuses such a pair with
+exit status 2 unless --allow-config-mismatch is given, and then warns.
+Scenarios of the baseline that the current file does not have are listed
+as missing.
+
+The exit status is 1 if anything regressed or went missing, so this can
+gate CI.
+
+With n repetitions per side the smallest possible p-value is 2 / C(2n, n),
+so run at least 4 repetitions (p >= 0.029) for the test to reach alpha 0.05.
+
+The other benchmarks (pipeline.py, parallel.py, compression.py, broker.py,
+batching.py) write their rows to the same kind of file with --output,
+through write(); those files record runs and are not compared.
+"""
+import argparse
+import datetime
+import importlib.metadata
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+
+FORMAT_VERSION = 1
+EXACT_PERMUTATIONS = 20000  # above this many splits, sample them instead
+SAMPLED_PERMUTATIONS = 10000
+KEY_FIELDS = ("codec", "mode", "profile", "phase")
+CONFIG_FIELDS = ("events", "seed", "mode")  # must match for two runs to be comparable
+
+
+def _version(distribution):
+    try:
+        return importlib.metadata.version(distribution)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Where and with what a run happened; enough to explain a diff."""
+    try:
+        from google.protobuf.internal import api_implementation
+        protobuf_backend = api_implementation.Type()
+    except ImportError:
+        protobuf_backend = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "avro_python3": _version("avro-python3"),
+        "protobuf": _version("protobuf"),
+        "protobuf_backend": protobuf_backend,
+        "git_commit": _git_commit(),
+        "argv": sys.argv,
+    }
+
+
+def _record(result):
+    if isinstance(result, dict):
+        return result
+    return dict(result.summary(), totals_ns=list(result.totals_ns))
+
+
+def to_dict(results, args=None, tool="harness"):
+    """results: harness.Result objects, or plain dicts (one per printed row)."""
+    return {
+        "format": FORMAT_VERSION,
+        "tool": tool,
+        "environment": environment(),
+        "config": vars(args) if args is not None else {},
+        "results": [_record(result) for result in results],
+    }
+
+
+def write(path, results, args=None, tool="harness"):
+    with open(path, "w") as f:
+        json.dump(to_dict(results, args, tool), f, indent=2)
+        f.write("\n")
+
+
+def load(path):
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} results file")
+    return document
+
+
+def throughputs(result):
+    """Events/s of every timed repetition."""
+    return [result["events"] / (total / 1e9) for total in result["totals_ns"] if total]
+
+
+def permutation_test(a, b, rng=None):
+    """Two-sided p-value for mean(a) != mean(b).
+
+    Exact over every split of the pooled samples when that is affordable
+    (it is for the handful of repetitions a benchmark runs), sampled
+    otherwise. Makes no normality assumption about timing noise.
+    """
+    if len(a) < 2 or len(b) < 2:
+        return 1.0
+    pooled = a + b
+    observed = abs(statistics.fmean(a) - statistics.fmean(b))
+    total = sum(pooled)
+    n = len(a)
+    splits = math.comb(len(pooled), n)
+
+    def extreme(indices):
+        left = sum(pooled[i] for i in indices)
+        return abs(left / n - (total - left) / len(b)) >= observed * (1 - 1e-12)
+
+    if splits <= EXACT_PERMUTATIONS:
+        hits = sum(map(extreme, itertools.combinations(range(len(pooled)), n)))
+        return hits / splits
+    rng = rng or random.Random(0)
+    hits = sum(extreme(rng.sample(range(len(pooled)), n)) for _ in range(SAMPLED_PERMUTATIONS))
+    return (hits + 1) / (SAMPLED_PERMUTATIONS + 1)
+
+
+def _config_value(config, name):
+    value = config.get(name)
+    if name == "mode":
+        # Files written before harness.py recorded its effective modes hold None.
+        if value is None:
+            import harness
+            value = harness.DEFAULT_MODES
+        return sorted(value)
+    return value
+
+
+def config_mismatches(baseline, current):
+    """(field, baseline value, current value) of the run settings that differ;
+    the same modes in another order, or by default, are not a difference."""
+    old, new = baseline["config"], current["config"]
+    return [(name, old.get(name), new.get(name)) for name in CONFIG_FIELDS
+            if _config_value(old, name) != _config_value(new, name)]
+
+
+def compare(baseline, current, threshold=0.05, alpha=0.05):
+    """Return (rows, regressed) for two loaded result documents.
+
+    A row is (key, metric, baseline value, current value, relative change,
+    p-value or None, verdict). Baseline scenarios the current run lacks are
+    "MISSING" rows and count as regressed.
+    """
+    before = {tuple(r[field] for field in KEY_FIELDS): r for r in baseline["results"]}
+    after = {tuple(r[field] for field in KEY_FIELDS) for r in current["results"]}
+    rows = []
+    regressed = False
+    for key, old in before.items():
+        if key not in after:
+            rows.append((key, "events/s", old["events_per_s"], None, None, None, "MISSING"))
+            regressed = True
+    for result in current["results"]:
+        key = tuple(result[field] for field in KEY_FIELDS)
+        old = before.get(key)
+        if old is None:
+            rows.append((key, "events/s", None, result["events_per_s"], None, None, "new"))
+            continue
+
+        old_rate, new_rate = old["events_per_s"], result["events_per_s"]
+        change = (new_rate - old_rate) / old_rate if old_rate else 0.0
+        p = permutation_test(throughputs(old), throughputs(result))
+        verdict = "ok"
+        if abs(change) > threshold and p < alpha:
+            verdict = "faster" if change > 0 else "REGRESSION"
+        elif abs(change) > threshold:
+            verdict = "noise"
+        regressed |= verdict == "REGRESSION"
+        rows.append((key, "events/s", old_rate, new_rate, change, p, verdict))
+
+        old_memory, new_memory = old.get("peak_memory"), result.get("peak_memory")
+        if old_memory and new_memory is not None:
+            change = (new_memory - old_memory) / old_memory
+            verdict = "REGRESSION" if change > threshold else "ok"
+            regressed |= verdict == "REGRESSION"
+            rows.append((key, "peak bytes", old_memory, new_memory, change, None, verdict))
+    return rows, regressed
+
+
+def _environment_changes(baseline, current):
+    old, new = baseline["environment"], current["environment"]
+    return [(name, old.get(name), new.get(name))
+            for name in ("python", "implementation", "platform", "cpu_count", "avro_python3",
+                         "protobuf", "protobuf_backend", "git_commit")
+            if old.get(name) != new.get(name)]
+
+
+def print_comparison(rows, baseline, current):
+    for name, old, new in _environment_changes(baseline, current):
+        print(f"environment: {name} {old} -> {new}")
+    header = (f"{'codec':<14} {'mode':<11} {'profile':<8} {'phase':<8} {'metric':<10} "
+              f"{'baseline':>12} {'current':>12} {'change':>8} {'p':>7}  verdict")
+    print(header)
+    print("-" * len(header))
+    for key, metric, old, new, change, p, verdict in rows:
+        codec, mode, profile, phase = key
+        old_text = f"{old:>12.0f}" if old is not None else f"{'-':>12}"
+        new_text = f"{new:>12.0f}" if new is not None else f"{'-':>12}"
+        change_text = f"{change:>+8.1%}" if change is not None else f"{'-':>8}"
+        p_text = f"{p:>7.3f}" if p is not None else f"{'-':>7}"
+        print(f"{codec:<14} {mode:<11} {profile:<8} {phase:<8} {metric:<10} "
+              f"{old_text} {new_text} {change_text} {p_text}  {verdict}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two harness.py --output files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="relative change that counts (default: 0.05 = 5%%)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="significance level of the throughput test")
+    parser.add_argument("--allow-config-mismatch", action="store_true",
+                        help="compare runs with different --events/--seed/--mode, with a warning")
+    args = parser.parse_args(argv)
+    baseline, current = load(args.baseline), load(args.current)
+    for document, path in ((baseline, args.baseline), (current, args.current)):
+        if document.get("tool", "harness") != "harness":
+            print(f"{path}: {document['tool']}.py results cannot be compared", file=sys.stderr)
+            return 2
+    mismatches = config_mismatches(baseline, current)
+    for name, old, new in mismatches:
+        print(f"config: {name} {old} -> {new}", file=sys.stderr)
+    if mismatches and not args.allow_config_mismatch:
+        print("the runs are not comparable (--allow-config-mismatch to compare anyway)", file=sys.stderr)
+        return 2
+    if mismatches:
+        print("warning: comparing runs with different configurations", file=sys.stderr)
+    rows, regressed = compare(baseline, current, args.threshold, args.alpha)
+    print_comparison(rows, baseline, current)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())